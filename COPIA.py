@@ -9,6 +9,30 @@ import shutil
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from chunk_store import ChunkStore
+from program_inventory import collect_installed_programs, write_inventory
+from task_graph import TaskGraph
+
+# Tareas de backup simultáneas (la mayoría son procesos reg/netsh/wmic que esperan E/S)
+BACKUP_WORKERS = 6
+
+# Recursos limitados: los trabajos pesados no se superponen entre sí y DISM no admite
+# dos operaciones /online a la vez
+BACKUP_LIMITS = {"pesado": 1, "dism": 1}
+
+# Generaciones que se conservan en el almacén deduplicado (backup_store/)
+BACKUP_GENERATIONS = 5
+
+# Recursos y prioridad por tarea (las más lentas arrancan primero)
+BACKUP_TASK_OPTIONS = {
+    "Drivers: Exportar": (("pesado", "dism"), 10),
+    "Usuario: Configuraciones": (("pesado",), 10),
+    "Sistema: Características": (("dism",), 5),
+    "Información: Sistema": ((), 5),
+    "Sistema: Asociaciones de Archivos": ((), 5),
+    "Sistema: Control": ((), 3),
+}
+
 class BackupApp:
     def __init__(self, root):
         self.root = root
@@ -64,7 +88,7 @@ class BackupApp:
         self.detail_label['text'] = detail
         self.root.update_idletasks()
 
-    def show_completion_window(self):
+    def show_completion_window(self, detail=None):
         for widget in self.main_frame.winfo_children():
             widget.destroy()
         self.main_frame.destroy()
@@ -73,7 +97,7 @@ class BackupApp:
         self.root.config(bg=self.color_fondo_finalizado)
         
         window_width = 400
-        window_height = 150
+        window_height = 175 if detail else 150
         screen_width = self.root.winfo_screenwidth()
         screen_height = self.root.winfo_screenheight()
         center_x = int(screen_width / 2 - window_width / 2)
@@ -89,6 +113,17 @@ class BackupApp:
         )
         completion_label.pack(pady=(25, 10))
 
+        if detail:
+            detail_label = tk.Label(
+                self.root,
+                text=detail,
+                font=("Segoe UI", 9),
+                fg="white",
+                bg=self.color_fondo_finalizado,
+                wraplength=window_width - 40
+            )
+            detail_label.pack()
+
         exit_button = tk.Button(
             self.root,
             text="Salir",
@@ -152,30 +187,12 @@ class BackupApp:
 
     def backup_installed_programs(self, backup_dir):
         try:
-            programs = []
-            keys = [
-                r'HKLM\SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall',
-                r'HKLM\SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall',
-                r'HKCU\SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall'
-            ]
-            for key in keys:
-                try:
-                    result = subprocess.run(f'reg query "{key}"', capture_output=True, text=True, shell=True, creationflags=subprocess.CREATE_NO_WINDOW)
-                    for line in result.stdout.split('\n'):
-                        if 'HKEY_' in line:
-                            subkey = line.strip()
-                            name_result = subprocess.run(f'reg query "{subkey}" /v DisplayName', capture_output=True, text=True, shell=True, creationflags=subprocess.CREATE_NO_WINDOW)
-                            if name_result.returncode == 0:
-                                for name_line in name_result.stdout.split('\n'):
-                                    if 'DisplayName' in name_line and 'REG_SZ' in name_line:
-                                        program_name = name_line.split('REG_SZ')[-1].strip()
-                                        if program_name:
-                                            programs.append(program_name)
-                except:
-                    pass
+            programs = collect_installed_programs()
+            write_inventory(programs, os.path.join(backup_dir, "installed_programs.json"))
+            # Lista simple de nombres (formato anterior)
             with open(os.path.join(backup_dir, "installed_programs.txt"), 'w', encoding='utf-8') as f:
-                for program in sorted(set(programs)):
-                    f.write(f"{program}\n")
+                for name in sorted({program.name for program in programs}):
+                    f.write(f"{name}\n")
         except:
             pass
 
@@ -339,7 +356,7 @@ class BackupApp:
         except:
             pass
 
-    def create_backup_manifest(self, backup_dir):
+    def create_backup_manifest(self, backup_dir, report=None, store=None):
         try:
             manifest = {
                 "backup_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -348,11 +365,31 @@ class BackupApp:
                 "os_version": os.sys.platform,
                 "backup_version": "2.0_ULTRA_ROBUST"
             }
+            if report is not None:
+                # Duración de cada tarea: permite ver qué exportación acota el tiempo total
+                manifest["tasks"] = report.as_dict()
+            if store is not None:
+                # Resultado del almacén deduplicado (o el error si no se pudo guardar)
+                manifest["store"] = store
             with open(os.path.join(backup_dir, "backup_manifest.json"), 'w', encoding='utf-8') as f:
                 json.dump(manifest, f, indent=4)
         except:
             pass
 
+    def store_generation(self, backup_dir, store_dir):
+        """
+        Guarda el backup como generación del almacén deduplicado: solo se escriben
+        los fragmentos que cambiaron desde las generaciones anteriores.
+        Retorna (StoreReport, None) o (None, mensaje de error).
+        """
+        try:
+            store = ChunkStore(store_dir)
+            result = store.store_tree(backup_dir, label=os.environ.get('COMPUTERNAME', ''))
+            store.prune(BACKUP_GENERATIONS)
+            return result, None
+        except (OSError, ValueError) as e:
+            return None, str(e)
+
     def run_backup_process(self):
         base_dir = os.path.dirname(os.path.abspath(__file__))
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -397,19 +434,51 @@ class BackupApp:
             ("Información: Sistema", lambda: self.backup_system_info(backup_dir)),
             ("Dispositivos: Impresoras", lambda: self.backup_printer_settings(backup_dir)),
             ("Sistema: Características", lambda: self.backup_windows_features(backup_dir)),
-            ("Manifest: Crear", lambda: self.create_backup_manifest(backup_dir))
         ]
-        
-        total_tasks = len(tasks)
-        for i, (message, task_func) in enumerate(tasks):
-            try:
-                self.update_progress((i / total_tasks) * 100, f"[{i+1}/{total_tasks}] {message}", f"Procesando...")
-                task_func()
-            except:
-                pass
-
-        self.update_progress(100, "✓ Backup completado", f"Archivos guardados en: {backup_dir}")
-        self.show_completion_window()
+
+        # Las tareas son independientes: corren en paralelo y solo se serializan las pesadas
+        graph = TaskGraph(max_workers=BACKUP_WORKERS, limits=BACKUP_LIMITS)
+        for message, task_func in tasks:
+            resources, priority = BACKUP_TASK_OPTIONS.get(message, ((), 0))
+            graph.add(message, task_func, resources=resources, priority=priority)
+
+        total_tasks = len(graph)
+        running = []
+        finished = [0]
+
+        def on_start(task):
+            running.append(task.name)
+            self.update_progress((finished[0] / total_tasks) * 100,
+                                 f"[{finished[0]}/{total_tasks}] {task.name}", f"En curso: {len(running)} tareas")
+
+        def on_finish(result):
+            if result.name in running:
+                running.remove(result.name)
+            finished[0] += 1
+            current = running[-1] if running else result.name
+            self.update_progress((finished[0] / total_tasks) * 100,
+                                 f"[{finished[0]}/{total_tasks}] {current}",
+                                 f"{result.name}: {result.duration:.1f}s")
+
+        report = graph.run(on_start=on_start, on_finish=on_finish)
+
+        self.update_progress(100, "Manifest: Crear", f"Procesando...")
+        self.create_backup_manifest(backup_dir, report)
+
+        self.update_progress(100, "Almacén: Guardar generación", "Deduplicando...")
+        store_result, store_error = self.store_generation(backup_dir, os.path.join(base_dir, "backup_store"))
+        if store_result is None:
+            store_detail = f"Almacén: no se guardó la generación ({store_error})"
+            self.create_backup_manifest(backup_dir, report, {"error": store_error})
+        else:
+            store_detail = f"Almacén: {store_result.bytes_new / (1024 * 1024):.1f} MB nuevos"
+            if store_result.errors:
+                store_detail += f", {len(store_result.errors)} errores: {store_result.errors[0]}"
+            self.create_backup_manifest(backup_dir, report, store_result.as_dict())
+
+        self.update_progress(100, "✓ Backup completado",
+                             f"{report.elapsed:.0f}s (secuencial: {report.busy_time:.0f}s) - {store_detail}")
+        self.show_completion_window(store_detail)
 
 def is_admin():
     try:
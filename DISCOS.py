@@ -8,12 +8,16 @@ import ctypes
 import sys
 import re
 import json
+import shutil
 from datetime import datetime
 import logging
 from pathlib import Path
 from typing import List, Tuple, Dict, Optional
 import winreg
 
+from hardware_facts import get_hardware_facts
+from powershell_pool import run_powershell
+
 # Pre-compile regex patterns for better performance
 FRAGMENTATION_PATTERNS = [
     re.compile(r'(\d+)%.*fragment', re.IGNORECASE),
@@ -22,6 +26,10 @@ FRAGMENTATION_PATTERNS = [
 ]
 LAST_OPTIMIZED_PATTERN = re.compile(r'LastOptimized:(\d+) days ago')
 
+# Tipo, modelo, tamaño y sistema de archivos de cada letra se reutilizan durante un día
+# (y nunca después de reiniciar); el espacio libre siempre se mide en el momento
+DRIVE_INFO_TTL = 24 * 3600
+
 class StorageMaintenanceApp:
     def __init__(self):
         """Inicializa la aplicación de mantenimiento de almacenamiento"""
@@ -216,13 +224,7 @@ class StorageMaintenanceApp:
                 # Método 2: Fallback usando PowerShell
                 self.log_message("Método 2: Detectando unidades con PowerShell...")
                 ps_cmd = "Get-Volume | Where-Object {$_.DriveType -eq 'Fixed'} | Select-Object -ExpandProperty DriveLetter"
-                result = subprocess.run(
-                    ['powershell', '-Command', ps_cmd],
-                    capture_output=True,
-                    text=True,
-                    timeout=30,
-                    creationflags=subprocess.CREATE_NO_WINDOW
-                )
+                result = run_powershell(ps_cmd, timeout=30)
                 drive_letters = [f"{letter.strip()}:" for letter in result.stdout.split('\n') 
                                if letter.strip() and letter.strip().isalpha()]
             
@@ -272,7 +274,26 @@ class StorageMaintenanceApp:
         return drives_to_optimize
 
     def get_detailed_drive_info(self, drive: str) -> Dict:
-        """Obtiene información detallada de una unidad"""
+        """Obtiene información detallada de una unidad (caché de hardware + espacio libre actual)"""
+        hechos = get_hardware_facts()
+        clave = f"drive:{drive.upper()}"
+        info = hechos.lookup(clave)
+        if info is None:
+            info = self.probe_drive_info(drive)
+            # Solo se guarda una detección completa (no el "HDD" asumido tras un error)
+            if info['type'] in ('SSD', 'HDD') and info['size'] != 'Desconocido':
+                hechos.put(clave, info, ttl=DRIVE_INFO_TTL)
+            return info
+        
+        info = dict(info)
+        try:
+            info['free_space'] = f"{shutil.disk_usage(drive + os.sep).free / (1024**3):.2f} GB"
+        except OSError:
+            info['free_space'] = 'Desconocido'
+        return info
+
+    def probe_drive_info(self, drive: str) -> Dict:
+        """Consulta la información de una unidad (PowerShell, o fsutil/WMIC como respaldo)"""
         info = {
             'type': 'UNKNOWN',
             'model': 'Desconocido',
@@ -316,13 +337,7 @@ class StorageMaintenanceApp:
             Write-Output "$type|$($disk.Model)|$size GB|$($drive.FileSystem)|$freeSpace GB"
             """
             
-            result = subprocess.run(
-                ['powershell', '-ExecutionPolicy', 'Bypass', '-Command', ps_cmd],
-                capture_output=True,
-                text=True,
-                timeout=30,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
+            result = run_powershell(ps_cmd, timeout=30)
             
             if result.returncode == 0 and result.stdout.strip():
                 parts = result.stdout.strip().split('|')
@@ -429,13 +444,7 @@ class StorageMaintenanceApp:
             }}
             """
             
-            result = subprocess.run(
-                ['powershell', '-ExecutionPolicy', 'Bypass', '-Command', ps_cmd],
-                capture_output=True,
-                text=True,
-                timeout=60,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
+            result = run_powershell(ps_cmd, timeout=60)
             
             output = result.stdout + result.stderr
             
@@ -518,13 +527,7 @@ class StorageMaintenanceApp:
             Write-Output $defragAnalysis
             """
             
-            ps_result = subprocess.run(
-                ['powershell', '-ExecutionPolicy', 'Bypass', '-Command', ps_cmd],
-                capture_output=True,
-                text=True,
-                timeout=60,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
+            ps_result = run_powershell(ps_cmd, timeout=60)
             
             ps_output = ps_result.stdout + ps_result.stderr
             
@@ -643,13 +646,7 @@ Se recomienda cerrar otras aplicaciones antes de continuar."""
             self.log_message(f"  Método 1: Optimize-Volume (ReTrim)...")
             ps_cmd = f"Optimize-Volume -DriveLetter '{drive[0]}' -ReTrim -Verbose"
             
-            result = subprocess.run(
-                ['powershell', '-ExecutionPolicy', 'Bypass', '-Command', ps_cmd],
-                capture_output=True,
-                text=True,
-                timeout=600,  # 10 minutos
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
+            result = run_powershell(ps_cmd, timeout=600)  # 10 minutos
             
             if result.returncode == 0:
                 self.log_message("  ✓ Optimización TRIM completada")
@@ -770,13 +767,7 @@ Se recomienda cerrar otras aplicaciones antes de continuar."""
             self.log_message(f"  Método 2: Optimize-Volume (Defragmentación)...")
             ps_cmd = f"Optimize-Volume -DriveLetter '{drive[0]}' -Defrag -Verbose"
             
-            result = subprocess.run(
-                ['powershell', '-ExecutionPolicy', 'Bypass', '-Command', ps_cmd],
-                capture_output=True,
-                text=True,
-                timeout=7200,
-                creationflags=subprocess.CREATE_NO_WINDOW
-            )
+            result = run_powershell(ps_cmd, timeout=7200)
             
             if result.returncode == 0:
                 self.log_message("  ✓ Optimize-Volume completado")
@@ -11,6 +11,12 @@ import importlib
 import runpy
 from pathlib import Path
 
+from process_snapshot import get_cpu_sampler, get_snapshot
+from mode_state import get_mode_bus
+from instrumentation import instrumented
+from hardware_facts import is_laptop as hardware_is_laptop
+from process_events import GameLaunchWatcher
+
 # Lazy import for pystray and PIL to reduce startup time
 PYSTRAY_AVAILABLE = None
 
@@ -50,6 +56,11 @@ proceso_modo_normal = None
 proceso_modo_agresivo = None
 proceso_modo_juego = None
 modo_juego_activo = False
+# Detección de juegos por eventos de inicio de procesos (ver process_events.py);
+# cada tick solo vacía la cola de eventos, por eso puede ser frecuente
+vigilante_juegos = None
+proceso_juego = None
+INTERVALO_JUEGOS_MS = 250
 
 ventana = None
 icono_bandeja = None
@@ -88,34 +99,13 @@ def is_frozen() -> bool:
 
 
 def detectar_laptop():
+    """Batería o chasis de portátil (dato compartido en la caché de hardware)"""
     global es_laptop
     try:
-        battery = psutil.sensors_battery()
-        if battery is not None:
-            es_laptop = True
-            return True
-        
-        if sys.platform == 'win32':
-            try:
-                result = subprocess.run(
-                    ['wmic', 'systemenclosure', 'get', 'chassistypes'],
-                    capture_output=True,
-                    text=True,
-                    timeout=5,
-                    creationflags=subprocess.CREATE_NO_WINDOW
-                )
-                laptop_types = ['8', '9', '10', '11', '14']
-                for tipo in laptop_types:
-                    if tipo in result.stdout:
-                        es_laptop = True
-                        return True
-            except:
-                pass
-        es_laptop = False
-        return False
-    except:
+        es_laptop = hardware_is_laptop()
+    except Exception:
         es_laptop = False
-        return False
+    return es_laptop
 
 def desactivar_power_throttling():
     """
@@ -261,22 +251,39 @@ def detener_modo_juego():
             interruptor_modo_agresivo.set_enabled(True)
 
 def verificar_juegos_activos():
-    global modo_juego_activo
+    global modo_juego_activo, vigilante_juegos, proceso_juego
     if not ventana or not ventana.winfo_exists():
         return
     try:
-        juegos_lista = set(lista_juegos.get(0, tk.END))
+        juegos_lista = set(j.lower() for j in lista_juegos.get(0, tk.END))
+        if not juegos_lista and vigilante_juegos is None:
+            ventana.after(INTERVALO_JUEGOS_MS, verificar_juegos_activos)
+            return
+        if vigilante_juegos is None:
+            vigilante_juegos = GameLaunchWatcher(juegos_lista)
+            vigilante_juegos.start()
+        else:
+            vigilante_juegos.set_games(juegos_lista)
+        # La cola de inicios se vacía en cada tick para que no crezca mientras hay juego
+        inicio = vigilante_juegos.poll()
         if not juegos_lista:
-            ventana.after(2000, verificar_juegos_activos)
+            ventana.after(INTERVALO_JUEGOS_MS, verificar_juegos_activos)
             return
-        juego_encontrado = False
-        for proc in psutil.process_iter(['name']):
-            try:
-                if proc.info['name'] in juegos_lista:
-                    juego_encontrado = True
-                    break
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
+        # Sin juego solo se miran los inicios de procesos; con juego, si su proceso sigue vivo
+        if not modo_juego_activo:
+            if inicio is not None:
+                try:
+                    proceso_juego = psutil.Process(inicio.pid)
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    inicio = None
+            juego_encontrado = inicio is not None
+        else:
+            juego_encontrado = proceso_juego is not None and proceso_juego.is_running()
+            if not juego_encontrado:
+                # Cerró el juego (o no se conoce su proceso): un recorrido completo por si hay otro abierto
+                abierto = vigilante_juegos.running_game()
+                proceso_juego = psutil.Process(abierto.pid) if abierto is not None else None
+                juego_encontrado = proceso_juego is not None
         if juego_encontrado and not modo_juego_activo:
             if switches_config["modo_normal"]:
                 detener_modo_normal()
@@ -295,7 +302,7 @@ def verificar_juegos_activos():
             guardar_switches()
     except:
         pass
-    ventana.after(2000, verificar_juegos_activos)
+    ventana.after(INTERVALO_JUEGOS_MS, verificar_juegos_activos)
 
 def crear_tarea_programada(task_name, description, command, arguments, delay=None):
     try:
@@ -687,6 +694,7 @@ def cargar_listas():
 # Cache for differential updates - Optimization #5
 _process_cache = {}
 
+@instrumented()
 def refrescar_lista_procesos():
     """
     Optimized process list refresh with differential updates.
@@ -703,15 +711,11 @@ def refrescar_lista_procesos():
     }
     excluidos = {"svchost.exe", "smss.exe", "sihost.exe", "wininit.exe"}
     
-    # Collect current processes
+    # Collect current processes from the shared snapshot
     current_processes = {}
-    for p in psutil.process_iter(['pid', 'name']):
-        try:
-            name = p.info['name']
-            if name and name.lower() not in excluidos:
-                current_processes[p.info['pid']] = name
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            pass
+    for pid, name in get_snapshot().iter_processes():
+        if name and name.lower() not in excluidos:
+            current_processes[pid] = name
     
     # Get existing PIDs from the listbox
     existing_entries = {}
@@ -972,7 +976,11 @@ def condiciones_sistema_ok(umbral=70):
     try:
         if modo_juego_activo:
             return False
-        cpu = psutil.cpu_percent(interval=1)
+        # Uso total según el muestreo continuo; solo bloquea si aún no hay dos instantáneas
+        get_snapshot()
+        cpu = get_cpu_sampler().system_percent()
+        if cpu is None:
+            cpu = psutil.cpu_percent(interval=1)
         mem = psutil.virtual_memory().percent
         return cpu <= umbral and mem <= umbral
     except Exception:
@@ -1044,6 +1052,68 @@ def intentar_ejecutar_limpieza():
 
     threading.Thread(target=worker, daemon=True).start()
 
+def _comando_limpieza(*banderas):
+    """Comando para ejecutar LIMPIEZA en un proceso aparte (EXE o .py)."""
+    if is_frozen():
+        return [sys.executable, "--run-limpieza", *banderas]
+    script = resource_path("LIMPIEZA.py")
+    return [sys.executable, script, *banderas]
+
+def vista_previa_limpieza():
+    """
+    Simulación: calcula el plan de limpieza sin borrar nada, muestra el espacio
+    recuperable por categoría y, si el usuario confirma, ejecuta ese mismo plan.
+    """
+    global limpieza_en_ejecucion
+    if limpieza_en_ejecucion:
+        messagebox.showinfo("Limpieza", "Ya hay una limpieza en ejecución.")
+        return
+    limpieza_en_ejecucion = True
+    ruta_plan = os.path.join(os.path.expanduser("~"), "limpieza_plan.json")
+    flags = subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
+
+    def ejecutar_plan():
+        global limpieza_en_ejecucion
+        try:
+            subprocess.run(_comando_limpieza("--plan", ruta_plan), creationflags=flags)
+        finally:
+            limpieza_en_ejecucion = False
+
+    def mostrar_plan():
+        global limpieza_en_ejecucion
+        try:
+            from cleanup_plan import DeletionPlan
+            plan = DeletionPlan.load(ruta_plan)
+        except Exception as e:
+            limpieza_en_ejecucion = False
+            messagebox.showerror("Limpieza", f"No se pudo calcular el plan de limpieza:\n{e}")
+            return
+        lineas = [
+            f"{regla}: {datos['bytes'] / (1024 ** 2):.1f} MB ({datos['entries']} elementos)"
+            for regla, datos in sorted(plan.by_rule().items(), key=lambda x: -x[1]['bytes'])
+            if datos['entries']
+        ]
+        mensaje = (f"Espacio recuperable: {plan.total_bytes / (1024 ** 3):.2f} GB\n\n"
+                   + "\n".join(lineas[:15])
+                   + "\n\n¿Ejecutar la limpieza ahora?")
+        if messagebox.askyesno("Vista previa de limpieza", mensaje):
+            threading.Thread(target=ejecutar_plan, daemon=True).start()
+        else:
+            limpieza_en_ejecucion = False
+
+    def calcular():
+        global limpieza_en_ejecucion
+        try:
+            subprocess.run(_comando_limpieza("--dry-run", ruta_plan), creationflags=flags)
+        except Exception:
+            pass
+        if ventana and ventana.winfo_exists():
+            ventana.after(0, mostrar_plan)
+        else:
+            limpieza_en_ejecucion = False
+
+    threading.Thread(target=calcular, daemon=True).start()
+
 def intentar_ejecutar_discos():
     """
     A los 30 minutos: DISCOS/discos si condiciones OK.
@@ -1276,6 +1346,8 @@ def crear_interfaz(iniciar_minimizado=False):
                command=ejecutar_restaurar_sistema, style="Gamer.TButton").pack(fill='x', pady=5, ipady=8)
     ttk.Button(frame_botones_accion, text="💾 Copia de Seguridad", 
                command=ejecutar_copia_seguridad, style="Gamer.TButton").pack(fill='x', pady=5, ipady=8)
+    ttk.Button(frame_botones_accion, text="🧹 Limpieza (vista previa)", 
+               command=vista_previa_limpieza, style="Gamer.TButton").pack(fill='x', pady=5, ipady=8)
 
     frame_juegos, lista_juegos = crear_frame_lista(pagina_juegos, "Lista de Juegos", COLOR_ROJO_PAGINA)
     frame_botones_juegos = ttk.Frame(pagina_juegos)
@@ -1323,7 +1395,9 @@ def crear_interfaz(iniciar_minimizado=False):
 
     tray_ok = setup_tray_icon()
     centrar_ventana(ventana)
-    ventana.after(2000, verificar_juegos_activos)
+    # La GUI vive más que los modos: hospeda el bus de estado para que sobreviva a sus reinicios
+    get_mode_bus()
+    ventana.after(INTERVALO_JUEGOS_MS, verificar_juegos_activos)
 
     if iniciar_minimizado and tray_ok:
         minimizar_ventana_bandeja()
@@ -1357,13 +1431,9 @@ def _run_limpieza_main():
         if _mod_disponible(nombre):
             try:
                 mod = importlib.import_module(nombre)
-                rc = 0
-                try:
-                    res = mod.system_maintenance()
-                    rc = 0 if (res is None or res >= 0) else 1
-                except Exception:
-                    rc = 1
-                return rc
+                return mod.main()
+            except SystemExit as se:
+                return int(getattr(se, "code", 0) or 0)
             except Exception:
                 pass
     return 1
@@ -20,6 +20,15 @@ import winreg
 import logging
 import threading
 
+from dir_scanner import scan_tree
+from cleanup_rules import (
+    CleanupRule, FileInfo, RULE_FILE, RULE_TREE, RuleWalker, delete_match,
+    empty_dir_rule, extension_rule, zero_byte_rule
+)
+from cleanup_plan import DeletionPlan, add_directory_contents, add_rule_matches, execute_plan
+from duplicate_finder import find_duplicates
+from scan_index import ScanIndex
+
 # ============================================================================
 # OCULTAR CONSOLA
 # ============================================================================
@@ -42,6 +51,8 @@ if os.name == 'nt':
 # ============================================================================
 
 log_file = os.path.join(os.path.expanduser("~"), 'limpieza_log.txt')
+plan_file_default = os.path.join(os.path.expanduser("~"), 'limpieza_plan.json')
+index_file_default = os.path.join(os.path.expanduser("~"), 'limpieza_index.sqlite')
 
 logging.basicConfig(
     level=logging.INFO,
@@ -240,25 +251,14 @@ def format_size(bytes_size):
 
 def get_folder_size(folder_path):
     """Calcula el tamaño total de una carpeta en bytes."""
-    total_size = 0
-    try:
-        for dirpath, dirnames, filenames in os.walk(folder_path):
-            for filename in filenames:
-                filepath = os.path.join(dirpath, filename)
-                try:
-                    if os.path.exists(filepath):
-                        total_size += os.path.getsize(filepath)
-                except (OSError, PermissionError, FileNotFoundError):
-                    continue
-    except Exception as e:
-        logging.debug(f"Error calculando tamaño de {folder_path}: {e}")
-    return total_size
+    return scan_tree(folder_path).size
 
-def clean_directory(path, total_freed):
+def clean_directory(path, total_freed, size_before=None):
     """Limpia un directorio y devuelve el espacio liberado."""
     try:
         if os.path.exists(path):
-            size_before = get_folder_size(path)
+            if size_before is None:
+                size_before = get_folder_size(path)
             logging.info(f"Limpiando: {path} ({format_size(size_before)})")
             shutil.rmtree(path, ignore_errors=True)
             os.makedirs(path, exist_ok=True)
@@ -289,21 +289,67 @@ def clean_files(pattern, total_freed):
         logging.debug(f"Error con patrón {pattern}: {e}")
     return total_freed
 
+# ============================================================================
+# REGLAS DE LIMPIEZA DEL PERFIL (UNA SOLA PASADA)
+# ============================================================================
+
+TEMP_EXTENSIONS = ('.tmp', '.temp')
+
+OLD_FILE_EXTENSIONS = frozenset([
+    '.exe', '.msi', '.dmg', '.pkg', '.deb', '.rpm',  # Instaladores
+    '.iso', '.img', '.vhd', '.vmdk',  # Imágenes de disco
+    '.tmp', '.temp', '.bak', '.old',  # Temporales
+])
+
+def is_old_large_file(info, cutoff_time, min_size_bytes):
+    """Archivo antiguo, grande y con extensión de instalador/imagen/temporal."""
+    return (info.mtime < cutoff_time and
+            info.size >= min_size_bytes and
+            info.ext in OLD_FILE_EXTENSIONS)
+
+def old_large_rule(rule_id, path, days, min_size_mb):
+    """Regla de archivos antiguos y grandes limitada a una carpeta."""
+    cutoff_time = time.time() - (days * 86400)
+    min_size_bytes = min_size_mb * 1024 * 1024
+    return CleanupRule(rule_id, RULE_FILE,
+                       lambda info: is_old_large_file(info, cutoff_time, min_size_bytes),
+                       scope=path,
+                       # Archivos grandes todavía recientes: se revisan de nuevo en cada pasada
+                       candidate=lambda info: info.size >= min_size_bytes and info.ext in OLD_FILE_EXTENSIONS)
+
+def log_and_delete(rule, path, size, is_dir):
+    """Elimina una coincidencia y la registra en el log."""
+    deleted = delete_match(rule, path, size, is_dir)
+    if deleted:
+        if rule.rule_id.startswith('old_large'):
+            logging.info(f"Archivo antiguo eliminado: {path} ({format_size(size)})")
+        else:
+            logging.debug(f"Eliminado [{rule.rule_id}]: {path}")
+    return deleted
+
+def build_old_large_rules(user_home):
+    """Archivos antiguos y grandes: 60 días en Downloads, 90 en Desktop."""
+    return [
+        old_large_rule("old_large_downloads", os.path.join(user_home, "Downloads"), days=60, min_size_mb=100),
+        old_large_rule("old_large_desktop", os.path.join(user_home, "Desktop"), days=90, min_size_mb=100),
+    ]
+
+def build_profile_rules(user_home):
+    """Reglas que se aplican al perfil del usuario en la pasada única."""
+    return [
+        # Carpetas *.tmp / *.temp completas (antes: glob recursivo + rmtree)
+        CleanupRule("temp_dir", RULE_TREE,
+                    lambda path, name: os.path.splitext(name)[1].lower() in TEMP_EXTENSIONS),
+        extension_rule("temp_ext", TEMP_EXTENSIONS),
+        *build_old_large_rules(user_home),
+        zero_byte_rule(),
+        empty_dir_rule(),
+    ]
+
 def remove_empty_dirs(root_path):
     """Elimina directorios vacíos recursivamente."""
-    removed = 0
-    try:
-        for dirpath, dirnames, filenames in os.walk(root_path, topdown=False):
-            try:
-                if not dirnames and not filenames and dirpath != root_path:
-                    os.rmdir(dirpath)
-                    removed += 1
-                    logging.debug(f"Directorio vacío eliminado: {dirpath}")
-            except (OSError, PermissionError):
-                continue
-    except Exception as e:
-        logging.debug(f"Error removiendo directorios vacíos en {root_path}: {e}")
-    return removed
+    walker = RuleWalker([empty_dir_rule()], on_match=log_and_delete)
+    return walker.walk(root_path)["empty_dir"].matched
 
 # ============================================================================
 # LIMPIEZA AVANZADA - ARCHIVOS ANTIGUOS Y GRANDES
@@ -313,38 +359,56 @@ def clean_old_large_files(path, days=60, min_size_mb=100):
     """
     Elimina archivos grandes y antiguos de Downloads y Desktop.
     """
-    removed_size = 0
-    cutoff_time = time.time() - (days * 86400)
-    min_size_bytes = min_size_mb * 1024 * 1024
-
-    extensions_to_clean = [
-        '.exe', '.msi', '.dmg', '.pkg', '.deb', '.rpm',  # Instaladores
-        '.iso', '.img', '.vhd', '.vmdk',  # Imágenes de disco
-        '.tmp', '.temp', '.bak', '.old',  # Temporales
-    ]
-
     if not os.path.exists(path):
-        return removed_size
+        return 0
+    walker = RuleWalker([old_large_rule("old_large", path, days, min_size_mb)], on_match=log_and_delete)
+    return walker.walk(path)["old_large"].bytes
 
-    for root, _, files in os.walk(path):
-        for filename in files:
-            filepath = os.path.join(root, filename)
-            try:
-                file_stat = os.stat(filepath)
-                file_ext = os.path.splitext(filename)[1].lower()
+# ============================================================================
+# ARCHIVOS DUPLICADOS EN DOWNLOADS Y DESKTOP
+# ============================================================================
 
-                if (file_stat.st_mtime < cutoff_time and 
-                    file_stat.st_size >= min_size_bytes and
-                    file_ext in extensions_to_clean):
+# Tamaño mínimo para buscar duplicados (los archivos chicos no justifican leerlos)
+DUPLICATE_MIN_SIZE_MB = 10
 
-                    removed_size += file_stat.st_size
-                    os.remove(filepath)
-                    logging.info(f"Archivo antiguo eliminado: {filepath} ({format_size(file_stat.st_size)})")
+def duplicate_roots(user_home):
+    """Carpetas donde se buscan duplicados."""
+    return [os.path.join(user_home, "Downloads"), os.path.join(user_home, "Desktop")]
 
-            except (OSError, PermissionError, FileNotFoundError):
-                continue
+def is_safe_duplicate(copy, rules):
+    """Copia que se puede eliminar: la regla de archivos antiguos y grandes de su carpeta la acepta."""
+    info = FileInfo(copy.path, os.path.basename(copy.path), copy.size, copy.mtime)
+    directory = os.path.dirname(copy.path)
+    return any(rule.applies_to(directory) and rule.predicate(info) for rule in rules)
 
-    return removed_size
+def add_duplicate_stage(plan, user_home, delete=False):
+    """
+    Busca duplicados (tamaño -> hash parcial -> hash completo) y registra el
+    espacio recuperable. Con delete=True agrega al plan las copias seguras
+    (se conserva la más antigua de cada grupo). Retorna el DuplicateReport.
+    """
+    planned = {os.path.normcase(path) for path, _, _, _ in plan.entries()}
+    report = find_duplicates(duplicate_roots(user_home),
+                             min_size=DUPLICATE_MIN_SIZE_MB * 1024 * 1024,
+                             exclude=lambda path: os.path.normcase(path) in planned)
+    logging.info(f"Duplicados: {len(report.groups)} grupos, {format_size(report.reclaimable)} recuperables "
+                 f"({report.files_scanned} archivos, {report.full_hashed} con hash completo, "
+                 f"{format_size(report.bytes_read)} leídos en {report.elapsed:.1f}s)")
+    for group in report.groups[:10]:
+        logging.info(f"  {format_size(group.size)} x{len(group.files)}: {group.original.path}")
+        for copy in group.copies:
+            logging.debug(f"    copia: {copy.path}")
+
+    if delete:
+        rules = build_old_large_rules(user_home)
+        added = 0
+        for group in report.groups:
+            for copy in group.copies:
+                if is_safe_duplicate(copy, rules):
+                    plan.add(copy.path, copy.size, "duplicados", mtime=copy.mtime)
+                    added += 1
+        logging.info(f"  {added} copias agregadas al plan de eliminación")
+    return report
 
 # ============================================================================
 # LIMPIEZA AVANZADA - ARCHIVOS DE 0 BYTES
@@ -352,20 +416,8 @@ def clean_old_large_files(path, days=60, min_size_mb=100):
 
 def clean_zero_byte_files(root_path):
     """Elimina archivos de 0 bytes."""
-    removed_count = 0
-
-    for root, _, files in os.walk(root_path):
-        for filename in files:
-            filepath = os.path.join(root, filename)
-            try:
-                if os.path.getsize(filepath) == 0:
-                    os.remove(filepath)
-                    removed_count += 1
-                    logging.debug(f"Archivo 0 bytes eliminado: {filepath}")
-            except (OSError, PermissionError, FileNotFoundError):
-                continue
-
-    return removed_count
+    walker = RuleWalker([zero_byte_rule()], on_match=log_and_delete)
+    return walker.walk(root_path)["zero_bytes"].matched
 
 # ============================================================================
 # LIMPIEZA DE REGISTROS DE WINDOWS
@@ -588,26 +640,6 @@ def optimize_prefetch():
 
     return total_freed
 
-# ============================================================================
-# LIMPIEZA DE WINDOWS DEFENDER
-# ============================================================================
-
-def clean_windows_defender():
-    """Limpia archivos temporales y logs de Windows Defender."""
-    total_freed = 0
-
-    defender_paths = [
-        r"C:\ProgramData\Microsoft\Windows Defender\Scans\History\Results",
-        r"C:\ProgramData\Microsoft\Windows Defender\Scans\History\Service",
-        os.path.join(os.environ.get('PROGRAMDATA', ''), 'Microsoft', 'Windows Defender', 'Support'),
-    ]
-
-    for path in defender_paths:
-        if os.path.exists(path):
-            total_freed = clean_directory(path, total_freed)
-
-    return total_freed
-
 # ============================================================================
 # LIMPIEZA DE LOGS DEL SISTEMA
 # ============================================================================
@@ -629,28 +661,11 @@ def clean_system_logs():
     return total_freed
 
 # ============================================================================
-# FUNCIÓN PRINCIPAL DE LIMPIEZA
+# PLAN DE LIMPIEZA (SIMULACIÓN Y EJECUCIÓN)
 # ============================================================================
 
-def system_maintenance():
-    """Realiza el mantenimiento completo del sistema."""
-
-    start_time = time.time()
-    total_freed = 0
-
-    # Mostrar notificación de inicio
-    show_notification("🔧 Iniciando limpieza profunda del sistema...\nPor favor espere...", bg_color="#0066CC", duration=3000)
-
-    logging.info("=" * 70)
-    logging.info("INICIANDO LIMPIEZA PROFUNDA DEL SISTEMA")
-    logging.info(f"Usuario: gustavo85")
-    logging.info(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    logging.info("=" * 70)
-
-    # ========================================================================
-    # 1. LIMPIEZA DE ARCHIVOS TEMPORALES DEL SISTEMA
-    # ========================================================================
-    logging.info("\n[1/14] Limpiando archivos temporales del sistema...")
+def maintenance_cache_dirs():
+    """Carpetas cuyo contenido se elimina por completo, agrupadas por regla."""
     temp_paths = [
         os.environ.get('TEMP', ''),
         os.environ.get('TMP', ''),
@@ -661,27 +676,6 @@ def system_maintenance():
         r"C:\Windows\System32\LogFiles",
     ]
 
-    for path in temp_paths:
-        if path and os.path.exists(path):
-            total_freed = clean_directory(path, total_freed)
-
-    # ========================================================================
-    # 2. LIMPIEZA DE PREFETCH (OPTIMIZADO)
-    # ========================================================================
-    logging.info("\n[2/14] Optimizando Prefetch...")
-    if is_admin():
-        total_freed += optimize_prefetch()
-
-    # ========================================================================
-    # 3. LIMPIEZA DE WINDOWS UPDATE (CON DISM)
-    # ========================================================================
-    logging.info("\n[3/14] Limpiando archivos de Windows Update...")
-    total_freed += clean_windows_update()
-
-    # ========================================================================
-    # 4. LIMPIEZA DE CACHÉ DEL SISTEMA
-    # ========================================================================
-    logging.info("\n[4/14] Limpiando caché del sistema...")
     cache_paths = [
         os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Temp'),
         os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Microsoft', 'Windows', 'INetCache'),
@@ -690,14 +684,6 @@ def system_maintenance():
         os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Microsoft', 'Windows', 'Caches'),
     ]
 
-    for path in cache_paths:
-        if os.path.exists(path):
-            total_freed = clean_directory(path, total_freed)
-
-    # ========================================================================
-    # 5. LIMPIEZA DE NAVEGADORES
-    # ========================================================================
-    logging.info("\n[5/14] Limpiando caché de navegadores...")
     browsers_cache = [
         # Google Chrome
         os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Google', 'Chrome', 'User Data', 'Default', 'Cache'),
@@ -728,14 +714,6 @@ def system_maintenance():
         os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Microsoft', 'Windows', 'INetCache', 'IE'),
     ]
 
-    for cache_path in browsers_cache:
-        if os.path.exists(cache_path):
-            total_freed = clean_directory(cache_path, total_freed)
-
-    # ========================================================================
-    # 6. LIMPIEZA DE APLICACIONES COMUNES
-    # ========================================================================
-    logging.info("\n[6/14] Limpiando caché de aplicaciones...")
     programs_cache = [
         # Adobe
         os.path.join(os.environ.get('LOCALAPPDATA', ''), 'Adobe', 'Common', 'Media Cache'),
@@ -789,14 +767,6 @@ def system_maintenance():
         os.path.join(os.environ.get('LOCALAPPDATA', ''), 'pip', 'cache'),
     ]
 
-    for program_path in programs_cache:
-        if os.path.exists(program_path):
-            total_freed = clean_directory(program_path, total_freed)
-
-    # ========================================================================
-    # 7. LIMPIEZA DE CACHÉ DE GPU Y DRIVERS
-    # ========================================================================
-    logging.info("\n[7/14] Limpiando caché de GPU y drivers...")
     gpu_cache_paths = [
         os.path.join(os.environ.get('LOCALAPPDATA', ''), 'D3DSCache'),
         os.path.join(os.environ.get('LOCALAPPDATA', ''), 'NVIDIA', 'DXCache'),
@@ -806,14 +776,6 @@ def system_maintenance():
         r'C:\ProgramData\NVIDIA Corporation\NV_Cache',
     ]
 
-    for path in gpu_cache_paths:
-        if os.path.exists(path):
-            total_freed = clean_directory(path, total_freed)
-
-    # ========================================================================
-    # 8. LIMPIEZA DE ERROR REPORTS Y DUMPS
-    # ========================================================================
-    logging.info("\n[8/14] Limpiando reportes de errores...")
     error_report_paths = [
         os.path.join(os.environ.get('PROGRAMDATA', ''), 'Microsoft', 'Windows', 'WER', 'ReportArchive'),
         os.path.join(os.environ.get('PROGRAMDATA', ''), 'Microsoft', 'Windows', 'WER', 'ReportQueue'),
@@ -821,35 +783,164 @@ def system_maintenance():
         os.path.join(os.environ.get('LOCALAPPDATA', ''), 'CrashDumps'),
     ]
 
-    for path in error_report_paths:
-        if os.path.exists(path):
-            total_freed = clean_directory(path, total_freed)
+    defender_paths = [
+        r"C:\ProgramData\Microsoft\Windows Defender\Scans\History\Results",
+        r"C:\ProgramData\Microsoft\Windows Defender\Scans\History\Service",
+        os.path.join(os.environ.get('PROGRAMDATA', ''), 'Microsoft', 'Windows Defender', 'Support'),
+    ]
+
+    return [
+        ("temp_sistema", temp_paths),
+        ("cache_sistema", cache_paths),
+        ("navegadores", browsers_cache),
+        ("aplicaciones", programs_cache),
+        ("gpu", gpu_cache_paths),
+        ("reportes_error", error_report_paths),
+        ("defender", defender_paths),
+    ]
+
+def build_maintenance_plan(user_home=None, index_file=index_file_default):
+    """
+    Fase 1: arma el plan de eliminación sin borrar nada (cachés medidas en
+    paralelo + una pasada de reglas por el perfil, sin entrar en las cachés).
+    Con index_file, las carpetas sin cambios desde la ejecución anterior se
+    toman del índice en lugar de listarse otra vez.
+    """
+    user_home = user_home or os.path.expanduser("~")
+    cache_index = ScanIndex(index_file, namespace="cache") if index_file else None
+    profile_index = ScanIndex(index_file, namespace="perfil") if index_file else None
+
+    plan = DeletionPlan()
+    for rule_id, paths in maintenance_cache_dirs():
+        add_directory_contents(plan, paths, rule_id, index=cache_index)
+    cache_roots = plan.contents_roots()
+    walker = add_rule_matches(plan, [user_home], build_profile_rules(user_home),
+                              skip=cache_roots, index=profile_index)
+    logging.info(f"Plan: {len(plan)} entradas, {format_size(plan.total_bytes)} recuperables "
+                 f"({walker.files_seen} archivos revisados en el perfil, "
+                 f"{walker.dirs_reused} carpetas sin cambios tomadas del índice)")
+    for rule_id, data in plan.by_rule().items():
+        logging.info(f"  {rule_id}: {data['entries']} entradas, {format_size(data['bytes'])}")
+
+    for index, roots in ((cache_index, cache_roots), (profile_index, [user_home])):
+        if index is not None:
+            index.forget_unseen(roots)
+            index.save()
+    return plan
+
+def save_maintenance_plan(plan_file, user_home=None, delete_duplicates=False):
+    """Simulación: guarda el plan en JSON (para vista previa en el GUI) y devuelve los bytes recuperables."""
+    user_home = user_home or os.path.expanduser("~")
+    plan = build_maintenance_plan(user_home)
+    add_duplicate_stage(plan, user_home, delete=delete_duplicates)
+    plan.save(plan_file)
+    return plan.total_bytes
+
+def execute_maintenance_plan(plan):
+    """Fase 2: elimina el plan en lotes paralelos con un log agregado por regla."""
+    report = execute_plan(plan)
+    logging.info(f"Plan ejecutado en {report.elapsed:.1f}s: {report.deleted} eliminados, "
+                 f"{report.failed} fallidos, {report.skipped} omitidos (modificados desde el plan), "
+                 f"{format_size(report.freed_bytes)} liberados")
+    for rule_id, data in report.per_rule.items():
+        logging.info(f"  {rule_id}: {data['deleted']} eliminados ({format_size(data['bytes'])}), "
+                     f"{data['failed']} fallidos, {data['skipped']} omitidos")
+    for path, error in report.failures:
+        logging.debug(f"  No se pudo eliminar {path}: {error}")
+    return report
+
+# ============================================================================
+# FUNCIÓN PRINCIPAL DE LIMPIEZA
+# ============================================================================
+
+def system_maintenance(plan_file=None, delete_duplicates=False):
+    """
+    Realiza el mantenimiento completo del sistema.
+    Si se indica plan_file, ejecuta ese plan (p. ej. el mostrado en la vista previa del GUI)
+    en lugar de planificar de nuevo; los duplicados también se toman de ese plan.
+    Con delete_duplicates, las copias duplicadas que cumplen las reglas de seguridad
+    se agregan al plan; si no, solo se informan.
+    """
+
+    start_time = time.time()
+    total_freed = 0
+
+    # Mostrar notificación de inicio
+    show_notification("🔧 Iniciando limpieza profunda del sistema...\nPor favor espere...", bg_color="#0066CC", duration=3000)
+
+    logging.info("=" * 70)
+    logging.info("INICIANDO LIMPIEZA PROFUNDA DEL SISTEMA")
+    logging.info(f"Usuario: gustavo85")
+    logging.info(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    logging.info("=" * 70)
 
     # ========================================================================
-    # 9. LIMPIEZA DE THUMBNAILS E ICONOS
+    # 1. PLAN: TEMPORALES, CACHÉS, NAVEGADORES, APLICACIONES, GPU, REPORTES,
+    #    DEFENDER Y PERFIL (TEMPORALES, 0 BYTES, ANTIGUOS, CARPETAS VACÍAS)
     # ========================================================================
-    logging.info("\n[9/14] Limpiando caché de miniaturas e iconos...")
-    total_freed += clean_thumbnail_cache()
+    user_home = os.path.expanduser("~")
+    plan = None
+    plan_loaded = False
+    if plan_file and os.path.exists(plan_file):
+        logging.info(f"\n[1/9] Cargando plan de limpieza: {plan_file}")
+        try:
+            plan = DeletionPlan.load(plan_file)
+            plan_loaded = True
+        except (OSError, ValueError) as e:
+            logging.warning(f"Plan inválido, se planifica de nuevo: {e}")
+    if plan is None:
+        logging.info("\n[1/9] Planificando limpieza...")
+        plan = build_maintenance_plan(user_home)
 
     # ========================================================================
-    # 10. LIMPIEZA DE WINDOWS DEFENDER
+    # 2. ARCHIVOS DUPLICADOS EN DOWNLOADS Y DESKTOP
     # ========================================================================
-    logging.info("\n[10/14] Limpiando archivos de Windows Defender...")
-    total_freed += clean_windows_defender()
+    if plan_loaded:
+        # La simulación que generó el plan ya hizo la búsqueda (tamaño, hash parcial y completo)
+        # y agregó las copias "duplicados": repetirla volvería a leer cada archivo grande
+        logging.info("\n[2/9] Duplicados: incluidos en el plan cargado")
+    else:
+        logging.info("\n[2/9] Buscando archivos duplicados...")
+        add_duplicate_stage(plan, user_home, delete=delete_duplicates)
 
     # ========================================================================
-    # 11. LIMPIEZA DE LOGS DEL SISTEMA
+    # 3. LIMPIEZA DE PREFETCH (OPTIMIZADO)
     # ========================================================================
-    logging.info("\n[11/14] Limpiando logs del sistema...")
+    logging.info("\n[3/9] Optimizando Prefetch...")
+    if is_admin():
+        total_freed += optimize_prefetch()
+
+    # ========================================================================
+    # 4. LIMPIEZA DE WINDOWS UPDATE (CON DISM)
+    # ========================================================================
+    logging.info("\n[4/9] Limpiando archivos de Windows Update...")
+    total_freed += clean_windows_update()
+
+    # ========================================================================
+    # 5. EJECUCIÓN DEL PLAN (LOTES PARALELOS)
+    # ========================================================================
+    logging.info("\n[5/9] Eliminando según el plan...")
+    report = execute_maintenance_plan(plan)
+    total_freed += report.freed_bytes
+
+    # ========================================================================
+    # 6. LIMPIEZA DE THUMBNAILS E ICONOS
+    # ========================================================================
+    logging.info("\n[6/9] Limpiando caché de miniaturas e iconos...")
+    total_freed += clean_thumbnail_cache()
+
+    # ========================================================================
+    # 7. LIMPIEZA DE LOGS DEL SISTEMA
+    # ========================================================================
+    logging.info("\n[7/9] Limpiando logs del sistema...")
     total_freed += clean_system_logs()
 
     # ========================================================================
-    # 12. LIMPIEZA DE ARCHIVOS TEMPORALES GLOBALES
+    # 8. LIMPIEZA DE ARCHIVOS TEMPORALES GLOBALES
     # ========================================================================
-    logging.info("\n[12/14] Limpiando archivos temporales globales...")
+    logging.info("\n[8/9] Limpiando archivos temporales globales...")
+    # Los patrones del perfil (*.tmp, *.temp) ya forman parte del plan
     global_patterns = [
-        os.path.join(os.environ.get('USERPROFILE', ''), '**', '*.tmp'),
-        os.path.join(os.environ.get('USERPROFILE', ''), '**', '*.temp'),
         r'C:\*.dmp',
         r'C:\Windows\*.log',
     ]
@@ -857,25 +948,10 @@ def system_maintenance():
     for pattern in global_patterns:
         total_freed = clean_files(pattern, total_freed)
 
-    # Limpiar archivos de 0 bytes
-    user_home = os.path.expanduser("~")
-    zero_count = clean_zero_byte_files(user_home)
-    logging.info(f"Archivos de 0 bytes eliminados: {zero_count}")
-
-    # ========================================================================
-    # 13. LIMPIEZA DE ARCHIVOS ANTIGUOS EN DOWNLOADS Y DESKTOP
-    # ========================================================================
-    logging.info("\n[13/14] Limpiando archivos antiguos de Downloads y Desktop...")
-    downloads_path = os.path.join(user_home, "Downloads")
-    desktop_path = os.path.join(user_home, "Desktop")
-
-    total_freed += clean_old_large_files(downloads_path, days=60, min_size_mb=100)
-    total_freed += clean_old_large_files(desktop_path, days=90, min_size_mb=100)
-
     # ========================================================================
-    # 14. LIMPIEZA DEL SISTEMA
+    # 9. LIMPIEZA DEL SISTEMA
     # ========================================================================
-    logging.info("\n[14/14] Limpieza del sistema...")
+    logging.info("\n[9/9] Limpieza del sistema...")
 
     # Vaciar papelera
     empty_recycle_bin()
@@ -891,10 +967,6 @@ def system_maintenance():
     if is_admin():
         clean_windows_registry()
 
-    # Eliminar directorios vacíos
-    removed_dirs = remove_empty_dirs(user_home)
-    logging.info(f"Directorios vacíos eliminados: {removed_dirs}")
-
     # ========================================================================
     # RESUMEN FINAL
     # ========================================================================
@@ -935,7 +1007,24 @@ def system_maintenance():
 # PUNTO DE ENTRADA
 # ============================================================================
 
-if __name__ == "__main__":
+def _arg_value(flag):
+    """Valor que sigue a una bandera de la línea de comandos (o None)."""
+    if flag in sys.argv:
+        index = sys.argv.index(flag) + 1
+        if index < len(sys.argv) and not sys.argv[index].startswith("--"):
+            return sys.argv[index]
+    return None
+
+def main():
+    """Punto de entrada: --dry-run [archivo], --plan <archivo>, --delete-duplicates. Retorna el código de salida."""
+    # Simulación: solo guarda el plan y el espacio recuperable, sin borrar nada
+    if "--dry-run" in sys.argv:
+        dry_run_file = _arg_value("--dry-run") or plan_file_default
+        reclaimable = save_maintenance_plan(dry_run_file,
+                                            delete_duplicates="--delete-duplicates" in sys.argv)
+        print(f"Simulación: {format_size(reclaimable)} recuperables. Plan guardado en {dry_run_file}")
+        return 0
+
     try:
         # Verificar si se ejecuta con privilegios de administrador
         if is_admin():
@@ -944,16 +1033,21 @@ if __name__ == "__main__":
             logging.warning("⚠ Ejecutando sin privilegios de administrador. Algunas operaciones pueden fallar.")
             logging.warning("  Recomendación: Ejecutar como administrador para limpieza completa.")
 
-        # Ejecutar limpieza
-        system_maintenance()
+        # Ejecutar limpieza (con --plan se ejecuta un plan ya revisado)
+        system_maintenance(plan_file=_arg_value("--plan"),
+                           delete_duplicates="--delete-duplicates" in sys.argv)
+        return 0
 
     except KeyboardInterrupt:
         logging.info("\n\nLimpieza interrumpida por el usuario.")
         show_notification("⚠️ Limpieza interrumpida por el usuario", bg_color="#FF8C00", duration=3000)
         time.sleep(4)
-        sys.exit(0)
+        return 0
     except Exception as e:
         logging.error(f"Error crítico durante la limpieza: {e}", exc_info=True)
         show_notification(f"❌ Error durante la limpieza:\n{str(e)[:100]}", bg_color="#8B0000", duration=5000)
         time.sleep(6)
-        sys.exit(1)
\ No newline at end of file
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
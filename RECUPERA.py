@@ -6,10 +6,54 @@ import threading
 import ctypes
 import json
 import shutil
+import sys
+import time
+
+from chunk_store import ChunkStore, restore_generation
+from reg_diff import restore_reg_file
+from registry_access import get_registry, normalize_key
+from task_graph import TaskGraph, TaskJournal
+
+# Tareas de restauración simultáneas
+RESTORE_WORKERS = 6
+
+# Solo un .reg pesado a la vez (user_hkcu.reg, system_control.reg, clases...)
+RESTORE_LIMITS = {"pesado": 1}
+HEAVY_REG_BYTES = 20 * 1024 * 1024
+
+# Timeouts en segundos (el proceso se corta al vencer; la tarea cuenta como fallida)
+REG_IMPORT_TIMEOUT = 300
+HEAVY_REG_IMPORT_TIMEOUT = 1200
+SPECIAL_TASK_TIMEOUT = 600
+COMMAND_TIMEOUT = 300
+
+def reg_file_root(filepath):
+    """Primera clave de un .reg exportado (la raíz exportada), normalizada; None si no se puede leer."""
+    try:
+        with open(filepath, 'rb') as f:
+            head = f.read(64 * 1024)
+    except OSError:
+        return None
+    encoding = 'utf-16' if head[:2] in (b'\xff\xfe', b'\xfe\xff') else 'latin-1'
+    # Cortar en un límite de carácter para UTF-16
+    text = head[:len(head) - len(head) % 2].decode(encoding, errors='ignore')
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('[') and line.endswith(']'):
+            return normalize_key(line[1:-1].lstrip('-'))
+    return None
+
+def keys_overlap(a, b):
+    """Una clave contiene a la otra (importarlas en paralelo dejaría el resultado según quién termine último)."""
+    return a == b or a.startswith(b + '\\') or b.startswith(a + '\\')
 
 class RestoreApp:
-    def __init__(self, root):
+    def __init__(self, root, generation=None, differential=True):
         self.root = root
+        self.generation = generation
+        self.differential = differential
+        self.diff_reports = []
+        self.report_lock = threading.Lock()
         self.root.title("Herramienta de Restauración Completa")
         window_width = 500
         window_height = 180
@@ -60,13 +104,48 @@ class RestoreApp:
         self.completion_button.config(state=tk.NORMAL)
         self.root.protocol("WM_DELETE_WINDOW", self.root.destroy)
 
-    def run_command(self, command):
+    def run_command(self, command, timeout=COMMAND_TIMEOUT):
         try:
-            subprocess.run(command, shell=True, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, creationflags=subprocess.CREATE_NO_WINDOW)
+            subprocess.run(command, shell=True, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, creationflags=subprocess.CREATE_NO_WINDOW, timeout=timeout)
             return True
         except:
             return False
 
+    def import_reg_file(self, filepath, timeout):
+        """
+        Restauración diferencial: compara el .reg con el registro actual y escribe
+        solo lo que cambió. Si no se puede (winreg no disponible, .reg ilegible),
+        se usa reg import completo.
+
+        La diferencial respeta el mismo timeout: al vencer se detiene entre dos
+        escrituras y la tarea falla (el journal la deja pendiente para la próxima
+        ejecución). Así el hilo no sigue escribiendo cuando el grafo ya lanzó
+        las tareas dependientes con claves superpuestas.
+        """
+        if self.differential:
+            try:
+                changes = restore_reg_file(filepath, get_registry(), deadline=time.monotonic() + timeout)
+            except (ImportError, OSError, ValueError):
+                changes = None
+            if changes is not None:
+                with self.report_lock:
+                    self.diff_reports.append(changes)
+                return not changes.failed and not changes.timed_out
+        return self.run_command(f'reg import "{filepath}"', timeout=timeout)
+
+    def write_restore_report(self, base_dir, report):
+        """Informe de lo que realmente se revirtió en cada .reg"""
+        try:
+            total = sum(len(changes) for changes in self.diff_reports)
+            with open(os.path.join(base_dir, "restore_report.txt"), 'w', encoding='utf-8') as f:
+                f.write(f"Restauración: {report.elapsed:.1f}s, {total} cambios en el registro\n")
+                if report.failed:
+                    f.write(f"Tareas fallidas: {', '.join(report.failed)}\n")
+                for changes in sorted(self.diff_reports, key=lambda c: c.source):
+                    f.write("\n" + changes.format_report() + "\n")
+        except OSError:
+            pass
+
     def restore_network_profiles(self, backup_dir):
         network_dir = os.path.join(backup_dir, "network_profiles")
         try:
@@ -121,21 +200,50 @@ class RestoreApp:
         except:
             pass
 
+    def resolve_backup_dir(self, base_dir):
+        """
+        Carpeta a restaurar: backup/ (último backup) o, si se pidió una generación
+        o backup/ no existe, la generación reconstruida desde backup_store/.
+        """
+        backup_dir = os.path.join(base_dir, "backup")
+        store_dir = os.path.join(base_dir, "backup_store")
+        if self.generation is None and os.path.exists(backup_dir):
+            return backup_dir
+        generaciones = ChunkStore(store_dir).list_generations()
+        if not generaciones:
+            return backup_dir
+        if self.generation is not None and self.generation not in generaciones:
+            messagebox.showerror("Error", f"La generación '{self.generation}' no existe en el almacén.")
+            self.root.destroy()
+            return None
+        self.update_progress(0, "Reconstruyendo backup desde el almacén", self.generation or "Última generación")
+        target_dir = os.path.join(base_dir, "backup_restaurado")
+        try:
+            if restore_generation(store_dir, self.generation, target_dir):
+                return target_dir
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"No se pudo reconstruir la generación: {e}")
+        self.root.destroy()
+        return None
+
     def run_restore_process(self):
         base_dir = os.path.dirname(os.path.abspath(__file__))
-        backup_dir = os.path.join(base_dir, "backup")
+        backup_dir = self.resolve_backup_dir(base_dir)
+        if backup_dir is None:
+            return
 
         if not os.path.exists(backup_dir):
             messagebox.showerror("Error", f"El directorio de backup '{backup_dir}' no fue encontrado.")
             self.root.destroy()
             return
 
+        backup_date = "Desconocido"
         manifest_file = os.path.join(backup_dir, "backup_manifest.json")
         if os.path.exists(manifest_file):
             try:
                 with open(manifest_file, 'r', encoding='utf-8') as f:
                     manifest = json.load(f)
-                    backup_date = manifest.get("backup_date", "Desconocido")
+                    backup_date = manifest.get("backup_date", backup_date)
                     self.update_progress(0, f"Restaurando backup del {backup_date}", "Verificando archivos...")
             except:
                 pass
@@ -188,52 +296,90 @@ class RestoreApp:
             pass
 
         tasks_to_run = sorted(all_backup_files, key=lambda x: restore_priority.index(x) if x in restore_priority else len(restore_priority))
+        restore_files = [f for f in tasks_to_run if f.lower().endswith('.reg') or f.lower() == 'bcd_backup']
 
-        special_tasks = [
-            ("Red: Perfiles WiFi", lambda: self.restore_network_profiles(backup_dir)),
-            ("Red: Firewall", lambda: self.restore_firewall_rules(backup_dir)),
-            ("Red: Hosts File", lambda: self.restore_hosts_file(backup_dir)),
-            ("Energía: Plan", lambda: self.restore_power_scheme(backup_dir)),
-        ]
-
-        total_files = len(tasks_to_run)
-        total_tasks = total_files + len(special_tasks)
-
-        if total_files == 0:
+        if not restore_files:
             messagebox.showwarning("Advertencia", "No se encontraron archivos de backup para restaurar.")
             self.root.destroy()
             return
 
-        current_task = 0
-
-        for filename in tasks_to_run:
-            filepath = os.path.join(backup_dir, filename)
-            current_task += 1
-            
-            try:
-                if filename.lower().endswith('.reg'):
-                    message = f"[{current_task}/{total_tasks}] Registro: {filename}"
-                    self.update_progress((current_task / total_tasks) * 100, message, "Importando...")
-                    self.run_command(f'reg import "{filepath}"')
-                
-                elif filename.lower() == 'bcd_backup':
-                    message = f"[{current_task}/{total_tasks}] BCD"
-                    self.update_progress((current_task / total_tasks) * 100, message, "Importando configuración de arranque...")
-                    self.run_command(f'bcdedit /import "{filepath}"')
-            except:
-                pass
+        graph = self.build_restore_graph(backup_dir, restore_files)
+
+        # Journal: si una restauración anterior del mismo backup se cortó, se retoma
+        journal = TaskJournal(os.path.join(base_dir, "restore_journal.jsonl"), f"{backup_dir}|{backup_date}")
+        completed = journal.open()
+
+        total_tasks = len(graph)
+        running = []
+        finished = [0]
+
+        def on_start(task):
+            running.append(task.name)
+            self.update_progress((finished[0] / total_tasks) * 100,
+                                 f"[{finished[0]}/{total_tasks}] {task.name}", f"En curso: {len(running)} tareas")
+
+        def on_finish(result):
+            journal.record(result)
+            if result.name in running:
+                running.remove(result.name)
+            finished[0] += 1
+            current = running[-1] if running else result.name
+            self.update_progress((finished[0] / total_tasks) * 100,
+                                 f"[{finished[0]}/{total_tasks}] {current}", f"{result.name}: {result.status}")
+
+        if completed:
+            self.update_progress(0, "Reanudando restauración", f"{len(completed)} tareas ya restauradas")
+        report = graph.run(on_start=on_start, on_finish=on_finish, completed=completed)
+        # Con fallos el journal se conserva: la próxima ejecución solo reintenta lo pendiente
+        journal.close(finished=not report.failed)
+        self.write_restore_report(base_dir, report)
+
+        detail = "Se recomienda reiniciar el equipo"
+        if report.failed:
+            detail = f"{len(report.failed)} tareas fallaron (se reintentan en la próxima ejecución). {detail}"
+        self.update_progress(100, "✓ Restauración completada", detail)
+        self.show_completion()
 
-        for task_name, task_func in special_tasks:
-            current_task += 1
-            try:
-                message = f"[{current_task}/{total_tasks}] {task_name}"
-                self.update_progress((current_task / total_tasks) * 100, message, "Procesando...")
-                task_func()
-            except:
-                pass
+    def build_restore_graph(self, backup_dir, restore_files):
+        """
+        Grafo de restauración: los .reg cuyas claves se solapan se importan en el
+        orden de prioridad; el resto, y las tareas especiales, en paralelo.
+        """
+        graph = TaskGraph(max_workers=RESTORE_WORKERS, limits=RESTORE_LIMITS, skip_on_failure=False)
+        imported = []  # (tarea, clave raíz) en orden de prioridad
+        task_by_file = {}
 
-        self.update_progress(100, "✓ Restauración completada", "Se recomienda reiniciar el equipo")
-        self.show_completion()
+        for filename in restore_files:
+            filepath = os.path.join(backup_dir, filename)
+            if filename.lower() == 'bcd_backup':
+                graph.add("BCD", lambda path=filepath: self.run_command(f'bcdedit /import "{path}"'),
+                          timeout=REG_IMPORT_TIMEOUT + 30)
+                continue
+
+            heavy = os.path.getsize(filepath) >= HEAVY_REG_BYTES
+            timeout = HEAVY_REG_IMPORT_TIMEOUT if heavy else REG_IMPORT_TIMEOUT
+            root_key = reg_file_root(filepath)
+            name = f"Registro: {filename}"
+            deps = [task for task, key in imported
+                    if root_key is None or key is None or keys_overlap(root_key, key)]
+            graph.add(name, lambda path=filepath, limit=timeout: self.import_reg_file(path, limit),
+                      deps=deps, resources=("pesado",) if heavy else (), priority=10 if heavy else 0,
+                      timeout=timeout + 30)
+            imported.append((name, root_key))
+            task_by_file[filename] = name
+
+        # Tareas especiales: después de los .reg que configuran su servicio, si existen
+        services = [task_by_file[f] for f in ("services_backup.reg",) if f in task_by_file]
+        power = [task_by_file[f] for f in ("system_control.reg",) if f in task_by_file]
+        special_tasks = [
+            ("Red: Perfiles WiFi", lambda: self.restore_network_profiles(backup_dir), services),
+            ("Red: Firewall", lambda: self.restore_firewall_rules(backup_dir), services),
+            ("Red: Hosts File", lambda: self.restore_hosts_file(backup_dir), []),
+            ("Energía: Plan", lambda: self.restore_power_scheme(backup_dir), power),
+        ]
+        for name, func, deps in special_tasks:
+            graph.add(name, func, deps=deps, timeout=SPECIAL_TASK_TIMEOUT)
+        return graph
 
 def is_admin():
     try:
@@ -243,8 +389,14 @@ def is_admin():
 
 if __name__ == "__main__":
     if is_admin():
+        # --generation <id> restaura una generación del almacén en lugar de backup/
+        generation = None
+        if "--generation" in sys.argv:
+            index = sys.argv.index("--generation") + 1
+            generation = sys.argv[index] if index < len(sys.argv) else None
         root = tk.Tk()
-        app = RestoreApp(root)
+        # --full-import: reg import de cada archivo completo (sin comparar con el registro actual)
+        app = RestoreApp(root, generation=generation, differential="--full-import" not in sys.argv)
         root.mainloop()
     else:
         root = tk.Tk()
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""
+benchmarks - Suite de benchmarks reproducibles del optimizador
+Ejecuta las rutas críticas de los modos contra una tabla de procesos sintética y
+un backend falso de psutil/win32 (sin tocar procesos reales), y contra árboles de
+archivos generados en un directorio temporal. Uso: python -m benchmarks.run
+"""
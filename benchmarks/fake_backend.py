@@ -0,0 +1,474 @@
+# -*- coding: utf-8 -*-
+"""
+fake_backend.py - Backend falso de psutil, pywin32, winreg y ctypes de Windows
+Reemplaza los módulos en sys.modules por implementaciones respaldadas por una
+tabla de procesos sintética y cuenta cada llamada que, en Windows, sería una
+llamada al sistema. Debe instalarse antes de importar cualquier módulo del
+optimizador.
+"""
+
+import ctypes
+import os
+import random
+import sys
+import types
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+# Constantes de prioridad con los valores de Windows
+IDLE_PRIORITY_CLASS = 0x40
+BELOW_NORMAL_PRIORITY_CLASS = 0x4000
+NORMAL_PRIORITY_CLASS = 0x20
+ABOVE_NORMAL_PRIORITY_CLASS = 0x8000
+HIGH_PRIORITY_CLASS = 0x80
+REALTIME_PRIORITY_CLASS = 0x100
+IOPRIO_VERYLOW, IOPRIO_LOW, IOPRIO_NORMAL, IOPRIO_HIGH = 0, 1, 2, 3
+
+# Nombres de la tabla sintética: los primeros se repiten mucho (navegadores, servicios)
+PROCESS_NAMES = (
+    ["chrome.exe"] * 12 + ["svchost.exe"] * 10 + ["msedge.exe"] * 6 + ["code.exe"] * 4 +
+    ["discord.exe"] * 3 + ["steam.exe", "steamwebhelper.exe", "explorer.exe", "spotify.exe",
+     "onedrive.exe", "teams.exe", "runtimebroker.exe", "conhost.exe", "dllhost.exe",
+     "searchhost.exe", "nvcontainer.exe", "audiodg.exe", "ctfmon.exe", "python.exe",
+     "game.exe", "obs64.exe", "slack.exe", "notepad.exe", "taskmgr.exe", "lsass.exe"]
+)
+
+scputimes = namedtuple('scputimes', ['user', 'system', 'idle', 'interrupt', 'dpc'])
+pcputimes = namedtuple('pcputimes', ['user', 'system', 'children_user', 'children_system'])
+pmem = namedtuple('pmem', ['rss', 'vms'])
+sdiskio = namedtuple('sdiskio', ['read_count', 'write_count', 'read_bytes', 'write_bytes'])
+snetio = namedtuple('snetio', ['bytes_sent', 'bytes_recv', 'packets_sent', 'packets_recv'])
+svmem = namedtuple('svmem', ['total', 'available', 'percent', 'used', 'free'])
+
+
+class FakeSystem:
+    """
+    Tabla de procesos sintética y reproducible
+
+    Args:
+        process_count: Cantidad de procesos
+        seed: Semilla del generador (misma semilla = misma tabla)
+        logical_cpus: Núcleos lógicos reportados
+    """
+
+    def __init__(self, process_count: int = 100, seed: int = 1234, logical_cpus: int = 16):
+        self.random = random.Random(seed)
+        self.logical_cpus = logical_cpus
+        self.calls: Counter = Counter()
+        self.names: Dict[int, str] = {}
+        self.ppids: Dict[int, int] = {}
+        self.create_times: Dict[int, float] = {}
+        self.cpu_times: Dict[int, float] = {}
+        self.priorities: Dict[int, int] = {}
+        self.affinities: Dict[int, List[int]] = {}
+        self.io_priorities: Dict[int, int] = {}
+        self._next_pid = 100
+        self._clock = 1_700_000_000.0
+        self.foreground_pid = 0
+
+        self._add(4, "System", 0)
+        for _ in range(process_count - 1):
+            self.spawn()
+        self.foreground_pid = self.pids_by_name("game.exe")[0] if self.pids_by_name("game.exe") else self.pids()[-1]
+
+    def _add(self, pid: int, name: str, ppid: int) -> None:
+        self._clock += 0.5
+        self.names[pid] = name
+        self.ppids[pid] = ppid
+        self.create_times[pid] = self._clock
+        self.cpu_times[pid] = self.random.random() * 100
+        self.priorities[pid] = NORMAL_PRIORITY_CLASS
+        self.affinities[pid] = list(range(self.logical_cpus))
+        self.io_priorities[pid] = IOPRIO_NORMAL
+
+    def spawn(self, name: Optional[str] = None) -> int:
+        """Crea un proceso hijo de uno existente (o de System)"""
+        pid = self._next_pid
+        self._next_pid += 4
+        existentes = self.pids()
+        # Árboles poco profundos: la mayoría cuelga de pocos padres
+        ppid = self.random.choice(existentes[:32]) if existentes else 0
+        self._add(pid, name or self.random.choice(PROCESS_NAMES), ppid)
+        return pid
+
+    def kill(self, pid: int) -> None:
+        for tabla in (self.names, self.ppids, self.create_times, self.cpu_times,
+                      self.priorities, self.affinities, self.io_priorities):
+            tabla.pop(pid, None)
+
+    def churn(self, fraction: float = 0.05) -> None:
+        """Termina y crea una fracción de procesos (simula actividad entre ticks)"""
+        candidatos = [pid for pid in self.pids() if pid != 4 and pid != self.foreground_pid]
+        cantidad = int(len(candidatos) * fraction)
+        for pid in self.random.sample(candidatos, cantidad):
+            self.kill(pid)
+        for _ in range(cantidad):
+            self.spawn()
+
+    def advance(self, seconds: float = 1.0) -> None:
+        """Avanza el tiempo de CPU de todos los procesos"""
+        for pid in self.cpu_times:
+            self.cpu_times[pid] += self.random.random() * seconds * 0.1
+
+    def pids(self) -> List[int]:
+        return list(self.names)
+
+    def pids_by_name(self, name: str) -> List[int]:
+        return [pid for pid, nombre in self.names.items() if nombre == name]
+
+    @property
+    def syscalls(self) -> int:
+        return sum(self.calls.values())
+
+
+class FakeBackend:
+    """Conjunto de módulos falsos que leen siempre del FakeSystem vigente"""
+
+    def __init__(self, system: Optional[FakeSystem] = None):
+        self.system = system or FakeSystem()
+        self.psutil = self._build_psutil()
+        self.modules = {
+            'psutil': self.psutil,
+            'win32api': self._build_win32api(),
+            'win32con': _constants_module('win32con'),
+            'win32gui': self._build_win32gui(),
+            'win32process': self._build_win32process(),
+            'winreg': _build_winreg(),
+        }
+        self._saved_modules: Dict[str, Optional[types.ModuleType]] = {}
+        self._saved_ctypes: Dict[str, object] = {}
+
+    def load(self, system: FakeSystem) -> None:
+        """Cambia la tabla de procesos sin reinstalar los módulos"""
+        self.system = system
+
+    def count(self, name: str) -> None:
+        self.system.calls[name] += 1
+
+    # --- psutil ---
+
+    def _build_psutil(self) -> types.ModuleType:
+        backend = self
+        mod = types.ModuleType('psutil')
+        mod.__dict__.update(
+            IDLE_PRIORITY_CLASS=IDLE_PRIORITY_CLASS,
+            BELOW_NORMAL_PRIORITY_CLASS=BELOW_NORMAL_PRIORITY_CLASS,
+            NORMAL_PRIORITY_CLASS=NORMAL_PRIORITY_CLASS,
+            ABOVE_NORMAL_PRIORITY_CLASS=ABOVE_NORMAL_PRIORITY_CLASS,
+            HIGH_PRIORITY_CLASS=HIGH_PRIORITY_CLASS,
+            REALTIME_PRIORITY_CLASS=REALTIME_PRIORITY_CLASS,
+            IOPRIO_VERYLOW=IOPRIO_VERYLOW, IOPRIO_LOW=IOPRIO_LOW,
+            IOPRIO_NORMAL=IOPRIO_NORMAL, IOPRIO_HIGH=IOPRIO_HIGH,
+        )
+
+        class Error(Exception):
+            pass
+
+        class NoSuchProcess(Error):
+            def __init__(self, pid=None, name=None, msg=None):
+                super().__init__(msg or f"process no longer exists (pid={pid})")
+                self.pid = pid
+
+        class AccessDenied(Error):
+            pass
+
+        class ZombieProcess(NoSuchProcess):
+            pass
+
+        class TimeoutExpired(Error):
+            pass
+
+        class Process:
+            def __init__(self, pid=None):
+                self.pid = os.getpid() if pid is None else pid
+                backend.count('OpenProcess')
+                self._check()
+                self._create_time = backend.system.create_times[self.pid]
+
+            def _check(self):
+                sistema = backend.system
+                if self.pid not in sistema.names:
+                    raise NoSuchProcess(self.pid)
+                if getattr(self, '_create_time', None) not in (None, sistema.create_times[self.pid]):
+                    raise NoSuchProcess(self.pid)
+
+            def _call(self, name):
+                backend.count(f"Process.{name}")
+                self._check()
+
+            def name(self):
+                self._call('name')
+                return backend.system.names[self.pid]
+
+            def ppid(self):
+                self._call('ppid')
+                return backend.system.ppids[self.pid]
+
+            def create_time(self):
+                self._call('create_time')
+                return backend.system.create_times[self.pid]
+
+            def nice(self, value=None):
+                if value is None:
+                    self._call('nice.get')
+                    return backend.system.priorities[self.pid]
+                self._call('nice.set')
+                backend.system.priorities[self.pid] = value
+
+            def cpu_affinity(self, cpus=None):
+                if cpus is None:
+                    self._call('cpu_affinity.get')
+                    return list(backend.system.affinities[self.pid])
+                self._call('cpu_affinity.set')
+                backend.system.affinities[self.pid] = list(cpus)
+
+            def ionice(self, value=None):
+                if value is None:
+                    self._call('ionice.get')
+                    return backend.system.io_priorities[self.pid]
+                self._call('ionice.set')
+                backend.system.io_priorities[self.pid] = value
+
+            def cpu_times(self):
+                self._call('cpu_times')
+                return pcputimes(backend.system.cpu_times[self.pid], 0.0, 0.0, 0.0)
+
+            def memory_info(self):
+                self._call('memory_info')
+                return pmem(50 * 1024 * 1024, 100 * 1024 * 1024)
+
+            def cpu_percent(self, interval=None):
+                self._call('cpu_percent')
+                return 0.0
+
+            def children(self, recursive=False):
+                self._call('children')
+                sistema = backend.system
+                hijos = [pid for pid, ppid in sistema.ppids.items() if ppid == self.pid and pid != self.pid]
+                resultado = [Process(pid) for pid in hijos]
+                if recursive:
+                    for hijo in list(resultado):
+                        resultado.extend(hijo.children(recursive=True))
+                return resultado
+
+            def is_running(self):
+                return self.pid in backend.system.names
+
+            def terminate(self):
+                self._call('terminate')
+                backend.system.kill(self.pid)
+
+            kill = terminate
+
+            def wait(self, timeout=None):
+                return 0
+
+        def process_iter(attrs=None, ad_value=None):
+            backend.count('process_iter')
+            sistema = backend.system
+            for pid in sistema.pids():
+                backend.count('process_iter.entry')
+                proc = Process.__new__(Process)
+                proc.pid = pid
+                proc._create_time = sistema.create_times[pid]
+                if attrs:
+                    proc.info = _process_info(sistema, pid, attrs)
+                yield proc
+
+        mod.__dict__.update(
+            Error=Error, NoSuchProcess=NoSuchProcess, AccessDenied=AccessDenied,
+            ZombieProcess=ZombieProcess, TimeoutExpired=TimeoutExpired,
+            Process=Process, process_iter=process_iter,
+            pid_exists=lambda pid: pid in backend.system.names,
+            pids=lambda: backend.system.pids(),
+            cpu_count=lambda logical=True: backend.system.logical_cpus if logical else backend.system.logical_cpus // 2,
+            cpu_percent=lambda interval=None, percpu=False: (
+                [10.0] * backend.system.logical_cpus if percpu else 10.0
+            ),
+            cpu_times=lambda percpu=False: (
+                [scputimes(100.0, 50.0, 1000.0, 1.0, 1.0)] * backend.system.logical_cpus
+                if percpu else scputimes(1600.0, 800.0, 16000.0, 16.0, 16.0)
+            ),
+            disk_io_counters=lambda perdisk=False: sdiskio(1000, 1000, 10 ** 9, 10 ** 9),
+            net_io_counters=lambda pernic=False: snetio(10 ** 8, 10 ** 9, 10 ** 5, 10 ** 6),
+            virtual_memory=lambda: svmem(16 * 2 ** 30, 8 * 2 ** 30, 50.0, 8 * 2 ** 30, 8 * 2 ** 30),
+            sensors_battery=lambda: None,
+            sensors_temperatures=lambda: {},
+            win_service_iter=lambda: iter(()),
+            boot_time=lambda: 1_700_000_000.0,
+        )
+
+        def faltante(name):
+            raise AttributeError(f"fake psutil no implementa '{name}'")
+
+        mod.__getattr__ = faltante
+        return mod
+
+    # --- pywin32 ---
+
+    def _build_win32api(self) -> types.ModuleType:
+        backend = self
+        mod = _constants_module('win32api')
+
+        def open_process(access, inherit, pid):
+            backend.count('OpenProcess')
+            if pid not in backend.system.names:
+                raise OSError(87, "The parameter is incorrect")
+            return 1
+
+        mod.OpenProcess = open_process
+        mod.CloseHandle = lambda handle: backend.count('CloseHandle')
+        mod.GetCurrentProcessId = os.getpid
+        return mod
+
+    def _build_win32gui(self) -> types.ModuleType:
+        backend = self
+        mod = _constants_module('win32gui')
+        mod.GetForegroundWindow = lambda: (backend.count('GetForegroundWindow'), 0x1000)[1]
+        return mod
+
+    def _build_win32process(self) -> types.ModuleType:
+        backend = self
+        mod = _constants_module('win32process')
+        mod.ProcessMemoryPriority = 0
+        mod.GetWindowThreadProcessId = lambda hwnd: (
+            backend.count('GetWindowThreadProcessId'), (1, backend.system.foreground_pid)
+        )[1]
+        return mod
+
+    # --- instalación ---
+
+    def install(self) -> "FakeBackend":
+        """Registra los módulos falsos y las DLL falsas de ctypes"""
+        for nombre, modulo in self.modules.items():
+            self._saved_modules[nombre] = sys.modules.get(nombre)
+            sys.modules[nombre] = modulo
+        cargador = _FakeDllLoader(self)
+        for nombre, valor in (('windll', cargador), ('WinDLL', cargador.load),
+                              ('WINFUNCTYPE', getattr(ctypes, 'WINFUNCTYPE', ctypes.CFUNCTYPE))):
+            self._saved_ctypes[nombre] = getattr(ctypes, nombre, None)
+            setattr(ctypes, nombre, valor)
+        return self
+
+    def uninstall(self) -> None:
+        for nombre, modulo in self._saved_modules.items():
+            if modulo is None:
+                sys.modules.pop(nombre, None)
+            else:
+                sys.modules[nombre] = modulo
+        for nombre, valor in self._saved_ctypes.items():
+            if valor is None:
+                delattr(ctypes, nombre)
+            else:
+                setattr(ctypes, nombre, valor)
+
+
+def _process_info(sistema: FakeSystem, pid: int, attrs: Iterable[str]) -> Dict[str, object]:
+    valores = {
+        'pid': lambda: pid,
+        'ppid': lambda: sistema.ppids[pid],
+        'name': lambda: sistema.names[pid],
+        'create_time': lambda: sistema.create_times[pid],
+        'cpu_times': lambda: pcputimes(sistema.cpu_times[pid], 0.0, 0.0, 0.0),
+        'cpu_percent': lambda: 0.0,
+        'memory_info': lambda: pmem(50 * 1024 * 1024, 100 * 1024 * 1024),
+        'nice': lambda: sistema.priorities[pid],
+    }
+    return {attr: valores[attr]() if attr in valores else None for attr in attrs}
+
+
+def _constants_module(name: str) -> types.ModuleType:
+    """Módulo cuyos atributos desconocidos en MAYÚSCULAS valen 0"""
+    mod = types.ModuleType(name)
+
+    def constante(attr):
+        if attr.isupper():
+            return 0
+        raise AttributeError(f"fake {name} no implementa '{attr}'")
+
+    mod.__getattr__ = constante
+    return mod
+
+
+def _build_winreg() -> types.ModuleType:
+    """winreg falso: constantes en 0 y cualquier operación falla como clave inexistente"""
+    mod = types.ModuleType('winreg')
+
+    def atributo(attr):
+        if attr.isupper():
+            return 0
+
+        def fallo(*args, **kwargs):
+            raise FileNotFoundError(2, "fake winreg")
+        return fallo
+
+    mod.__getattr__ = atributo
+    return mod
+
+
+class _FakeDllFunction:
+    def __init__(self, backend: FakeBackend, name: str):
+        self._backend = backend
+        self._name = name
+        self.argtypes = None
+        self.restype = None
+
+    def __call__(self, *args):
+        self._backend.count(self._name)
+        # Las funciones Nt*/Rtl* retornan NTSTATUS (0 = éxito); el resto, BOOL/HANDLE != 0
+        return 0 if self._name.split('.')[-1].startswith(('Nt', 'Rtl')) else 1
+
+
+class _FakeDll:
+    def __init__(self, backend: FakeBackend, name: str):
+        self._backend = backend
+        self._name = name.lower().replace('.dll', '')
+
+    def __getattr__(self, attr):
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        funcion = _FakeDllFunction(self._backend, f"{self._name}.{attr}")
+        setattr(self, attr, funcion)
+        return funcion
+
+
+class _FakeDllLoader:
+    def __init__(self, backend: FakeBackend):
+        self._backend = backend
+
+    def load(self, name, *args, **kwargs):
+        return _FakeDll(self._backend, name)
+
+    def __getattr__(self, attr):
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        dll = _FakeDll(self._backend, attr)
+        setattr(self, attr, dll)
+        return dll
+
+
+def install(system: Optional[FakeSystem] = None) -> FakeBackend:
+    """Crea e instala el backend falso"""
+    return FakeBackend(system).install()
+
+
+@contextmanager
+def count_fs_calls(counter: Counter):
+    """Cuenta stat/lstat/scandir/listdir/open mientras dura el bloque"""
+    nombres = ('stat', 'lstat', 'scandir', 'listdir', 'open')
+    originales = {nombre: getattr(os, nombre) for nombre in nombres}
+
+    def envolver(nombre, funcion):
+        def envoltura(*args, **kwargs):
+            counter[f"os.{nombre}"] += 1
+            return funcion(*args, **kwargs)
+        return envoltura
+
+    for nombre, funcion in originales.items():
+        setattr(os, nombre, envolver(nombre, funcion))
+    try:
+        yield counter
+    finally:
+        for nombre, funcion in originales.items():
+            setattr(os, nombre, funcion)
@@ -0,0 +1,424 @@
+# -*- coding: utf-8 -*-
+"""
+run.py - Ejecuta la suite de benchmarks y compara contra una línea base
+
+Casos (cada uno con varios tamaños):
+  agresivo.foco_frio      ajustar_prioridades_primer_plano con caché de estado vacía
+  agresivo.foco_tibio     mismo cambio de foco con la caché ya poblada
+  juego.prioridades       apply_priority_and_affinity_system
+  gui.lista_llenado       refrescar_lista_procesos con la lista vacía
+  gui.lista_diferencial   refrescar_lista_procesos tras terminar/crear el 5% de procesos
+  limpieza.tamano_carpeta get_folder_size sobre un árbol de archivos temporal
+  analitica.efectividad   PerformanceAnalytics.analyze_optimization_effectiveness
+  copia.inventario        collect_installed_programs sobre un registro en memoria
+
+Por cada caso registra el tiempo de pared (mejor de N repeticiones), las llamadas
+al sistema (contadas por el backend falso o por la envoltura de os.*) y el pico
+de memoria (tracemalloc, en una ejecución aparte para no distorsionar el tiempo).
+
+Uso:
+  python -m benchmarks.run                      tamaños rápidos, compara con la línea base
+  python -m benchmarks.run --full               hasta 5000 procesos y 1M de archivos
+  python -m benchmarks.run --update-baseline    guarda los resultados como línea base
+Sale con código 1 si algún caso empeora más allá de la tolerancia.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import fake_backend
+else:
+    from . import fake_backend
+
+RAIZ_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PREDETERMINADA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+TAMANOS_PROCESOS = [100, 1000, 5000]
+TAMANOS_ARCHIVOS = [10_000]
+TAMANOS_ARCHIVOS_FULL = [10_000, 100_000, 1_000_000]
+TAMANOS_SESIONES = [1_000, 10_000]
+TAMANOS_SESIONES_FULL = [1_000, 10_000, 100_000]
+TAMANOS_PROGRAMAS = [100, 1000]
+
+REPETICIONES = 5
+TOLERANCIA_PREDETERMINADA = 0.25
+# Diferencias menores a esto se consideran ruido del temporizador
+PISO_TIEMPO_MS = 0.5
+
+# El backend debe existir antes de importar los módulos del optimizador
+_backend = fake_backend.install()
+sys.path.insert(0, RAIZ_REPO)
+
+import process_snapshot  # noqa: E402
+
+# (preparar(tamaño) -> función a medir, contador de llamadas al sistema)
+Caso = Callable[[int], Tuple[Callable[[], object], Counter]]
+
+
+class FakeListbox:
+    """Sustituto de tk.Listbox con la misma interfaz que usa el GUI"""
+
+    def __init__(self, items: Optional[List[str]] = None):
+        self.items = list(items or [])
+        self.colors: Dict[int, dict] = {}
+
+    def get(self, first, last=None):
+        if last is None:
+            return self.items[first]
+        fin = len(self.items) if last == "end" else last + 1
+        return tuple(self.items[first:fin])
+
+    def size(self):
+        return len(self.items)
+
+    def insert(self, index, *elements):
+        posicion = len(self.items) if index == "end" else index
+        self.items[posicion:posicion] = elements
+
+    def delete(self, first, last=None):
+        fin = len(self.items) if last == "end" else (first if last is None else last)
+        del self.items[first:fin + 1]
+
+    def itemconfig(self, index, options=None, **kwargs):
+        self.colors[index] = options or kwargs
+
+    def curselection(self):
+        return ()
+
+    def yview(self, *args):
+        return (0.0, 1.0)
+
+    def yview_moveto(self, fraction):
+        pass
+
+    def selection_set(self, first, last=None):
+        pass
+
+
+def _nuevo_sistema(cantidad: int) -> fake_backend.FakeSystem:
+    """Tabla de procesos nueva y servicio de instantáneas sin estado previo"""
+    sistema = fake_backend.FakeSystem(cantidad)
+    _backend.load(sistema)
+    process_snapshot._snapshot_service = None
+    process_snapshot.get_snapshot_service().refresh()
+    return sistema
+
+
+# ============================================================================
+# CASOS
+# ============================================================================
+
+def caso_agresivo(calentar: bool) -> Caso:
+    import modoagresivo
+    from priority_state_cache import AppliedStateCache
+
+    def preparar(cantidad):
+        sistema = _nuevo_sistema(cantidad)
+        modoagresivo._estado_aplicado = AppliedStateCache()
+        lista_blanca = {"explorer.exe", "audiodg.exe"}
+        nucleos = sistema.logical_cpus
+
+        def ejecutar():
+            # Cada cambio de foco real recorre una instantánea nueva
+            process_snapshot.get_snapshot_service().refresh()
+            modoagresivo.ajustar_prioridades_primer_plano(sistema.foreground_pid, lista_blanca, nucleos)
+
+        if calentar:
+            ejecutar()
+        sistema.calls.clear()
+        return ejecutar, sistema.calls
+
+    return preparar
+
+
+def caso_juego() -> Caso:
+    import modojuego
+
+    def preparar(cantidad):
+        sistema = _nuevo_sistema(cantidad)
+        estado = modojuego.GameModeState()
+        lista_blanca = {"explorer.exe", "audiodg.exe", "discord.exe"}
+
+        def ejecutar():
+            modojuego.apply_priority_and_affinity_system(sistema.foreground_pid, lista_blanca, estado)
+
+        sistema.calls.clear()
+        return ejecutar, sistema.calls
+
+    return preparar
+
+
+def caso_gui(diferencial: bool) -> Caso:
+    import GUI
+
+    def preparar(cantidad):
+        sistema = _nuevo_sistema(cantidad)
+        GUI.lista_juegos = FakeListbox(["game.exe"])
+        GUI.lista_blanca = FakeListbox(["explorer.exe", "discord.exe"])
+        GUI.lista_ignorar = FakeListbox(["steam.exe", "discord.exe"])
+        GUI.lista_procesos = FakeListbox()
+        GUI._process_cache = {}
+
+        if diferencial:
+            GUI.refrescar_lista_procesos()
+            sistema.churn(0.05)
+
+        def ejecutar():
+            process_snapshot.get_snapshot_service().refresh()
+            GUI.refrescar_lista_procesos()
+
+        sistema.calls.clear()
+        return ejecutar, sistema.calls
+
+    return preparar
+
+
+_arboles_archivos: Dict[int, str] = {}
+
+
+def _crear_arbol_archivos(cantidad: int) -> str:
+    """Árbol con 100 archivos por carpeta y 100 carpetas por nivel (reutilizado entre repeticiones)"""
+    if cantidad in _arboles_archivos:
+        return _arboles_archivos[cantidad]
+    raiz = tempfile.mkdtemp(prefix=f"bench_archivos_{cantidad}_")
+    contenido = b"x" * 64
+    for indice in range(cantidad):
+        carpeta = os.path.join(raiz, f"d{indice // 10000:03d}", f"d{(indice // 100) % 100:02d}")
+        if indice % 100 == 0:
+            os.makedirs(carpeta, exist_ok=True)
+        with open(os.path.join(carpeta, f"f{indice}.tmp"), "wb") as f:
+            f.write(contenido[:indice % 64])
+    _arboles_archivos[cantidad] = raiz
+    return raiz
+
+
+def caso_tamano_carpeta() -> Caso:
+    import LIMPIEZA
+
+    def preparar(cantidad):
+        raiz = _crear_arbol_archivos(cantidad)
+        llamadas = Counter()
+
+        def ejecutar():
+            with fake_backend.count_fs_calls(llamadas):
+                return LIMPIEZA.get_folder_size(raiz)
+
+        return ejecutar, llamadas
+
+    return preparar
+
+
+def caso_analitica() -> Caso:
+    import random
+    from performance_analytics import PerformanceAnalytics
+
+    optimizaciones = [f"opt_{i}" for i in range(40)]
+
+    def preparar(cantidad):
+        generador = random.Random(cantidad)
+        analitica = PerformanceAnalytics(metrics_file=os.path.join(tempfile.gettempdir(), "bench_no_existe.json"))
+        analitica.metrics['sessions'] = [
+            {
+                'game': f"juego_{generador.randrange(50)}",
+                'optimizations': generador.sample(optimizaciones, 8),
+                'avg_fps': round(generador.uniform(30, 240), 2),
+            }
+            for _ in range(cantidad)
+        ]
+        return analitica.analyze_optimization_effectiveness, Counter()
+
+    return preparar
+
+
+def caso_inventario() -> Caso:
+    from program_inventory import UNINSTALL_KEYS, collect_installed_programs
+    from registry_access import DictRegistry
+
+    class RegistroContado(DictRegistry):
+        """Cuenta las lecturas (cada una era un `reg query` antes del inventario nativo)"""
+
+        def __init__(self, claves, llamadas):
+            super().__init__(claves)
+            self.llamadas = llamadas
+
+        def subkeys(self, path):
+            self.llamadas["RegEnumKey"] += 1
+            return super().subkeys(path)
+
+        def values(self, path):
+            self.llamadas["RegEnumValue"] += 1
+            return super().values(path)
+
+    def preparar(cantidad):
+        claves = {}
+        for indice in range(cantidad):
+            _, ruta = UNINSTALL_KEYS[indice % len(UNINSTALL_KEYS)]
+            claves[f"{ruta}\\{{{indice:08X}-0000}}"] = {
+                "DisplayName": f"Programa {indice}",
+                "DisplayVersion": f"{indice % 10}.{indice % 7}",
+                "Publisher": f"Editor {indice % 40}",
+                "InstallDate": "20240105",
+                "EstimatedSize": 1024 + indice,
+            }
+        llamadas = Counter()
+        registro = RegistroContado(claves, llamadas)
+        return (lambda: collect_installed_programs(registro)), llamadas
+
+    return preparar
+
+
+def construir_casos(full: bool) -> List[Tuple[str, Caso, List[int]]]:
+    archivos = TAMANOS_ARCHIVOS_FULL if full else TAMANOS_ARCHIVOS
+    sesiones = TAMANOS_SESIONES_FULL if full else TAMANOS_SESIONES
+    return [
+        ("agresivo.foco_frio", caso_agresivo(calentar=False), TAMANOS_PROCESOS),
+        ("agresivo.foco_tibio", caso_agresivo(calentar=True), TAMANOS_PROCESOS),
+        ("juego.prioridades", caso_juego(), TAMANOS_PROCESOS),
+        ("gui.lista_llenado", caso_gui(diferencial=False), TAMANOS_PROCESOS),
+        ("gui.lista_diferencial", caso_gui(diferencial=True), TAMANOS_PROCESOS),
+        ("limpieza.tamano_carpeta", caso_tamano_carpeta(), archivos),
+        ("analitica.efectividad", caso_analitica(), sesiones),
+        ("copia.inventario", caso_inventario(), TAMANOS_PROGRAMAS),
+    ]
+
+
+# ============================================================================
+# MEDICIÓN
+# ============================================================================
+
+def medir(caso: Caso, tamano: int, repeticiones: int) -> Dict[str, float]:
+    """Mejor tiempo de pared de N repeticiones, llamadas al sistema y pico de memoria"""
+    tiempos = []
+    llamadas = 0
+    detalle: Counter = Counter()
+    silencio = io.StringIO()
+
+    for _ in range(repeticiones):
+        ejecutar, contador = caso(tamano)
+        with contextlib.redirect_stdout(silencio):
+            inicio = time.perf_counter()
+            ejecutar()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        llamadas = sum(contador.values())
+        detalle = Counter(contador)
+        silencio.seek(0)
+        silencio.truncate()
+
+    # Ejecución separada con tracemalloc (su sobrecosto no entra en el tiempo)
+    ejecutar, _ = caso(tamano)
+    with contextlib.redirect_stdout(silencio):
+        tracemalloc.start()
+        try:
+            ejecutar()
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    tiempos.sort()
+    return {
+        'wall_ms': round(tiempos[0], 3),
+        'median_ms': round(tiempos[len(tiempos) // 2], 3),
+        'syscalls': llamadas,
+        'peak_kb': round(pico / 1024, 1),
+        'syscalls_detail': dict(detalle.most_common(8)),
+    }
+
+
+def comparar(resultados: Dict[str, dict], base: Dict[str, dict], tolerancia: float) -> List[str]:
+    """Lista de regresiones (tiempo, llamadas al sistema o memoria) respecto a la línea base"""
+    regresiones = []
+    for clave, actual in resultados.items():
+        anterior = base.get(clave)
+        if not anterior:
+            continue
+        limite_ms = anterior['wall_ms'] * (1 + tolerancia) + PISO_TIEMPO_MS
+        if actual['wall_ms'] > limite_ms:
+            regresiones.append(f"{clave}: tiempo {anterior['wall_ms']:.2f} -> {actual['wall_ms']:.2f} ms")
+        if actual['syscalls'] > anterior['syscalls']:
+            regresiones.append(f"{clave}: llamadas al sistema {anterior['syscalls']} -> {actual['syscalls']}")
+        if actual['peak_kb'] > anterior['peak_kb'] * (1 + tolerancia) + 64:
+            regresiones.append(f"{clave}: memoria pico {anterior['peak_kb']:.0f} -> {actual['peak_kb']:.0f} KB")
+    return regresiones
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks de las rutas críticas del optimizador")
+    parser.add_argument("--full", action="store_true", help="Incluir 100k y 1M de archivos")
+    parser.add_argument("--baseline", default=BASELINE_PREDETERMINADA, help="Archivo JSON de línea base")
+    parser.add_argument("--update-baseline", action="store_true", help="Guardar los resultados como línea base")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCIA_PREDETERMINADA,
+                        help="Empeoramiento relativo aceptado (0.25 = 25%%)")
+    parser.add_argument("--repeat", type=int, default=REPETICIONES, help="Repeticiones por caso")
+    parser.add_argument("--only", help="Ejecutar solo los casos cuyo nombre empiece así")
+    parser.add_argument("--output", help="Escribir también los resultados en este JSON")
+    args = parser.parse_args(argv)
+
+    resultados: Dict[str, dict] = {}
+    try:
+        for nombre, caso, tamanos in construir_casos(args.full):
+            if args.only and not nombre.startswith(args.only):
+                continue
+            for tamano in tamanos:
+                clave = f"{nombre}[{tamano}]"
+                datos = medir(caso, tamano, args.repeat)
+                resultados[clave] = datos
+                print(f"{clave:<36} {datos['wall_ms']:>10.2f} ms  {datos['syscalls']:>8} llamadas  "
+                      f"{datos['peak_kb']:>9.0f} KB pico")
+    finally:
+        for raiz in _arboles_archivos.values():
+            shutil.rmtree(raiz, ignore_errors=True)
+
+    informe = {
+        'python': sys.version.split()[0],
+        'platform': sys.platform,
+        'timestamp': time.time(),
+        'results': resultados,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(informe, f, indent=2)
+
+    if args.update_baseline:
+        base_existente = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                base_existente = json.load(f).get('results', {})
+        base_existente.update(resultados)
+        informe['results'] = base_existente
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(informe, f, indent=2)
+        print(f"Línea base actualizada: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"Sin línea base en {args.baseline} (usar --update-baseline para crearla)")
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        base = json.load(f).get('results', {})
+    regresiones = comparar(resultados, base, args.tolerance)
+    if regresiones:
+        print("\n" + "!" * 70)
+        print(f"REGRESIONES DETECTADAS ({len(regresiones)}):")
+        for linea in regresiones:
+            print(f"  - {linea}")
+        print("!" * 70)
+        return 1
+    print(f"\nSin regresiones respecto a {args.baseline} (tolerancia {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -59,6 +59,28 @@ def build_with_nuitka():
         "--include-data-file=RECUPERA.py=RECUPERA.py",
         "--include-data-file=COPIA.py=COPIA.py",
         "--include-data-file=entradas.py=entradas.py",
+        "--include-data-file=process_snapshot.py=process_snapshot.py",
+        "--include-data-file=priority_state_cache.py=priority_state_cache.py",
+        "--include-data-file=foreground_events.py=foreground_events.py",
+        "--include-data-file=task_scheduler.py=task_scheduler.py",
+        "--include-data-file=mode_state.py=mode_state.py",
+        "--include-data-file=cpu_sampler.py=cpu_sampler.py",
+        "--include-data-file=demand_estimator.py=demand_estimator.py",
+        "--include-data-file=instrumentation.py=instrumentation.py",
+        "--include-data-file=dir_scanner.py=dir_scanner.py",
+        "--include-data-file=cleanup_rules.py=cleanup_rules.py",
+        "--include-data-file=cleanup_plan.py=cleanup_plan.py",
+        "--include-data-file=scan_index.py=scan_index.py",
+        "--include-data-file=duplicate_finder.py=duplicate_finder.py",
+        "--include-data-file=task_graph.py=task_graph.py",
+        "--include-data-file=registry_access.py=registry_access.py",
+        "--include-data-file=program_inventory.py=program_inventory.py",
+        "--include-data-file=chunk_store.py=chunk_store.py",
+        "--include-data-file=reg_diff.py=reg_diff.py",
+        "--include-data-file=powershell_pool.py=powershell_pool.py",
+        "--include-data-file=hardware_facts.py=hardware_facts.py",
+        "--include-data-file=process_events.py=process_events.py",
+        "--include-data-file=session_enforcer.py=session_enforcer.py",
         
         # Output directory
         "--output-dir=dist",
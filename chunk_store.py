@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+"""
+chunk_store.py - Almacén de backups deduplicado por contenido
+Cada archivo del backup se divide en fragmentos de tamaño variable cuyos cortes
+dependen del contenido (no de la posición), por lo que insertar o quitar una
+clave en un .reg solo cambia los fragmentos vecinos. Cada fragmento único se
+guarda una sola vez, comprimido y nombrado por su hash; cada generación es un
+manifiesto JSON con la lista de fragmentos de cada archivo. Un backup repetido
+solo agrega los bytes que cambiaron y conservar varias generaciones es barato.
+
+Corte de fragmentos: los .reg son texto (UTF-16), así que el candidato a corte es
+el fin de línea. Se corta después de una línea cuyo CRC32 cumple la máscara,
+respetando un tamaño mínimo y máximo. Los archivos binarios sin saltos de línea
+caen en el corte por tamaño máximo (igual se deduplican si no cambian).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Dict, Iterator, List, Optional
+
+STORE_FORMAT_VERSION = 1
+
+MIN_CHUNK = 16 * 1024
+MAX_CHUNK = 256 * 1024
+# Una línea de cada 512 es corte (~64-100 KB por fragmento con líneas de .reg típicas)
+BOUNDARY_MASK = (1 << 9) - 1
+READ_BLOCK = 4 * 1024 * 1024
+COMPRESSION_LEVEL = 6
+DEFAULT_WORKERS = 4
+
+_CHUNKS_DIR = "chunks"
+_GENERATIONS_DIR = "generations"
+
+
+def iter_chunks(f: BinaryIO, min_size: int = MIN_CHUNK, max_size: int = MAX_CHUNK,
+                mask: int = BOUNDARY_MASK) -> Iterator[bytes]:
+    """Divide un archivo en fragmentos con cortes definidos por el contenido"""
+    actual = bytearray()
+    resto = b""
+    while True:
+        bloque = f.read(READ_BLOCK)
+        datos = resto + bloque
+        if not bloque:
+            lineas, resto = ([datos] if datos else []), b""
+        else:
+            ultimo = datos.rfind(b"\n")
+            if ultimo < 0:
+                # Sin saltos de línea: procesar de a max_size para no acumular sin límite
+                corte = len(datos) - len(datos) % max_size
+                lineas, resto = [datos[i:i + max_size] for i in range(0, corte, max_size)], datos[corte:]
+            else:
+                lineas = datos[:ultimo + 1].split(b"\n")
+                lineas.pop()  # vacío después del último salto
+                lineas = [linea + b"\n" for linea in lineas]
+                resto = datos[ultimo + 1:]
+
+        for linea in lineas:
+            actual += linea
+            if len(actual) >= max_size:
+                while len(actual) >= max_size:
+                    yield bytes(actual[:max_size])
+                    del actual[:max_size]
+            elif len(actual) >= min_size and not (zlib.crc32(linea) & mask):
+                yield bytes(actual)
+                actual.clear()
+
+        if not bloque:
+            break
+    if actual:
+        yield bytes(actual)
+
+
+def _digest(datos: bytes) -> str:
+    return hashlib.blake2b(datos, digest_size=20).hexdigest()
+
+
+class StoreReport:
+    """Resultado de guardar una generación"""
+
+    def __init__(self, generation: str):
+        self.generation = generation
+        self.files = 0
+        self.bytes_in = 0
+        self.chunks = 0
+        self.chunks_new = 0
+        self.bytes_new = 0          # bytes sin comprimir de fragmentos nuevos
+        self.bytes_stored = 0       # bytes comprimidos escritos
+        self.errors: List[str] = []
+        self.elapsed = 0.0
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            'generation': self.generation,
+            'files': self.files,
+            'bytes_in': self.bytes_in,
+            'chunks': self.chunks,
+            'chunks_new': self.chunks_new,
+            'bytes_new': self.bytes_new,
+            'bytes_stored': self.bytes_stored,
+            'errors': self.errors,
+            'elapsed': round(self.elapsed, 3),
+        }
+
+
+class ChunkStore:
+    """
+    Almacén de generaciones de backup
+
+    Args:
+        root: Carpeta del almacén (chunks/ y generations/)
+        workers: Archivos que se fragmentan y comprimen a la vez (zlib y hashlib liberan el GIL)
+    """
+
+    def __init__(self, root: str, workers: int = DEFAULT_WORKERS):
+        self.root = root
+        self.workers = max(1, workers)
+        self._known: Optional[set] = None
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------ fragmentos
+
+    def _chunk_path(self, digest: str) -> str:
+        return os.path.join(self.root, _CHUNKS_DIR, digest[:2], digest + ".z")
+
+    def _known_chunks(self) -> set:
+        if self._known is None:
+            conocidos = set()
+            base = os.path.join(self.root, _CHUNKS_DIR)
+            if os.path.isdir(base):
+                for prefijo in os.listdir(base):
+                    carpeta = os.path.join(base, prefijo)
+                    if os.path.isdir(carpeta):
+                        conocidos.update(nombre[:-2] for nombre in os.listdir(carpeta) if nombre.endswith(".z"))
+            self._known = conocidos
+        return self._known
+
+    def _put_chunk(self, digest: str, datos: bytes, informe: StoreReport) -> None:
+        conocidos = self._known_chunks()
+        with self._lock:
+            if digest in conocidos:
+                return
+            conocidos.add(digest)
+        comprimido = zlib.compress(datos, COMPRESSION_LEVEL)
+        ruta = self._chunk_path(digest)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f"{ruta}.{threading.get_ident()}.tmp"
+        try:
+            with open(temporal, "wb") as f:
+                f.write(comprimido)
+            os.replace(temporal, ruta)
+        except OSError:
+            with self._lock:
+                conocidos.discard(digest)
+            raise
+        with self._lock:
+            informe.chunks_new += 1
+            informe.bytes_new += len(datos)
+            informe.bytes_stored += len(comprimido)
+
+    def read_chunk(self, digest: str) -> bytes:
+        with open(self._chunk_path(digest), "rb") as f:
+            datos = zlib.decompress(f.read())
+        if _digest(datos) != digest:
+            raise ValueError(f"Fragmento dañado: {digest}")
+        return datos
+
+    # ------------------------------------------------------------------ generaciones
+
+    def _generation_path(self, generation: str) -> str:
+        return os.path.join(self.root, _GENERATIONS_DIR, generation + ".json")
+
+    def list_generations(self) -> List[str]:
+        """Generaciones guardadas, de la más antigua a la más reciente"""
+        carpeta = os.path.join(self.root, _GENERATIONS_DIR)
+        if not os.path.isdir(carpeta):
+            return []
+        return sorted(nombre[:-5] for nombre in os.listdir(carpeta) if nombre.endswith(".json"))
+
+    def latest(self) -> Optional[str]:
+        generaciones = self.list_generations()
+        return generaciones[-1] if generaciones else None
+
+    def load_generation(self, generation: str) -> Dict[str, object]:
+        with open(self._generation_path(generation), "r", encoding="utf-8") as f:
+            manifiesto = json.load(f)
+        if manifiesto.get("version") != STORE_FORMAT_VERSION:
+            raise ValueError(f"Versión de generación no soportada: {manifiesto.get('version')}")
+        return manifiesto
+
+    def _new_generation_id(self) -> str:
+        base = time.strftime("%Y%m%d_%H%M%S")
+        existentes = set(self.list_generations())
+        generacion, sufijo = base, 1
+        while generacion in existentes:
+            sufijo += 1
+            generacion = f"{base}_{sufijo}"
+        return generacion
+
+    def _store_file(self, ruta: str, informe: StoreReport) -> Dict[str, object]:
+        fragmentos = []
+        total = hashlib.blake2b(digest_size=20)
+        tamano = 0
+        with open(ruta, "rb") as f:
+            for datos in iter_chunks(f):
+                digest = _digest(datos)
+                self._put_chunk(digest, datos, informe)
+                fragmentos.append(digest)
+                total.update(datos)
+                tamano += len(datos)
+        return {'size': tamano, 'hash': total.hexdigest(), 'chunks': fragmentos}
+
+    def store_tree(self, source_dir: str, label: str = "") -> StoreReport:
+        """
+        Guarda una carpeta completa como nueva generación
+
+        Returns:
+            StoreReport; los archivos que no se pudieron leer quedan en errors
+            (la generación se guarda igual con el resto)
+        """
+        inicio = time.perf_counter()
+        generacion = self._new_generation_id()
+        informe = StoreReport(generacion)
+        relativos = []
+        for carpeta, _, nombres in os.walk(source_dir):
+            for nombre in nombres:
+                relativos.append(os.path.relpath(os.path.join(carpeta, nombre), source_dir))
+        relativos.sort()
+
+        def guardar(relativo):
+            try:
+                return relativo, self._store_file(os.path.join(source_dir, relativo), informe)
+            except OSError as e:
+                return relativo, e
+
+        archivos = {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="chunk-store") as pool:
+            for relativo, resultado in pool.map(guardar, relativos):
+                if isinstance(resultado, Exception):
+                    informe.errors.append(f"{relativo}: {resultado}")
+                    continue
+                # Separador portable en el manifiesto
+                archivos[relativo.replace(os.sep, "/")] = resultado
+                informe.files += 1
+                informe.bytes_in += resultado['size']
+                informe.chunks += len(resultado['chunks'])
+
+        informe.elapsed = time.perf_counter() - inicio
+        manifiesto = {
+            'version': STORE_FORMAT_VERSION,
+            'generation': generacion,
+            'created': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'label': label,
+            'files': archivos,
+            'stats': informe.as_dict(),
+        }
+        ruta = self._generation_path(generacion)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = ruta + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(manifiesto, f)
+        # La generación solo aparece cuando todos sus fragmentos ya están escritos
+        os.replace(temporal, ruta)
+        return informe
+
+    def restore(self, generation: str, target_dir: str) -> int:
+        """
+        Reconstruye una generación en target_dir y verifica el hash de cada archivo
+
+        Returns:
+            Cantidad de archivos restaurados
+        """
+        manifiesto = self.load_generation(generation)
+        archivos = manifiesto['files']
+
+        def reconstruir(item):
+            relativo, datos = item
+            destino = os.path.join(target_dir, *relativo.split("/"))
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            total = hashlib.blake2b(digest_size=20)
+            temporal = destino + ".tmp"
+            with open(temporal, "wb") as f:
+                for digest in datos['chunks']:
+                    fragmento = self.read_chunk(digest)
+                    total.update(fragmento)
+                    f.write(fragmento)
+            if total.hexdigest() != datos['hash']:
+                os.remove(temporal)
+                raise ValueError(f"Hash distinto al restaurar {relativo}")
+            os.replace(temporal, destino)
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="chunk-restore") as pool:
+            list(pool.map(reconstruir, archivos.items()))
+        return len(archivos)
+
+    def prune(self, keep: int) -> int:
+        """
+        Conserva las `keep` generaciones más recientes y elimina los fragmentos
+        que ya no referencia ninguna
+
+        Returns:
+            Cantidad de fragmentos eliminados
+        """
+        generaciones = self.list_generations()
+        for generacion in generaciones[:max(0, len(generaciones) - keep)]:
+            os.remove(self._generation_path(generacion))
+
+        referenciados = set()
+        for generacion in self.list_generations():
+            for datos in self.load_generation(generacion)['files'].values():
+                referenciados.update(datos['chunks'])
+        eliminados = 0
+        with self._lock:
+            for digest in list(self._known_chunks()):
+                if digest not in referenciados:
+                    try:
+                        os.remove(self._chunk_path(digest))
+                        eliminados += 1
+                    except OSError:
+                        pass
+                    self._known.discard(digest)
+        return eliminados
+
+    def size_on_disk(self) -> int:
+        total = 0
+        for carpeta, _, nombres in os.walk(os.path.join(self.root, _CHUNKS_DIR)):
+            for nombre in nombres:
+                try:
+                    total += os.path.getsize(os.path.join(carpeta, nombre))
+                except OSError:
+                    pass
+        return total
+
+
+def restore_generation(store_dir: str, generation: Optional[str], target_dir: str) -> Optional[str]:
+    """Atajo: restaura una generación (None = la más reciente); retorna su id o None si no hay"""
+    almacen = ChunkStore(store_dir)
+    generacion = generation or almacen.latest()
+    if generacion is None:
+        return None
+    if os.path.isdir(target_dir):
+        shutil.rmtree(target_dir, ignore_errors=True)
+    almacen.restore(generacion, target_dir)
+    return generacion
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 3:
+        print("Uso: chunk_store.py <almacén> <carpeta a guardar>")
+        sys.exit(1)
+    almacen = ChunkStore(sys.argv[1])
+    resultado = almacen.store_tree(sys.argv[2])
+    print(resultado.as_dict())
+    print(f"{len(almacen.list_generations())} generaciones, {almacen.size_on_disk() / 1e6:.1f} MB en disco")
@@ -0,0 +1,438 @@
+# -*- coding: utf-8 -*-
+"""
+cleanup_plan.py - Plan de eliminación en dos fases para LIMPIEZA
+Fase 1 (planificación): recorre las carpetas y reglas y produce un plan compacto
+(rutas, tamaños, regla) sin borrar nada; se puede guardar en JSON y mostrar como
+simulación. Fase 2 (ejecución): elimina el plan en lotes paralelos con
+concurrencia acotada, contando los bytes realmente liberados por regla.
+
+Entre ambas fases pueden pasar minutos (vista previa, otras etapas del
+mantenimiento): cada archivo guarda el tamaño y la fecha de modificación que
+tenía al planificarse y no se elimina si cambió desde entonces.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from cleanup_rules import CleanupRule, RuleWalker
+from dir_scanner import is_reparse_point, scan_trees
+
+PLAN_FORMAT_VERSION = 2
+
+# Tipos de entrada
+ENTRY_FILE = 0       # archivo
+ENTRY_DIR = 1        # carpeta que queda vacía (se elimina después de los archivos)
+ENTRY_CONTENTS = 2   # todo el contenido de una carpeta (la carpeta se conserva)
+
+_KIND_NAMES = {ENTRY_FILE: "file", ENTRY_DIR: "dir", ENTRY_CONTENTS: "contents"}
+
+# mtime de entradas que no se verifican (carpetas, o archivo que no se pudo leer al planificar)
+NO_MTIME = -1.0
+
+DEFAULT_WORKERS = 4
+DEFAULT_BATCH_SIZE = 256
+
+# Fallos que se conservan como ejemplo en el informe (el resto solo se cuenta)
+MAX_FAILURE_SAMPLES = 20
+
+
+def _is_inside(path: str, parent: str) -> bool:
+    return path == parent or path.startswith(parent.rstrip(os.sep) + os.sep)
+
+
+class DeletionPlan:
+    """
+    Plan de eliminación en columnas (una lista de rutas y arrays de tamaño,
+    mtime, regla y tipo), en el orden en que debe ejecutarse: el contenido de
+    una carpeta siempre aparece antes que la carpeta.
+    """
+
+    def __init__(self):
+        self.rule_ids: List[str] = []
+        self._rule_index: Dict[str, int] = {}
+        self.paths: List[str] = []
+        self.sizes = array('q')
+        self.mtimes = array('d')
+        self.rules = array('H')
+        self.kinds = array('B')
+        self.created = time.time()
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def add(self, path: str, size: int, rule_id: str, kind: int = ENTRY_FILE,
+            mtime: Optional[float] = None) -> None:
+        """
+        Agrega una entrada. Para archivos sin mtime se toma el actual (lstat),
+        que es el que se comparará al ejecutar.
+        """
+        if mtime is None:
+            mtime = NO_MTIME
+            if kind == ENTRY_FILE:
+                try:
+                    mtime = os.lstat(path).st_mtime
+                except OSError:
+                    pass
+        indice = self._rule_index.get(rule_id)
+        if indice is None:
+            indice = self._rule_index[rule_id] = len(self.rule_ids)
+            self.rule_ids.append(rule_id)
+        self.paths.append(path)
+        self.sizes.append(size)
+        self.mtimes.append(mtime)
+        self.rules.append(indice)
+        self.kinds.append(kind)
+
+    def entries(self) -> Iterator[Tuple[str, int, str, int]]:
+        """(ruta, tamaño, regla, tipo) de cada entrada"""
+        for idx, ruta in enumerate(self.paths):
+            yield ruta, self.sizes[idx], self.rule_ids[self.rules[idx]], self.kinds[idx]
+
+    def contents_roots(self) -> List[str]:
+        return [ruta for idx, ruta in enumerate(self.paths) if self.kinds[idx] == ENTRY_CONTENTS]
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(self.sizes)
+
+    def by_rule(self) -> Dict[str, Dict[str, int]]:
+        """Entradas y bytes recuperables por regla"""
+        resumen = {regla: {'entries': 0, 'bytes': 0} for regla in self.rule_ids}
+        for idx in range(len(self.paths)):
+            datos = resumen[self.rule_ids[self.rules[idx]]]
+            datos['entries'] += 1
+            datos['bytes'] += self.sizes[idx]
+        return resumen
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            'version': PLAN_FORMAT_VERSION,
+            'created': self.created,
+            'total_bytes': self.total_bytes,
+            'rules': self.rule_ids,
+            'summary': self.by_rule(),
+            'paths': self.paths,
+            'sizes': self.sizes.tolist(),
+            'mtimes': self.mtimes.tolist(),
+            'rule_index': self.rules.tolist(),
+            'kinds': self.kinds.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, datos: Dict[str, object]) -> "DeletionPlan":
+        if datos.get('version') != PLAN_FORMAT_VERSION:
+            raise ValueError(f"Versión de plan no soportada: {datos.get('version')}")
+        plan = cls()
+        plan.created = datos.get('created', plan.created)
+        plan.rule_ids = list(datos['rules'])
+        plan._rule_index = {regla: idx for idx, regla in enumerate(plan.rule_ids)}
+        plan.paths = list(datos['paths'])
+        plan.sizes = array('q', datos['sizes'])
+        plan.mtimes = array('d', datos['mtimes'])
+        plan.rules = array('H', datos['rule_index'])
+        plan.kinds = array('B', datos['kinds'])
+        if not len(plan.paths) == len(plan.sizes) == len(plan.mtimes) == len(plan.rules) == len(plan.kinds):
+            raise ValueError("Plan inconsistente: columnas de distinto largo")
+        return plan
+
+    def save(self, path: str) -> None:
+        """Guarda el plan en JSON (escritura atómica)"""
+        temporal = f"{path}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(temporal, path)
+
+    @classmethod
+    def load(cls, path: str) -> "DeletionPlan":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def add_directory_contents(plan: DeletionPlan, paths: Iterable[str], rule_id: str, index=None) -> int:
+    """
+    Agrega al plan el contenido de cada carpeta existente, medido en paralelo.
+    Omite carpetas ya incluidas (o contenidas en otra ya incluida). Con un
+    ScanIndex, las carpetas sin cambios se toman del índice.
+
+    Returns:
+        Bytes agregados
+    """
+    incluidas = [os.path.normcase(os.path.abspath(ruta)) for ruta in plan.contents_roots()]
+    nuevas = []
+    for ruta in paths:
+        if not ruta or not os.path.isdir(ruta):
+            continue
+        clave = os.path.normcase(os.path.abspath(ruta))
+        if any(_is_inside(clave, previa) for previa in incluidas):
+            continue
+        incluidas.append(clave)
+        nuevas.append(ruta)
+
+    agregados = 0
+    for ruta, totales in scan_trees(nuevas, index).items():
+        plan.add(ruta, totales.size, rule_id, ENTRY_CONTENTS)
+        agregados += totales.size
+    return agregados
+
+
+def add_rule_matches(plan: DeletionPlan, roots: Iterable[str], rules: Iterable[CleanupRule],
+                     skip: Iterable[str] = (), index=None) -> RuleWalker:
+    """
+    Recorre las raíces una vez con las reglas y agrega cada coincidencia al plan
+    sin eliminar nada (las carpetas que quedarían vacías también se agregan).
+    """
+    def registrar(regla: CleanupRule, ruta: str, tamano: int, es_carpeta: bool) -> bool:
+        plan.add(ruta, tamano, regla.rule_id, ENTRY_DIR if es_carpeta else ENTRY_FILE)
+        return True
+
+    recorrido = RuleWalker(rules, on_match=registrar, skip=skip, index=index)
+    recorrido.walk_many(roots)
+    return recorrido
+
+
+class ExecutionReport:
+    """Resultado de ejecutar un plan"""
+
+    def __init__(self):
+        self.freed_bytes = 0
+        self.deleted = 0
+        self.failed = 0
+        self.skipped = 0
+        self.per_rule: Dict[str, Dict[str, int]] = {}
+        self.failures: List[Tuple[str, str]] = []
+        self.elapsed = 0.0
+
+    def _rule(self, rule_id: str) -> Dict[str, int]:
+        datos = self.per_rule.get(rule_id)
+        if datos is None:
+            datos = self.per_rule[rule_id] = {'deleted': 0, 'failed': 0, 'skipped': 0, 'bytes': 0}
+        return datos
+
+    def record(self, rule_id: str, deleted: int, failed: int, freed: int,
+               failures: Iterable[Tuple[str, str]] = (), skipped: int = 0) -> None:
+        datos = self._rule(rule_id)
+        datos['deleted'] += deleted
+        datos['failed'] += failed
+        datos['skipped'] += skipped
+        datos['bytes'] += freed
+        self.deleted += deleted
+        self.failed += failed
+        self.skipped += skipped
+        self.freed_bytes += freed
+        self.add_failures(failures)
+
+    def add_failures(self, failures: Iterable[Tuple[str, str]]) -> None:
+        for fallo in failures:
+            if len(self.failures) >= MAX_FAILURE_SAMPLES:
+                break
+            self.failures.append(fallo)
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            'freed_bytes': self.freed_bytes,
+            'deleted': self.deleted,
+            'failed': self.failed,
+            'skipped': self.skipped,
+            'elapsed': self.elapsed,
+            'per_rule': self.per_rule,
+            'failures': self.failures,
+        }
+
+
+def _delete_file(ruta: str, tamano: int, mtime: float) -> Tuple[int, Optional[str], bool]:
+    """
+    Elimina un archivo si sigue como estaba al planificarse
+
+    Returns:
+        (bytes liberados, error, omitido): omitido si cambió de tamaño o de fecha
+    """
+    try:
+        info = os.lstat(ruta)
+        if info.st_size != tamano or (mtime != NO_MTIME and info.st_mtime != mtime):
+            return 0, None, True
+        os.remove(ruta)
+        return info.st_size, None, False
+    except FileNotFoundError:
+        return 0, None, False
+    except OSError as e:
+        return 0, str(e), False
+
+
+def _delete_contents(raiz: str) -> Tuple[int, int, int, List[Tuple[str, str]]]:
+    """
+    Vacía una carpeta (que se conserva) contando lo realmente eliminado
+
+    Returns:
+        (bytes liberados, entradas eliminadas, fallidas, ejemplos de fallo)
+    """
+    liberados = eliminados = fallidos = 0
+    fallos: List[Tuple[str, str]] = []
+    # Post-orden iterativo: (carpeta, ya_expandida)
+    pila: List[Tuple[str, bool]] = [(raiz, False)]
+    while pila:
+        ruta, expandida = pila.pop()
+        if expandida:
+            try:
+                os.rmdir(ruta)
+                eliminados += 1
+            except OSError as e:
+                fallidos += 1
+                if len(fallos) < MAX_FAILURE_SAMPLES:
+                    fallos.append((ruta, str(e)))
+            continue
+        if ruta != raiz:
+            pila.append((ruta, True))
+        try:
+            with os.scandir(ruta) as entradas:
+                for entrada in entradas:
+                    if entrada.is_dir(follow_symlinks=False) and not is_reparse_point(entrada):
+                        pila.append((entrada.path, False))
+                        continue
+                    try:
+                        if entrada.is_dir(follow_symlinks=False):
+                            os.rmdir(entrada.path)  # junction: se elimina el enlace, no el destino
+                            tamano = 0
+                        else:
+                            tamano = entrada.stat(follow_symlinks=False).st_size
+                            os.remove(entrada.path)
+                        liberados += tamano
+                        eliminados += 1
+                    except FileNotFoundError:
+                        continue
+                    except OSError as e:
+                        fallidos += 1
+                        if len(fallos) < MAX_FAILURE_SAMPLES:
+                            fallos.append((entrada.path, str(e)))
+        except OSError as e:
+            fallidos += 1
+            if len(fallos) < MAX_FAILURE_SAMPLES:
+                fallos.append((ruta, str(e)))
+    return liberados, eliminados, fallidos, fallos
+
+
+class PlanExecutor:
+    """
+    Ejecuta un DeletionPlan: archivos y carpetas de contenido en lotes paralelos,
+    luego las carpetas vacías en el orden del plan (siempre después de su contenido).
+
+    Args:
+        max_workers: Lotes que se eliminan a la vez
+        batch_size: Archivos por lote
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.max_workers = max(1, max_workers)
+        self.batch_size = max(1, batch_size)
+
+    def _run_batch(self, plan: DeletionPlan, indices: List[int], informe: ExecutionReport,
+                   lock: threading.Lock) -> None:
+        # Acumular localmente y publicar una vez por lote
+        por_regla: Dict[str, List[int]] = {}
+        fallos: List[Tuple[str, str]] = []
+        for idx in indices:
+            ruta = plan.paths[idx]
+            regla = plan.rule_ids[plan.rules[idx]]
+            totales = por_regla.setdefault(regla, [0, 0, 0, 0])
+            if plan.kinds[idx] == ENTRY_CONTENTS:
+                liberados, eliminados, fallidos, ejemplos = _delete_contents(ruta)
+                totales[0] += eliminados
+                totales[1] += fallidos
+                totales[2] += liberados
+                fallos.extend(ejemplos)
+                continue
+            liberados, error, omitido = _delete_file(ruta, plan.sizes[idx], plan.mtimes[idx])
+            if omitido:
+                totales[3] += 1
+            elif error is None:
+                totales[0] += 1
+                totales[2] += liberados
+            else:
+                totales[1] += 1
+                fallos.append((ruta, error))
+        with lock:
+            for regla, (eliminados, fallidos, liberados, omitidos) in por_regla.items():
+                informe.record(regla, eliminados, fallidos, liberados, skipped=omitidos)
+            informe.add_failures(fallos)
+
+    def execute(self, plan: DeletionPlan) -> ExecutionReport:
+        informe = ExecutionReport()
+        inicio = time.monotonic()
+        lock = threading.Lock()
+
+        # Cada carpeta de contenido es su propio lote; los archivos se agrupan
+        contenidos = [idx for idx in range(len(plan)) if plan.kinds[idx] == ENTRY_CONTENTS]
+        archivos = [idx for idx in range(len(plan)) if plan.kinds[idx] == ENTRY_FILE]
+        lotes = [[idx] for idx in contenidos]
+        lotes.extend(archivos[i:i + self.batch_size] for i in range(0, len(archivos), self.batch_size))
+
+        if lotes:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(lotes)),
+                                    thread_name_prefix="cleanup") as pool:
+                for futuro in [pool.submit(self._run_batch, plan, lote, informe, lock) for lote in lotes]:
+                    futuro.result()
+
+        # Carpetas vacías: secuencial y en orden (hijas antes que padres)
+        for idx in range(len(plan)):
+            if plan.kinds[idx] != ENTRY_DIR:
+                continue
+            regla = plan.rule_ids[plan.rules[idx]]
+            try:
+                os.rmdir(plan.paths[idx])
+                informe.record(regla, 1, 0, 0)
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                informe.record(regla, 0, 1, 0, [(plan.paths[idx], str(e))])
+
+        informe.elapsed = time.monotonic() - inicio
+        return informe
+
+
+def execute_plan(plan: DeletionPlan, max_workers: int = DEFAULT_WORKERS) -> ExecutionReport:
+    """Atajo: ejecuta un plan con el ejecutor por defecto"""
+    return PlanExecutor(max_workers=max_workers).execute(plan)
+
+
+def describe_kind(kind: int) -> str:
+    return _KIND_NAMES.get(kind, "?")
+
+
+if __name__ == "__main__":
+    import sys
+    import tempfile
+
+    raiz = tempfile.mkdtemp(prefix="plan_demo_")
+    for carpeta in range(20):
+        os.makedirs(os.path.join(raiz, "cache", f"d{carpeta}"))
+        for archivo in range(50):
+            with open(os.path.join(raiz, "cache", f"d{carpeta}", f"{archivo}.bin"), "wb") as f:
+                f.write(b"x" * 1024)
+
+    sueltos = []
+    for archivo in range(3):
+        sueltos.append(os.path.join(raiz, f"suelto{archivo}.tmp"))
+        with open(sueltos[-1], "wb") as f:
+            f.write(b"x" * 512)
+
+    demo = DeletionPlan()
+    add_directory_contents(demo, [os.path.join(raiz, "cache")], "cache")
+    for ruta in sueltos:
+        demo.add(ruta, 512, "temp_ext")
+    print(f"Simulación: {len(demo)} entradas, {demo.total_bytes} bytes -> {demo.by_rule()}")
+    ruta_plan = os.path.join(raiz, "plan.json")
+    demo.save(ruta_plan)
+    # Un archivo escrito después de la vista previa no debe eliminarse
+    with open(sueltos[0], "ab") as f:
+        f.write(b"nuevo")
+    informe_demo = execute_plan(DeletionPlan.load(ruta_plan))
+    print(f"Ejecución: {informe_demo.as_dict()}")
+    conservado = os.path.exists(sueltos[0])
+    shutil.rmtree(raiz, ignore_errors=True)
+    sys.exit(0 if conservado and informe_demo.skipped == 1
+             and informe_demo.freed_bytes == demo.total_bytes - 512 else 1)
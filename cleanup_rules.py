@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+cleanup_rules.py - Recorrido único de un árbol evaluando todas las reglas de limpieza
+Cada regla de LIMPIEZA (extensión temporal, 0 bytes, antiguo y grande, carpeta
+vacía) se registra como un predicado. Un solo recorrido ascendente (post-orden)
+por raíz evalúa todas las reglas sobre cada entrada y envía cada coincidencia a
+la acción correspondiente, en lugar de recorrer el mismo perfil una vez por regla.
+"""
+
+import os
+from typing import Callable, Dict, Iterable, List, Optional
+
+from dir_scanner import is_reparse_point
+
+# Tipos de regla
+RULE_FILE = "file"            # predicado sobre cada archivo
+RULE_TREE = "tree"            # predicado sobre una carpeta: todo su contenido coincide
+RULE_EMPTY_DIR = "empty_dir"  # carpeta que queda vacía después de aplicar las demás reglas
+
+
+class FileInfo:
+    """Datos de un archivo que reciben los predicados (tomados del DirEntry)"""
+
+    __slots__ = ('path', 'name', 'ext', 'size', 'mtime')
+
+    def __init__(self, path: str, name: str, size: int, mtime: float):
+        self.path = path
+        self.name = name
+        self.ext = os.path.splitext(name)[1].lower()
+        self.size = size
+        self.mtime = mtime
+
+
+class CleanupRule:
+    """
+    Regla de limpieza
+
+    Args:
+        rule_id: Identificador corto (aparece en estadísticas y registros)
+        kind: RULE_FILE, RULE_TREE o RULE_EMPTY_DIR
+        predicate: FileInfo -> bool (RULE_FILE), (ruta, nombre) -> bool (RULE_TREE),
+            ruta -> bool (RULE_EMPTY_DIR, opcional)
+        scope: Si se indica, la regla solo aplica dentro de esta carpeta
+        candidate: Para reglas que dependen del tiempo (antigüedad), la parte del
+            predicado que no cambia con el tiempo: una carpeta con candidatos no se
+            marca como limpia en el índice y se vuelve a revisar en cada recorrido
+    """
+
+    def __init__(self, rule_id: str, kind: str, predicate: Optional[Callable] = None,
+                 scope: Optional[str] = None, candidate: Optional[Callable] = None):
+        self.rule_id = rule_id
+        self.kind = kind
+        self.predicate = predicate
+        self.candidate = candidate
+        self.scope = os.path.normcase(os.path.abspath(scope)) if scope else None
+
+    def applies_to(self, directory: str) -> bool:
+        """Indica si la regla aplica a las entradas de esta carpeta"""
+        if self.scope is None:
+            return True
+        carpeta = os.path.normcase(directory)
+        return carpeta == self.scope or carpeta.startswith(self.scope.rstrip(os.sep) + os.sep)
+
+    def __repr__(self) -> str:
+        return f"CleanupRule({self.rule_id!r}, {self.kind!r})"
+
+
+class RuleStats:
+    """Coincidencias de una regla durante un recorrido"""
+
+    __slots__ = ('matched', 'bytes', 'failed')
+
+    def __init__(self):
+        self.matched = 0
+        self.bytes = 0
+        self.failed = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {'matched': self.matched, 'bytes': self.bytes, 'failed': self.failed}
+
+
+def delete_match(rule: CleanupRule, path: str, size: int, is_dir: bool) -> bool:
+    """Acción por defecto: elimina el archivo o la carpeta (ya vacía)"""
+    try:
+        if is_dir:
+            os.rmdir(path)
+        else:
+            os.remove(path)
+        return True
+    except OSError:
+        return False
+
+
+class RuleWalker:
+    """
+    Recorre raíces una sola vez aplicando un conjunto de reglas
+
+    Para cada archivo gana la primera regla RULE_FILE (en orden de registro) cuyo
+    predicado se cumpla. Una carpeta que coincide con una RULE_TREE atribuye a esa
+    regla todo su contenido y se elimina al final. Las carpetas se evalúan después
+    de su contenido, por lo que una carpeta cuyos archivos fueron eliminados cuenta
+    como vacía en el mismo recorrido. La raíz nunca se elimina.
+
+    Args:
+        rules: Reglas a evaluar
+        on_match: (regla, ruta, tamaño, es_carpeta) -> bool; retorna True si la
+            entrada fue eliminada (o se considera eliminada, p. ej. en simulación)
+        skip: Carpetas que no se recorren (p. ej. cachés que se vacían por separado)
+        index: ScanIndex opcional; una carpeta sin cambios (mismo mtime) que quedó
+            limpia en el recorrido anterior no se vuelve a listar
+    """
+
+    def __init__(self, rules: Iterable[CleanupRule],
+                 on_match: Callable[[CleanupRule, str, int, bool], bool] = delete_match,
+                 skip: Iterable[str] = (), index=None):
+        self.rules = list(rules)
+        self.on_match = on_match
+        self.skip = frozenset(os.path.normcase(os.path.abspath(ruta)) for ruta in skip)
+        self.index = index
+        self.stats: Dict[str, RuleStats] = {regla.rule_id: RuleStats() for regla in self.rules}
+        self.errors = 0
+        self.files_seen = 0
+        self.dirs_seen = 0
+        self.dirs_reused = 0
+
+    def _rules_of(self, kind: str, directory: str) -> List[CleanupRule]:
+        return [regla for regla in self.rules if regla.kind == kind and regla.applies_to(directory)]
+
+    def _emit(self, regla: CleanupRule, ruta: str, tamano: int, es_carpeta: bool) -> bool:
+        estadisticas = self.stats[regla.rule_id]
+        if self.on_match(regla, ruta, tamano, es_carpeta):
+            estadisticas.matched += 1
+            estadisticas.bytes += tamano
+            return True
+        estadisticas.failed += 1
+        return False
+
+    def walk(self, root: str) -> Dict[str, RuleStats]:
+        """Recorre una raíz; retorna las estadísticas acumuladas por regla"""
+        if os.path.isdir(root):
+            self._walk_dir(os.path.abspath(root), None)
+        return self.stats
+
+    def walk_many(self, roots: Iterable[str]) -> Dict[str, RuleStats]:
+        """Recorre varias raíces, omitiendo las que están dentro de otra ya incluida"""
+        normalizadas = sorted({os.path.normcase(os.path.abspath(raiz)): raiz for raiz in roots}.items())
+        recorridas: List[str] = []
+        for clave, raiz in normalizadas:
+            if any(clave == previa or clave.startswith(previa.rstrip(os.sep) + os.sep) for previa in recorridas):
+                continue
+            recorridas.append(clave)
+            self.walk(raiz)
+        return self.stats
+
+    def _walk_dir(self, ruta: str, regla_arbol: Optional[CleanupRule]) -> bool:
+        """Procesa una carpeta y su contenido; retorna True si quedó vacía"""
+        self.dirs_seen += 1
+        reglas_archivo = [] if regla_arbol else self._rules_of(RULE_FILE, ruta)
+        reglas_arbol = [] if regla_arbol else self._rules_of(RULE_TREE, ruta)
+        restantes = 0
+        subcarpetas = []
+
+        mtime_ns = None
+        if self.index is not None and regla_arbol is None:
+            try:
+                mtime_ns = os.stat(ruta).st_mtime_ns
+            except OSError:
+                self.errors += 1
+                return False
+            registro = self.index.lookup(ruta, mtime_ns)
+            if registro is not None and registro.clean:
+                # Sin cambios y sin coincidencias la vez anterior: sus archivos siguen ahí
+                self.dirs_reused += 1
+                restantes = registro.files
+                subcarpetas = [(os.path.join(ruta, nombre), nombre) for nombre in registro.subdirs]
+                return self._walk_subdirs(ruta, subcarpetas, regla_arbol, reglas_arbol, restantes)
+
+        limpia = True
+        tamano_total = 0
+        try:
+            with os.scandir(ruta) as entradas:
+                for entrada in entradas:
+                    try:
+                        if entrada.is_dir(follow_symlinks=False):
+                            if is_reparse_point(entrada):
+                                restantes += 1
+                            else:
+                                subcarpetas.append((entrada.path, entrada.name))
+                            continue
+
+                        self.files_seen += 1
+                        info_stat = entrada.stat(follow_symlinks=False)
+                        tamano_total += info_stat.st_size
+                        regla = regla_arbol
+                        if regla is None and reglas_archivo:
+                            info = FileInfo(entrada.path, entrada.name, info_stat.st_size, info_stat.st_mtime)
+                            regla = next((r for r in reglas_archivo if r.predicate(info)), None)
+                            if regla is not None or any(
+                                r.candidate is not None and r.candidate(info) for r in reglas_archivo
+                            ):
+                                limpia = False
+                        if regla is None or not self._emit(regla, entrada.path, info_stat.st_size, False):
+                            restantes += 1
+                    except OSError:
+                        self.errors += 1
+                        restantes += 1
+                        limpia = False
+        except OSError:
+            self.errors += 1
+            return False
+
+        if mtime_ns is not None:
+            self.index.put(ruta, mtime_ns, tamano_total, restantes,
+                           [nombre for _, nombre in subcarpetas], limpia)
+        return self._walk_subdirs(ruta, subcarpetas, regla_arbol, reglas_arbol, restantes)
+
+    def _walk_subdirs(self, ruta: str, subcarpetas, regla_arbol: Optional[CleanupRule],
+                      reglas_arbol: List[CleanupRule], restantes: int) -> bool:
+        for sub_ruta, sub_nombre in subcarpetas:
+            if self.skip and os.path.normcase(sub_ruta) in self.skip:
+                restantes += 1
+                continue
+            regla_sub = regla_arbol or next(
+                (r for r in reglas_arbol if r.predicate(sub_ruta, sub_nombre)), None
+            )
+            if self._walk_dir(sub_ruta, regla_sub):
+                regla_vacia = regla_sub or next(
+                    (r for r in self._rules_of(RULE_EMPTY_DIR, ruta)
+                     if r.predicate is None or r.predicate(sub_ruta)), None
+                )
+                if regla_vacia is not None and self._emit(regla_vacia, sub_ruta, 0, True):
+                    continue
+            restantes += 1
+
+        return restantes == 0
+
+
+def extension_rule(rule_id: str, extensions: Iterable[str], scope: Optional[str] = None) -> CleanupRule:
+    """Archivos con alguna de las extensiones (en minúsculas, con punto)"""
+    extensiones = frozenset(ext.lower() for ext in extensions)
+    return CleanupRule(rule_id, RULE_FILE, lambda info: info.ext in extensiones, scope)
+
+
+def zero_byte_rule(rule_id: str = "zero_bytes", scope: Optional[str] = None) -> CleanupRule:
+    """Archivos de 0 bytes"""
+    return CleanupRule(rule_id, RULE_FILE, lambda info: info.size == 0, scope)
+
+
+def empty_dir_rule(rule_id: str = "empty_dir", scope: Optional[str] = None) -> CleanupRule:
+    """Carpetas vacías (incluidas las que se vacían durante el mismo recorrido)"""
+    return CleanupRule(rule_id, RULE_EMPTY_DIR, None, scope)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    raiz = sys.argv[1] if len(sys.argv) > 1 else os.path.expanduser("~")
+    reglas = [extension_rule("temp_ext", (".tmp", ".temp")), zero_byte_rule(), empty_dir_rule()]
+    # Simulación: cuenta coincidencias sin eliminar nada
+    recorrido = RuleWalker(reglas, on_match=lambda regla, ruta, tamano, es_carpeta: True)
+    inicio = time.perf_counter()
+    recorrido.walk(raiz)
+    print(f"{recorrido.files_seen} archivos, {recorrido.dirs_seen} carpetas "
+          f"en {time.perf_counter() - inicio:.2f} s (simulación)")
+    for regla_id, datos in recorrido.stats.items():
+        print(f"  {regla_id}: {datos.as_dict()}")
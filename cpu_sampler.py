@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+cpu_sampler.py - Muestreo continuo de uso de CPU por proceso
+Calcula el porcentaje de CPU a partir de diferencias exactas del tiempo de CPU
+acumulado entre instantáneas consecutivas (en lugar de la primera lectura de
+cpu_percent, que siempre es 0.0 para un proceso nuevo) y guarda una ventana
+circular de muestras recientes por proceso en arrays contiguos.
+"""
+
+import os
+import threading
+from array import array
+from typing import Dict, List, Optional
+
+# Muestras recientes que se conservan por proceso
+DEFAULT_WINDOW = 32
+
+# Factor de suavizado de la media móvil exponencial
+DEFAULT_ALPHA = 0.3
+
+
+class CpuSampler:
+    """
+    Ventanas circulares de uso de CPU (%) por proceso.
+
+    Todas las ventanas viven en un único array de capacity * window elementos;
+    cada proceso ocupa una ranura (slot) que se libera cuando muere o cuando su
+    PID es reutilizado (create_time distinto). Un proceso nuevo no tiene
+    muestras hasta la segunda instantánea en que aparece.
+
+    Args:
+        window: Muestras por proceso
+        alpha: Factor de suavizado EWMA (0-1, mayor = más reactivo)
+        cpu_count: Núcleos lógicos (para el porcentaje total del sistema)
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW, alpha: float = DEFAULT_ALPHA,
+                 cpu_count: Optional[int] = None):
+        self.window = window
+        self.alpha = alpha
+        self.cpu_count = cpu_count or os.cpu_count() or 1
+        self._slots: Dict[int, int] = {}
+        self._free: List[int] = []
+        self._capacity = 0
+        self._ring = array('f')
+        self._pos = array('H')
+        self._count = array('L')
+        self._ewma = array('d')
+        self._last_cpu = array('d')
+        self._create = array('d')
+        self._seen = array('L')
+        self._generation = 0
+        self._last_timestamp: Optional[float] = None
+        self._system_percent: Optional[float] = None
+        self._lock = threading.Lock()
+        self._grow(256)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _grow(self, capacity: int) -> None:
+        extra = capacity - self._capacity
+        self._ring.extend(array('f', bytes(4 * extra * self.window)))
+        for columna in (self._pos, self._count, self._ewma, self._last_cpu, self._create, self._seen):
+            columna.extend([0] * extra)
+        self._free.extend(range(capacity - 1, self._capacity - 1, -1))
+        self._capacity = capacity
+
+    def _allocate(self, pid: int, create_time: float, cpu_time: float) -> int:
+        if not self._free:
+            self._grow(self._capacity * 2)
+        slot = self._free.pop()
+        self._slots[pid] = slot
+        self._pos[slot] = 0
+        self._count[slot] = 0
+        self._ewma[slot] = 0.0
+        self._last_cpu[slot] = cpu_time
+        self._create[slot] = create_time
+        return slot
+
+    def _release(self, pid: int) -> None:
+        slot = self._slots.pop(pid, None)
+        if slot is not None:
+            self._free.append(slot)
+
+    def update(self, snapshot) -> None:
+        """
+        Incorpora una instantánea (ProcessSnapshot). Escribe además el porcentaje
+        calculado en la columna cpu_percent de la instantánea.
+        """
+        with self._lock:
+            self._generation += 1
+            generacion = self._generation
+            anterior = self._last_timestamp
+            intervalo = (snapshot.timestamp - anterior) if anterior is not None else 0.0
+            self._last_timestamp = snapshot.timestamp
+            total = 0.0
+
+            for idx, pid in enumerate(snapshot.pids):
+                creado = snapshot.create_time[idx]
+                tiempo_cpu = snapshot.cpu_time[idx]
+                slot = self._slots.get(pid)
+                if slot is not None and self._create[slot] != creado:
+                    self._release(pid)
+                    slot = None
+                if slot is None:
+                    slot = self._allocate(pid, creado, tiempo_cpu)
+                    self._seen[slot] = generacion
+                    continue
+                self._seen[slot] = generacion
+
+                if intervalo <= 0:
+                    self._last_cpu[slot] = tiempo_cpu
+                    continue
+                porcentaje = max(tiempo_cpu - self._last_cpu[slot], 0.0) / intervalo * 100.0
+                self._last_cpu[slot] = tiempo_cpu
+
+                pos = self._pos[slot]
+                self._ring[slot * self.window + pos] = porcentaje
+                self._pos[slot] = (pos + 1) % self.window
+                cuenta = self._count[slot] + 1
+                self._count[slot] = cuenta
+                if cuenta == 1:
+                    self._ewma[slot] = porcentaje
+                else:
+                    self._ewma[slot] = self.alpha * porcentaje + (1 - self.alpha) * self._ewma[slot]
+
+                snapshot.cpu_percent[idx] = porcentaje
+                # El PID 0 de Windows ("System Idle Process") acumula el tiempo ocioso
+                if pid != 0:
+                    total += porcentaje
+
+            muertos = [pid for pid, slot in self._slots.items() if self._seen[slot] != generacion]
+            for pid in muertos:
+                self._release(pid)
+
+            self._system_percent = (
+                min(total / self.cpu_count, 100.0) if intervalo > 0 else None
+            )
+
+    def _samples(self, slot: int) -> List[float]:
+        cuenta = min(self._count[slot], self.window)
+        inicio = slot * self.window
+        if cuenta < self.window:
+            return list(self._ring[inicio:inicio + cuenta])
+        pos = self._pos[slot]
+        return list(self._ring[inicio + pos:inicio + self.window]) + list(self._ring[inicio:inicio + pos])
+
+    def samples(self, pid: int) -> List[float]:
+        """Muestras de la ventana, de la más antigua a la más reciente"""
+        with self._lock:
+            slot = self._slots.get(pid)
+            return self._samples(slot) if slot is not None else []
+
+    def sample_count(self, pid: int) -> int:
+        """Muestras acumuladas (0 para un proceso recién visto o desconocido)"""
+        with self._lock:
+            slot = self._slots.get(pid)
+            return self._count[slot] if slot is not None else 0
+
+    def latest(self, pid: int) -> Optional[float]:
+        with self._lock:
+            slot = self._slots.get(pid)
+            if slot is None or not self._count[slot]:
+                return None
+            return self._ring[slot * self.window + (self._pos[slot] - 1) % self.window]
+
+    def ewma(self, pid: int) -> Optional[float]:
+        """Media móvil exponencial, o None si todavía no hay muestras"""
+        with self._lock:
+            slot = self._slots.get(pid)
+            if slot is None or not self._count[slot]:
+                return None
+            return self._ewma[slot]
+
+    def mean(self, pid: int) -> Optional[float]:
+        muestras = self.samples(pid)
+        return sum(muestras) / len(muestras) if muestras else None
+
+    def percentile(self, pid: int, q: float) -> Optional[float]:
+        """Percentil q (0-100) de la ventana, o None si no hay muestras"""
+        muestras = sorted(self.samples(pid))
+        if not muestras:
+            return None
+        return muestras[min(len(muestras) - 1, int(len(muestras) * q / 100.0))]
+
+    def system_percent(self) -> Optional[float]:
+        """Uso total de CPU del sistema (0-100) en el último intervalo, o None sin intervalo"""
+        return self._system_percent
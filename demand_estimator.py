@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+demand_estimator.py - Estimación no bloqueante de la demanda del sistema
+Guarda los contadores acumulados de CPU (por núcleo), disco y red en una ventana
+deslizante y calcula tasas reales (bytes/s, IOPS, % de ocupación por núcleo)
+entre la muestra más antigua y la más reciente. Cada consulta solo lee los
+contadores actuales: nunca duerme esperando un intervalo.
+"""
+
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import psutil
+
+# Ventana deslizante por defecto (segundos)
+DEFAULT_WINDOW = 30.0
+
+# Tasas que se consideran 100% de demanda
+DISK_FULL_SCALE_BPS = 100 * 1024 * 1024
+DISK_FULL_SCALE_IOPS = 2000
+NET_FULL_SCALE_BPS = 50 * 1024 * 1024
+
+# Ponderación: CPU es el factor más importante
+WEIGHT_CPU = 0.7
+WEIGHT_DISK = 0.2
+WEIGHT_NET = 0.1
+
+# Mezcla entre el promedio de núcleos y el núcleo más ocupado (cargas de un solo hilo)
+CPU_MEAN_SHARE = 0.6
+
+# Campos de cpu_times que no cuentan como ocupación o ya están incluidos en otros
+_IDLE_FIELDS = ('idle', 'iowait')
+_EXCLUDED_FIELDS = ('guest', 'guest_nice')
+
+# (timestamp, [(ocupado, total) por núcleo], (bytes_disco, operaciones_disco), bytes_red)
+_Sample = Tuple[float, List[Tuple[float, float]], Tuple[int, int], int]
+
+
+def _core_busy_total(cpu_times) -> Tuple[float, float]:
+    campos = cpu_times._asdict()
+    total = sum(valor for campo, valor in campos.items() if campo not in _EXCLUDED_FIELDS)
+    inactivo = sum(campos.get(campo, 0.0) for campo in _IDLE_FIELDS)
+    return total - inactivo, total
+
+
+class DemandEstimator:
+    """
+    Estimador de demanda (0-100) a partir de tasas sobre una ventana deslizante
+
+    Args:
+        window: Segundos de historia usados para calcular las tasas
+        cpu_times: Función que retorna cpu_times por núcleo (psutil por defecto)
+        disk_io: Función que retorna los contadores de disco acumulados
+        net_io: Función que retorna los contadores de red acumulados
+        clock: Reloj monotónico
+    """
+
+    def __init__(self, window: float = DEFAULT_WINDOW,
+                 cpu_times: Callable = lambda: psutil.cpu_times(percpu=True),
+                 disk_io: Callable = psutil.disk_io_counters,
+                 net_io: Callable = psutil.net_io_counters,
+                 clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self._cpu_times = cpu_times
+        self._disk_io = disk_io
+        self._net_io = net_io
+        self._clock = clock
+        self._samples: Deque[_Sample] = deque()
+        self.sample()
+
+    def sample(self) -> None:
+        """Lee los contadores actuales y descarta las muestras fuera de la ventana"""
+        ahora = self._clock()
+        nucleos = [_core_busy_total(t) for t in self._cpu_times()]
+
+        disco = self._disk_io()
+        disco_bytes = (disco.read_bytes + disco.write_bytes) if disco else 0
+        disco_ops = (disco.read_count + disco.write_count) if disco else 0
+
+        red = self._net_io()
+        red_bytes = (red.bytes_sent + red.bytes_recv) if red else 0
+
+        self._samples.append((ahora, nucleos, (disco_bytes, disco_ops), red_bytes))
+        # Conservar al menos dos muestras para poder calcular una tasa
+        while len(self._samples) > 2 and ahora - self._samples[0][0] > self.window:
+            self._samples.popleft()
+
+    def rates(self) -> Optional[Dict[str, object]]:
+        """
+        Tasas entre la muestra más antigua y la más reciente de la ventana
+
+        Returns:
+            Diccionario con cpu_cores (% por núcleo), cpu_mean, cpu_max, disk_bps,
+            disk_iops, net_bps y span (segundos), o None con menos de dos muestras
+        """
+        if len(self._samples) < 2:
+            return None
+        t0, nucleos0, (disco0, ops0), red0 = self._samples[0]
+        t1, nucleos1, (disco1, ops1), red1 = self._samples[-1]
+        intervalo = t1 - t0
+        if intervalo <= 0:
+            return None
+
+        # Ocupación por núcleo en una sola pasada sobre ambos vectores
+        por_nucleo = [
+            (100.0 * (ocupado1 - ocupado0) / (total1 - total0)) if total1 > total0 else 0.0
+            for (ocupado0, total0), (ocupado1, total1) in zip(nucleos0, nucleos1)
+        ]
+        por_nucleo = [min(max(valor, 0.0), 100.0) for valor in por_nucleo]
+
+        return {
+            'cpu_cores': por_nucleo,
+            'cpu_mean': sum(por_nucleo) / len(por_nucleo) if por_nucleo else 0.0,
+            'cpu_max': max(por_nucleo, default=0.0),
+            # Los contadores pueden reiniciarse (p. ej. al desconectar un disco)
+            'disk_bps': max(disco1 - disco0, 0) / intervalo,
+            'disk_iops': max(ops1 - ops0, 0) / intervalo,
+            'net_bps': max(red1 - red0, 0) / intervalo,
+            'span': intervalo,
+        }
+
+    def demand(self, sample: bool = True) -> Optional[float]:
+        """
+        Demanda actual entre 0 (sin demanda) y 100 (demanda máxima)
+
+        Args:
+            sample: Tomar una muestra nueva antes de calcular
+
+        Returns:
+            Demanda, o None si todavía no hay dos muestras
+        """
+        if sample:
+            self.sample()
+        tasas = self.rates()
+        if tasas is None:
+            return None
+
+        cpu = CPU_MEAN_SHARE * tasas['cpu_mean'] + (1 - CPU_MEAN_SHARE) * tasas['cpu_max']
+        disco = 100.0 * max(tasas['disk_bps'] / DISK_FULL_SCALE_BPS,
+                            tasas['disk_iops'] / DISK_FULL_SCALE_IOPS)
+        red = 100.0 * tasas['net_bps'] / NET_FULL_SCALE_BPS
+        demanda = WEIGHT_CPU * cpu + WEIGHT_DISK * min(disco, 100.0) + WEIGHT_NET * min(red, 100.0)
+        return min(demanda, 100.0)
+
+
+if __name__ == "__main__":
+    estimador = DemandEstimator(window=5.0)
+    for _ in range(3):
+        time.sleep(1)
+        inicio = time.perf_counter()
+        demanda = estimador.demand()
+        costo_ms = (time.perf_counter() - inicio) * 1000
+        tasas = estimador.rates()
+        print(f"Demanda: {demanda:.1f} (cálculo {costo_ms:.2f} ms) | "
+              f"CPU prom {tasas['cpu_mean']:.1f}% máx {tasas['cpu_max']:.1f}% | "
+              f"disco {tasas['disk_bps'] / 1024:.0f} KB/s {tasas['disk_iops']:.0f} IOPS | "
+              f"red {tasas['net_bps'] / 1024:.0f} KB/s")
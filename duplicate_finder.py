@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+duplicate_finder.py - Detección de archivos duplicados en etapas
+1. Agrupa por tamaño (sin leer contenido; solo los tamaños repetidos siguen).
+2. Hash parcial: primeros y últimos 64 KB de cada candidato.
+3. Hash completo solo de los que siguen empatados, leyendo en bloques grandes
+   con readinto sobre un búfer reutilizado, repartido en un pool de hilos
+   (la lectura y hashlib liberan el GIL).
+"""
+
+import hashlib
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from dir_scanner import is_reparse_point
+
+PARTIAL_BLOCK = 64 * 1024
+FULL_CHUNK = 1024 * 1024
+DEFAULT_MIN_SIZE = 1024 * 1024
+DEFAULT_WORKERS = 4
+
+
+class FileEntry:
+    """Archivo candidato"""
+
+    __slots__ = ('path', 'size', 'mtime')
+
+    def __init__(self, path: str, size: int, mtime: float):
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+
+
+class DuplicateGroup:
+    """Archivos con contenido idéntico; el primero (más antiguo) se considera el original"""
+
+    __slots__ = ('size', 'digest', 'files')
+
+    def __init__(self, size: int, digest: str, files: List[FileEntry]):
+        self.size = size
+        self.digest = digest
+        self.files = sorted(files, key=lambda entrada: (entrada.mtime, entrada.path))
+
+    @property
+    def original(self) -> FileEntry:
+        return self.files[0]
+
+    @property
+    def copies(self) -> List[FileEntry]:
+        return self.files[1:]
+
+    @property
+    def reclaimable(self) -> int:
+        return self.size * (len(self.files) - 1)
+
+
+class DuplicateReport:
+    """Resultado de una búsqueda"""
+
+    def __init__(self):
+        self.groups: List[DuplicateGroup] = []
+        self.files_scanned = 0
+        self.partial_hashed = 0
+        self.full_hashed = 0
+        self.bytes_read = 0
+        self.errors = 0
+        self.elapsed = 0.0
+
+    @property
+    def reclaimable(self) -> int:
+        return sum(grupo.reclaimable for grupo in self.groups)
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            'groups': len(self.groups),
+            'duplicate_files': sum(len(grupo.copies) for grupo in self.groups),
+            'reclaimable': self.reclaimable,
+            'files_scanned': self.files_scanned,
+            'partial_hashed': self.partial_hashed,
+            'full_hashed': self.full_hashed,
+            'bytes_read': self.bytes_read,
+            'errors': self.errors,
+            'elapsed': self.elapsed,
+        }
+
+
+def collect_files(roots: Iterable[str], min_size: int = DEFAULT_MIN_SIZE,
+                  exclude: Optional[Callable[[str], bool]] = None) -> Tuple[List[FileEntry], int]:
+    """Archivos de al menos min_size bajo las raíces (sin seguir enlaces). Retorna (archivos, errores)"""
+    archivos: List[FileEntry] = []
+    errores = 0
+    vistos = set()
+    pendientes = [raiz for raiz in roots if os.path.isdir(raiz)]
+    while pendientes:
+        ruta = pendientes.pop()
+        clave = os.path.normcase(os.path.abspath(ruta))
+        if clave in vistos:
+            continue
+        vistos.add(clave)
+        try:
+            with os.scandir(ruta) as entradas:
+                for entrada in entradas:
+                    try:
+                        if entrada.is_dir(follow_symlinks=False):
+                            if not is_reparse_point(entrada):
+                                pendientes.append(entrada.path)
+                            continue
+                        if entrada.is_symlink():
+                            continue
+                        info = entrada.stat(follow_symlinks=False)
+                        if info.st_size >= min_size and not (exclude and exclude(entrada.path)):
+                            archivos.append(FileEntry(entrada.path, info.st_size, info.st_mtime))
+                    except OSError:
+                        errores += 1
+        except OSError:
+            errores += 1
+    return archivos, errores
+
+
+def _partial_hash(entrada: FileEntry) -> Tuple[Optional[str], int]:
+    """Hash de los primeros y últimos PARTIAL_BLOCK bytes (todo el archivo si es chico)"""
+    digest = hashlib.blake2b(digest_size=20)
+    buffer = bytearray(PARTIAL_BLOCK)
+    vista = memoryview(buffer)
+    leidos = 0
+    try:
+        with open(entrada.path, "rb", buffering=0) as f:
+            n = f.readinto(buffer)
+            digest.update(vista[:n])
+            leidos += n
+            if entrada.size > 2 * PARTIAL_BLOCK:
+                f.seek(-PARTIAL_BLOCK, os.SEEK_END)
+            if entrada.size > PARTIAL_BLOCK:
+                n = f.readinto(buffer)
+                digest.update(vista[:n])
+                leidos += n
+    except OSError:
+        return None, leidos
+    return digest.hexdigest(), leidos
+
+
+def _full_hash(entrada: FileEntry) -> Tuple[Optional[str], int]:
+    """Hash del archivo completo en bloques de FULL_CHUNK con un búfer reutilizado"""
+    digest = hashlib.blake2b(digest_size=32)
+    buffer = bytearray(FULL_CHUNK)
+    vista = memoryview(buffer)
+    leidos = 0
+    try:
+        with open(entrada.path, "rb", buffering=0) as f:
+            while True:
+                n = f.readinto(buffer)
+                if not n:
+                    break
+                digest.update(vista[:n])
+                leidos += n
+    except OSError:
+        return None, leidos
+    if leidos != entrada.size:
+        # El archivo cambió durante la lectura: no se puede afirmar que sea duplicado
+        return None, leidos
+    return digest.hexdigest(), leidos
+
+
+def _regroup(grupos: Iterable[List[FileEntry]], funcion, pool: ThreadPoolExecutor,
+             informe: DuplicateReport) -> List[Tuple[str, List[FileEntry]]]:
+    """Aplica un hash a cada archivo de cada grupo y subdivide por (tamaño, hash)"""
+    candidatos = [entrada for grupo in grupos for entrada in grupo]
+    nuevos: Dict[Tuple[int, str], List[FileEntry]] = defaultdict(list)
+    for entrada, (digest, leidos) in zip(candidatos, pool.map(funcion, candidatos)):
+        informe.bytes_read += leidos
+        if digest is None:
+            informe.errors += 1
+            continue
+        nuevos[(entrada.size, digest)].append(entrada)
+    return [(digest, grupo) for (_, digest), grupo in nuevos.items() if len(grupo) > 1]
+
+
+def find_duplicates(roots: Iterable[str], min_size: int = DEFAULT_MIN_SIZE,
+                    workers: int = DEFAULT_WORKERS,
+                    exclude: Optional[Callable[[str], bool]] = None) -> DuplicateReport:
+    """
+    Busca archivos duplicados bajo las raíces
+
+    Args:
+        roots: Carpetas a revisar
+        min_size: Tamaño mínimo en bytes (los archivos chicos no valen la pena)
+        workers: Hilos de lectura/hash
+        exclude: ruta -> bool, archivos a ignorar (p. ej. ya incluidos en el plan)
+
+    Returns:
+        DuplicateReport con los grupos ordenados por espacio recuperable
+    """
+    informe = DuplicateReport()
+    inicio = time.monotonic()
+    archivos, informe.errors = collect_files(roots, min_size, exclude)
+    informe.files_scanned = len(archivos)
+
+    # Etapa 1: tamaño
+    por_tamano: Dict[int, List[FileEntry]] = defaultdict(list)
+    for entrada in archivos:
+        por_tamano[entrada.size].append(entrada)
+    grupos = [grupo for grupo in por_tamano.values() if len(grupo) > 1]
+
+    # Enlaces duros al mismo archivo no liberan espacio: conservar uno por inodo
+    for indice, grupo in enumerate(grupos):
+        unicos = {}
+        for entrada in grupo:
+            try:
+                info = os.stat(entrada.path)
+                unicos.setdefault((info.st_dev, info.st_ino) if info.st_ino else entrada.path, entrada)
+            except OSError:
+                informe.errors += 1
+        grupos[indice] = list(unicos.values())
+    grupos = [grupo for grupo in grupos if len(grupo) > 1]
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="dup-hash") as pool:
+        # Etapa 2: hash parcial (definitivo para archivos que entran completos)
+        informe.partial_hashed = sum(len(grupo) for grupo in grupos)
+        parciales = _regroup(grupos, _partial_hash, pool, informe)
+        finales = [(digest, grupo) for digest, grupo in parciales if grupo[0].size <= 2 * PARTIAL_BLOCK]
+        pendientes = [grupo for _, grupo in parciales if grupo[0].size > 2 * PARTIAL_BLOCK]
+
+        # Etapa 3: hash completo solo de los empates restantes
+        informe.full_hashed = sum(len(grupo) for grupo in pendientes)
+        finales.extend(_regroup(pendientes, _full_hash, pool, informe))
+
+    informe.groups = sorted(
+        (DuplicateGroup(grupo[0].size, digest, grupo) for digest, grupo in finales),
+        key=lambda grupo: grupo.reclaimable, reverse=True,
+    )
+    informe.elapsed = time.monotonic() - inicio
+    return informe
+
+
+if __name__ == "__main__":
+    import sys
+
+    raices = sys.argv[1:] or [os.path.join(os.path.expanduser("~"), "Downloads")]
+    resultado = find_duplicates(raices)
+    print(resultado.as_dict())
+    for grupo in resultado.groups[:10]:
+        print(f"{grupo.size / (1024 ** 2):.1f} MB x{len(grupo.files)}: {grupo.original.path}")
+        for copia in grupo.copies:
+            print(f"    duplicado: {copia.path}")
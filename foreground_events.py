@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+foreground_events.py - Fuente de eventos de cambio de ventana en primer plano
+Reemplaza el sondeo periódico de GetForegroundWindow por eventos: el backend de
+producción usa un hook WinEvent (EVENT_SYSTEM_FOREGROUND), existe un backend de
+sondeo como respaldo y uno guionado para pruebas sin Windows.
+"""
+
+import ctypes
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional, Tuple
+
+# Constantes WinEvent
+EVENT_SYSTEM_FOREGROUND = 0x0003
+WINEVENT_OUTOFCONTEXT = 0x0000
+WINEVENT_SKIPOWNPROCESS = 0x0002
+WM_QUIT = 0x0012
+
+
+@dataclass
+class ForegroundChange:
+    """Cambio de foco: PID de la nueva ventana y momento (monotonic ns) del evento"""
+    pid: int
+    timestamp_ns: int
+    hwnd: int = 0
+
+
+class ForegroundEventSource:
+    """
+    Interfaz mínima de una fuente de cambios de primer plano.
+    Los backends publican eventos con _emit(); los consumidores esperan con wait().
+    """
+
+    def __init__(self):
+        self._events: "queue.Queue[Optional[ForegroundChange]]" = queue.Queue()
+        self._last_pid: Optional[int] = None
+
+    def start(self) -> bool:
+        """Inicia el backend. Retorna False si no está disponible."""
+        return True
+
+    def stop(self) -> None:
+        """Detiene el backend"""
+
+    def interrupt(self) -> None:
+        """Despierta a un consumidor bloqueado en wait(), que retorna None"""
+        self._events.put(None)
+
+    def _emit(self, pid: Optional[int], hwnd: int = 0) -> None:
+        # Los hooks pueden repetir el mismo PID (ventanas del mismo proceso)
+        if not pid or pid == self._last_pid:
+            return
+        self._last_pid = pid
+        self._events.put(ForegroundChange(pid, time.monotonic_ns(), hwnd))
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[ForegroundChange]:
+        """
+        Bloquea hasta el próximo cambio de foco o hasta agotar el timeout
+
+        Si se acumularon varios cambios (alt-tab rápido) retorna solo el último,
+        ya que aplicar prioridades a ventanas que ya perdieron el foco es trabajo inútil.
+        """
+        try:
+            evento = self._events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        while evento is not None:
+            try:
+                siguiente = self._events.get_nowait()
+            except queue.Empty:
+                return evento
+            evento = siguiente
+        return None
+
+
+class WinEventForegroundSource(ForegroundEventSource):
+    """Backend de producción: hook WinEvent fuera de contexto en un hilo propio"""
+
+    def __init__(self):
+        super().__init__()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_id = 0
+        self._ready = threading.Event()
+        self._ok = False
+        self._callback = None  # Referencia viva al callback ctypes
+
+    def start(self) -> bool:
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout=5)
+        return self._ok
+
+    def _run(self) -> None:
+        try:
+            from ctypes import wintypes
+            user32 = ctypes.windll.user32
+            kernel32 = ctypes.windll.kernel32
+
+            WinEventProc = ctypes.WINFUNCTYPE(
+                None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD
+            )
+
+            def on_event(hook, event, hwnd, id_object, id_child, thread_id, event_time):
+                pid = wintypes.DWORD()
+                user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+                self._emit(pid.value, hwnd or 0)
+
+            self._callback = WinEventProc(on_event)
+            self._thread_id = kernel32.GetCurrentThreadId()
+            hook = user32.SetWinEventHook(
+                EVENT_SYSTEM_FOREGROUND, EVENT_SYSTEM_FOREGROUND, 0,
+                self._callback, 0, 0,
+                WINEVENT_OUTOFCONTEXT | WINEVENT_SKIPOWNPROCESS
+            )
+            if not hook:
+                self._ready.set()
+                return
+            self._ok = True
+            self._ready.set()
+
+            msg = wintypes.MSG()
+            while user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+            user32.UnhookWinEvent(hook)
+        except Exception as e:
+            print(f"Error en hook de primer plano: {e}")
+            self._ok = False
+            self._ready.set()
+
+    def stop(self) -> None:
+        if self._thread_id:
+            try:
+                ctypes.windll.user32.PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+            except Exception:
+                pass
+
+
+class PollingForegroundSource(ForegroundEventSource):
+    """Backend de respaldo: sondea y emite solo cuando el PID cambia"""
+
+    def __init__(self, get_foreground_pid: Callable[[], Optional[int]], interval: float = 0.25):
+        super().__init__()
+        self._get_pid = get_foreground_pid
+        self.interval = interval
+        self._stop = threading.Event()
+
+    def start(self) -> bool:
+        threading.Thread(target=self._run, daemon=True).start()
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self._emit(self._get_pid())
+            except Exception:
+                continue
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+class ScriptedForegroundSource(ForegroundEventSource):
+    """
+    Backend guionado para pruebas: emite una secuencia fija de (retardo_s, pid)
+    """
+
+    def __init__(self, script: Iterable[Tuple[float, int]]):
+        super().__init__()
+        self._script = list(script)
+        self._stop = threading.Event()
+
+    def start(self) -> bool:
+        threading.Thread(target=self._run, daemon=True).start()
+        return True
+
+    def _run(self) -> None:
+        for retardo, pid in self._script:
+            if self._stop.wait(retardo):
+                return
+            self._emit(pid)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+class LatencyTracker:
+    """Latencias (ns) desde el evento de foco hasta que las prioridades quedaron aplicadas"""
+
+    def __init__(self, max_samples: int = 256):
+        self.max_samples = max_samples
+        self._samples: List[int] = []
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, change: ForegroundChange) -> int:
+        latencia = time.monotonic_ns() - change.timestamp_ns
+        with self._lock:
+            self._samples.append(latencia)
+            if len(self._samples) > self.max_samples:
+                del self._samples[0]
+            self.count += 1
+        return latencia
+
+    def summary(self) -> dict:
+        """Resumen en milisegundos: última, promedio, p95 y máxima"""
+        with self._lock:
+            muestras = sorted(self._samples)
+            ultima = self._samples[-1] if self._samples else 0
+        if not muestras:
+            return {'count': 0, 'last_ms': 0.0, 'avg_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+        p95 = muestras[min(len(muestras) - 1, int(len(muestras) * 0.95))]
+        return {
+            'count': self.count,
+            'last_ms': ultima / 1e6,
+            'avg_ms': sum(muestras) / len(muestras) / 1e6,
+            'p95_ms': p95 / 1e6,
+            'max_ms': muestras[-1] / 1e6,
+        }
+
+
+def create_foreground_source(get_foreground_pid: Callable[[], Optional[int]]) -> ForegroundEventSource:
+    """
+    Crea la mejor fuente disponible: hook WinEvent y, si falla, sondeo rápido.
+    El PID actual se emite de inmediato para que el consumidor aplique el estado inicial.
+    """
+    fuente = WinEventForegroundSource()
+    if not fuente.start():
+        fuente = PollingForegroundSource(get_foreground_pid)
+        fuente.start()
+    try:
+        fuente._emit(get_foreground_pid())
+    except Exception:
+        pass
+    return fuente
+
+
+if __name__ == "__main__":
+    fuente = ScriptedForegroundSource([(0.1, 100), (0.05, 100), (0.1, 200), (0.01, 300)])
+    latencias = LatencyTracker()
+    fuente.start()
+    for _ in range(3):
+        cambio = fuente.wait(timeout=1)
+        if cambio is None:
+            break
+        print(f"Foco en PID {cambio.pid}")
+        latencias.record(cambio)
+    fuente.stop()
+    print(latencias.summary())
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+hardware_facts.py - Caché persistente de datos de hardware y del sistema
+Tipo de chasis, GPUs, topología de CPU, tipo de cada unidad o planes de energía
+instalados no cambian entre dos consultas del mismo arranque, pero averiguarlos
+cuesta consultas WMI/PowerShell de cientos de milisegundos. Cada dato se guarda
+con su propio TTL en un archivo JSON compartido por todos los procesos, y el
+archivo completo se descarta cuando cambia el identificador de arranque
+(BootId de Windows): un reinicio puede traer hardware nuevo.
+
+Un dato cuyo sondeo falla (retorna None) no se guarda, para no fijar hasta el
+próximo reinicio una detección fallida.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import psutil
+
+HARDWARE_FACTS_FILE = ".hardware_facts.json"
+FACTS_FORMAT_VERSION = 1
+
+# Contador de arranques que mantiene Windows (sube en cada inicio)
+BOOT_ID_KEY = r"HKLM\SYSTEM\CurrentControlSet\Control\Session Manager\Memory Management\PrefetchParameters"
+LINUX_BOOT_ID_FILE = "/proc/sys/kernel/random/boot_id"
+
+# Win32_SystemEnclosure.ChassisTypes de portátiles, tablets y convertibles
+LAPTOP_CHASSIS_TYPES = {8, 9, 10, 11, 12, 14, 18, 21, 30, 31, 32}
+# PowerDeterminePlatformRole: móvil y tablet
+POWER_PLATFORM_ROLE_MOBILE = 3
+POWER_PLATFORM_ROLE_SLATE = 4
+
+
+def current_boot_id() -> str:
+    """Identificador del arranque actual (BootId; si no, la hora de arranque)"""
+    try:
+        from registry_access import get_registry
+        boot_id = get_registry().values(BOOT_ID_KEY).get("BootId")
+        if boot_id is not None:
+            return f"win-{boot_id[0]}"
+    except (ImportError, OSError):
+        pass
+    try:
+        with open(LINUX_BOOT_ID_FILE, "r", encoding="ascii") as f:
+            return f"linux-{f.read().strip()}"
+    except OSError:
+        pass
+    # boot_time() se calcula a partir del uptime y puede variar un segundo
+    return f"boot-{round(psutil.boot_time() / 10)}"
+
+
+class HardwareFacts:
+    """
+    Datos cacheados del arranque actual, respaldados por un archivo JSON
+
+    Args:
+        path: Archivo JSON (None = solo en memoria, útil para pruebas)
+        boot_id: Arranque actual (por defecto current_boot_id())
+    """
+
+    def __init__(self, path: Optional[str] = HARDWARE_FACTS_FILE, boot_id: Optional[str] = None):
+        self.path = path
+        self.boot_id = boot_id or current_boot_id()
+        self._facts: Dict[str, Dict[str, Any]] = {}
+        self._dirty: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._facts = self._read()
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        """Datos del archivo si pertenecen a este arranque y formato"""
+        if not self.path:
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                datos = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if datos.get("version") != FACTS_FORMAT_VERSION or datos.get("boot_id") != self.boot_id:
+            return {}
+        hechos = datos.get("facts")
+        return hechos if isinstance(hechos, dict) else {}
+
+    def lookup(self, key: str) -> Any:
+        """Valor vigente de key, o None si no está o venció"""
+        with self._lock:
+            entrada = self._facts.get(key)
+            if entrada is not None:
+                vence = entrada.get("expires")
+                if vence is None or vence > time.time():
+                    self.hits += 1
+                    return entrada.get("value")
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: Any, ttl: Optional[float] = None, save: bool = True) -> None:
+        """
+        Guarda un valor (debe poder serializarse a JSON)
+
+        Args:
+            ttl: Segundos de validez; None = hasta el próximo reinicio
+            save: Escribir el archivo de inmediato
+        """
+        ahora = time.time()
+        entrada = {"value": value, "stored": ahora, "expires": ahora + ttl if ttl is not None else None}
+        with self._lock:
+            self._facts[key] = entrada
+            self._dirty[key] = entrada
+        if save:
+            self.save()
+
+    def get(self, key: str, probe: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """Valor cacheado o, si no hay, el resultado de probe() (que se guarda si no es None)"""
+        valor = self.lookup(key)
+        if valor is None:
+            valor = probe()
+            if valor is not None:
+                self.put(key, valor, ttl)
+        return valor
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Descarta un dato (o todos, con key=None)"""
+        with self._lock:
+            claves = [key] if key is not None else list(self._facts)
+            for clave in claves:
+                self._facts.pop(clave, None)
+                self._dirty[clave] = None
+        self.save()
+
+    def save(self) -> None:
+        """Escribe los cambios, mezclados con lo que otros procesos guardaron entretanto"""
+        if not self.path:
+            with self._lock:
+                self._dirty.clear()
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            hechos = self._read()
+            for clave, entrada in self._dirty.items():
+                if entrada is None:
+                    hechos.pop(clave, None)
+                else:
+                    hechos[clave] = entrada
+            datos = {"version": FACTS_FORMAT_VERSION, "boot_id": self.boot_id, "facts": hechos}
+            temporal = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(temporal, "w", encoding="utf-8") as f:
+                    json.dump(datos, f, indent=2, ensure_ascii=False)
+                os.replace(temporal, self.path)
+            except OSError:
+                return
+            self._dirty.clear()
+            # Lo que escribieron otros procesos también queda disponible
+            for clave, entrada in hechos.items():
+                self._facts.setdefault(clave, entrada)
+
+
+_default_facts: Optional[HardwareFacts] = None
+_default_facts_lock = threading.Lock()
+
+
+def get_hardware_facts() -> HardwareFacts:
+    """Caché compartida del proceso"""
+    global _default_facts
+    with _default_facts_lock:
+        if _default_facts is None:
+            _default_facts = HardwareFacts()
+        return _default_facts
+
+
+def _probe_chassis_types() -> Optional[List[int]]:
+    from powershell_pool import run_powershell
+    try:
+        resultado = run_powershell("(Get-CimInstance -ClassName Win32_SystemEnclosure).ChassisTypes", timeout=10)
+    except Exception:
+        return None
+    if resultado.returncode != 0:
+        return None
+    tipos = [int(linea) for linea in resultado.stdout.split() if linea.strip().isdigit()]
+    return tipos or None
+
+
+def chassis_types() -> List[int]:
+    """Win32_SystemEnclosure.ChassisTypes (cacheado hasta reiniciar)"""
+    return get_hardware_facts().get("chassis_types", _probe_chassis_types) or []
+
+
+def _platform_role() -> Optional[int]:
+    try:
+        import ctypes
+        return ctypes.windll.powrprof.PowerDeterminePlatformRole()
+    except (AttributeError, OSError):
+        return None
+
+
+def is_laptop() -> bool:
+    """Portátil si hay batería, el rol de plataforma es móvil o el chasis es de portátil/tablet"""
+    try:
+        if psutil.sensors_battery() is not None:
+            return True
+    except Exception:
+        pass
+    if _platform_role() in (POWER_PLATFORM_ROLE_MOBILE, POWER_PLATFORM_ROLE_SLATE):
+        return True
+    return any(tipo in LAPTOP_CHASSIS_TYPES for tipo in chassis_types())
+
+
+if __name__ == "__main__":
+    hechos = get_hardware_facts()
+    inicio = time.perf_counter()
+    portatil = is_laptop()
+    print(f"Arranque {hechos.boot_id}: portátil={portatil} chasis={chassis_types()} "
+          f"({(time.perf_counter() - inicio) * 1000:.1f} ms, aciertos {hechos.hits}, fallos {hechos.misses})")
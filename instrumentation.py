@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""
+instrumentation.py - Instrumentación de rutas críticas de los modos del optimizador
+Decoradores y context managers que miden tiempos con time.perf_counter_ns y
+acumulan histogramas logarítmicos por función. Desactivada, cada llamada
+instrumentada cuesta una comprobación de bandera. Activada (variable de entorno
+OPTIMIZER_PROFILE=1), vuelca los histogramas a un archivo JSON local de forma
+periódica y, opcionalmente, los sirve por HTTP en 127.0.0.1.
+"""
+
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Callable, Dict, Optional
+
+PROFILE_ENV = "OPTIMIZER_PROFILE"
+PROFILE_FILE_ENV = "OPTIMIZER_PROFILE_FILE"
+PROFILE_PORT_ENV = "OPTIMIZER_PROFILE_PORT"
+DEFAULT_PROFILE_FILE = "profile_metrics_{script}.json"
+DEFAULT_DUMP_INTERVAL = 60.0
+
+# Cubetas por potencia de 2 en nanosegundos: la cubeta i cubre [2^(i-1), 2^i)
+HISTOGRAM_BUCKETS = 48
+
+
+def _default_profile_file() -> str:
+    # Un archivo por modo: GUI, modoagresivo y modojuego corren como procesos distintos
+    script = os.path.splitext(os.path.basename(sys.argv[0] if sys.argv else ""))[0] or "python"
+    return DEFAULT_PROFILE_FILE.format(script=script)
+
+
+class TimingStats:
+    """Contadores y histograma logarítmico de duraciones (ns) de un punto medido"""
+
+    __slots__ = ('count', 'errors', 'total_ns', 'min_ns', 'max_ns', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_ns = 0
+        self.min_ns = 0
+        self.max_ns = 0
+        self.buckets = array('Q', bytes(8 * HISTOGRAM_BUCKETS))
+
+    def add(self, ns: int, error: bool = False) -> None:
+        self.count += 1
+        self.total_ns += ns
+        if error:
+            self.errors += 1
+        if self.count == 1 or ns < self.min_ns:
+            self.min_ns = ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+        self.buckets[min(ns.bit_length(), HISTOGRAM_BUCKETS - 1)] += 1
+
+    def percentile_ns(self, q: float) -> int:
+        """Cota superior aproximada (límite de cubeta) del percentil q"""
+        objetivo = self.count * q / 100.0
+        acumulado = 0
+        for indice, cantidad in enumerate(self.buckets):
+            acumulado += cantidad
+            if cantidad and acumulado >= objetivo:
+                return min(1 << indice, self.max_ns)
+        return self.max_ns
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'total_ms': self.total_ns / 1e6,
+            'avg_us': (self.total_ns / self.count / 1e3) if self.count else 0.0,
+            'min_us': self.min_ns / 1e3,
+            'max_us': self.max_ns / 1e3,
+            'p50_us': self.percentile_ns(50) / 1e3,
+            'p95_us': self.percentile_ns(95) / 1e3,
+            'p99_us': self.percentile_ns(99) / 1e3,
+            # Histograma disperso: límite superior de la cubeta (us) -> cantidad
+            'histogram_us': {
+                f"{(1 << indice) / 1e3:g}": cantidad
+                for indice, cantidad in enumerate(self.buckets) if cantidad
+            },
+        }
+
+
+class Instrumentation:
+    """Registro de tiempos y contadores de un proceso"""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._timings: Dict[str, TimingStats] = {}
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self._dump_thread: Optional[threading.Thread] = None
+        self._server: Optional[HTTPServer] = None
+
+    def record(self, name: str, ns: int, error: bool = False) -> None:
+        with self._lock:
+            stats = self._timings.get(name)
+            if stats is None:
+                stats = self._timings[name] = TimingStats()
+            stats.add(ns, error)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """Incrementa un contador (no hace nada si la instrumentación está desactivada)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def instrumented(self, name: Optional[str] = None) -> Callable:
+        """Decorador que mide cada llamada a la función"""
+        def decorador(func: Callable) -> Callable:
+            etiqueta = name or f"{func.__module__}.{func.__qualname__}"
+
+            @functools.wraps(func)
+            def envoltura(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                inicio = time.perf_counter_ns()
+                error = False
+                try:
+                    return func(*args, **kwargs)
+                except BaseException:
+                    error = True
+                    raise
+                finally:
+                    self.record(etiqueta, time.perf_counter_ns() - inicio, error)
+
+            return envoltura
+        return decorador
+
+    @contextmanager
+    def timed(self, name: str):
+        """Context manager que mide el bloque"""
+        if not self.enabled:
+            yield
+            return
+        inicio = time.perf_counter_ns()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.record(name, time.perf_counter_ns() - inicio, error)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Estado actual de todos los tiempos y contadores"""
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'started': self._started,
+                'timestamp': time.time(),
+                'timings': {nombre: stats.as_dict() for nombre, stats in sorted(self._timings.items())},
+                'counters': dict(sorted(self._counters.items())),
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._timings.clear()
+            self._counters.clear()
+
+    def dump(self, path: Optional[str] = None) -> Optional[str]:
+        """
+        Escribe el estado actual a un archivo JSON (escritura atómica)
+
+        Returns:
+            Ruta escrita, o None si está desactivada o falló
+        """
+        if not self.enabled:
+            return None
+        ruta = path or os.environ.get(PROFILE_FILE_ENV) or _default_profile_file()
+        try:
+            temporal = f"{ruta}.tmp"
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(self.snapshot(), f, indent=2)
+            os.replace(temporal, ruta)
+            return ruta
+        except OSError as e:
+            print(f"Error guardando perfil: {e}")
+            return None
+
+    def start_autodump(self, interval: float = DEFAULT_DUMP_INTERVAL, path: Optional[str] = None) -> None:
+        """
+        Vuelca periódicamente en un hilo daemon. Los modos se detienen con
+        terminate() u os._exit(), por lo que no se puede depender solo de atexit.
+        """
+        if self._dump_thread is not None:
+            return
+
+        def bucle():
+            while True:
+                time.sleep(interval)
+                self.dump(path)
+
+        self._dump_thread = threading.Thread(target=bucle, name="profile-dump", daemon=True)
+        self._dump_thread.start()
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> int:
+        """Sirve el estado actual como JSON por HTTP (GET /). Retorna el puerto usado."""
+        registro = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                cuerpo = json.dumps(registro.snapshot(), indent=2).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = HTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="profile-http", daemon=True).start()
+        return self._server.server_address[1]
+
+
+# Registro global, configurado por variables de entorno al importar
+profiler = Instrumentation(enabled=os.environ.get(PROFILE_ENV) == "1")
+
+instrumented = profiler.instrumented
+timed = profiler.timed
+count = profiler.count
+
+
+def enable(dump_interval: float = DEFAULT_DUMP_INTERVAL, port: Optional[int] = None) -> None:
+    """Activa la instrumentación con volcado periódico y al salir"""
+    profiler.enabled = True
+    profiler.start_autodump(dump_interval)
+    atexit.register(profiler.dump)
+    if port is not None:
+        try:
+            profiler.serve(port)
+        except OSError as e:
+            print(f"No se pudo iniciar el endpoint de perfil: {e}")
+
+
+def dump() -> Optional[str]:
+    """Vuelca el registro global (no hace nada si está desactivado)"""
+    return profiler.dump()
+
+
+if profiler.enabled:
+    _puerto = os.environ.get(PROFILE_PORT_ENV)
+    enable(port=int(_puerto) if _puerto else None)
+
+
+if __name__ == "__main__":
+    prueba = Instrumentation()
+
+    @prueba.instrumented("demo.suma")
+    def suma(a, b):
+        return a + b
+
+    iteraciones = 200000
+    original = suma.__wrapped__
+    inicio = time.perf_counter_ns()
+    for i in range(iteraciones):
+        original(i, 1)
+    base = (time.perf_counter_ns() - inicio) / iteraciones
+
+    inicio = time.perf_counter_ns()
+    for i in range(iteraciones):
+        suma(i, 1)
+    desactivada = (time.perf_counter_ns() - inicio) / iteraciones
+
+    prueba.enabled = True
+    inicio = time.perf_counter_ns()
+    for i in range(iteraciones):
+        suma(i, 1)
+    activada = (time.perf_counter_ns() - inicio) / iteraciones
+
+    with prueba.timed("demo.bloque"):
+        time.sleep(0.01)
+
+    print(f"Costo por llamada: sin instrumentar {base:.0f} ns, "
+          f"desactivada {desactivada:.0f} ns, activada {activada:.0f} ns")
+    print(json.dumps(prueba.snapshot()['timings']['demo.bloque'], indent=2))
@@ -0,0 +1,423 @@
+# -*- coding: utf-8 -*-
+"""
+mode_state.py - Bus de estado de modo entre procesos (GUI, modo agresivo, modo juego)
+Reemplaza la lectura de .mode_state.json en cada iteración de cada monitor por un
+canal con notificación de cambios: un servidor local (127.0.0.1) guarda el estado
+vigente y lo envía a todos los suscriptores en cuanto cambia. El primer proceso
+que lo necesita lo hospeda. El archivo se sigue escribiendo como persistencia y
+como respaldo; cuando no hay servidor se lee con caché por mtime (sin reabrir ni
+parsear el JSON si no cambió).
+"""
+
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+MODE_STATE_FILE = ".mode_state.json"
+MODE_STATE_HOST = "127.0.0.1"
+MODE_STATE_PORT = 47613
+STATE_GAME = "game"
+
+# Espera entre intentos de reconexión cuando el proceso que hospedaba el servidor termina
+RECONNECT_DELAY = 0.2
+
+ModeState = Optional[Dict[str, Any]]
+
+
+def is_game_state(state: ModeState) -> bool:
+    """True si el estado corresponde al modo juego"""
+    return bool(state) and state.get("state") == STATE_GAME
+
+
+class CachedStateFile:
+    """
+    Lector/escritor del archivo de estado con caché por (mtime, tamaño, inodo).
+    Un stat() por consulta; el JSON solo se vuelve a parsear si el archivo cambió.
+    """
+
+    def __init__(self, path: str = MODE_STATE_FILE):
+        self.path = path
+        self._key: Optional[Tuple[int, int, int]] = None
+        self._state: ModeState = None
+        self.reads = 0
+
+    def read(self) -> ModeState:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._key = None
+            self._state = None
+            return None
+        except OSError:
+            return self._state
+
+        clave = (st.st_mtime_ns, st.st_size, st.st_ino)
+        if clave != self._key:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._state = json.load(f)
+                self._key = clave
+                self.reads += 1
+            except (OSError, ValueError):
+                # Escritura en curso: conservar el último estado válido
+                pass
+        return self._state
+
+    def write(self, state: ModeState) -> None:
+        """Escribe el estado de forma atómica (archivo temporal + reemplazo)"""
+        if state is None:
+            self.clear()
+            return
+        temporal = f"{self.path}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(temporal, self.path)
+
+    def clear(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _encode(message: Dict[str, Any]) -> bytes:
+    return (json.dumps(message) + "\n").encode("utf-8")
+
+
+class ModeStateHub:
+    """
+    Servidor local que guarda el estado vigente y lo difunde a todos los clientes.
+    Protocolo: líneas JSON. Cliente -> servidor: {"op": "set", "state": ...};
+    servidor -> cliente: {"state": ...} al conectarse y en cada cambio.
+    """
+
+    def __init__(self, host: str = MODE_STATE_HOST, port: int = MODE_STATE_PORT,
+                 initial: ModeState = None):
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if sys.platform == "win32":
+            # Evita que otro proceso se apropie del puerto mientras está en uso
+            self._server.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+        else:
+            self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            self._server.bind((host, port))
+            self._server.listen(16)
+        except OSError:
+            self._server.close()
+            raise
+        self.port = self._server.getsockname()[1]
+        self._state = initial
+        self._clients: List[socket.socket] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def start(self) -> "ModeStateHub":
+        threading.Thread(target=self._accept_loop, name="mode-state-hub", daemon=True).start()
+        return self
+
+    def _accept_loop(self) -> None:
+        while not self._closed:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            if self._closed:
+                conn.close()
+                return
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with self._lock:
+                self._clients.append(conn)
+                try:
+                    conn.sendall(_encode({"state": self._state}))
+                except OSError:
+                    self._clients.remove(conn)
+                    continue
+            threading.Thread(target=self._client_loop, args=(conn,), daemon=True).start()
+
+    def _client_loop(self, conn: socket.socket) -> None:
+        try:
+            for linea in conn.makefile("r", encoding="utf-8"):
+                try:
+                    mensaje = json.loads(linea)
+                except ValueError:
+                    continue
+                if mensaje.get("op") == "set":
+                    self._set(mensaje.get("state"))
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                if conn in self._clients:
+                    self._clients.remove(conn)
+            conn.close()
+
+    def _set(self, state: ModeState) -> None:
+        with self._lock:
+            self._state = state
+            datos = _encode({"state": state})
+            for cliente in list(self._clients):
+                try:
+                    cliente.sendall(datos)
+                except OSError:
+                    self._clients.remove(cliente)
+
+    def close(self) -> None:
+        self._closed = True
+        # shutdown() desbloquea accept() en todas las plataformas; close() solo no basta
+        for cerrar in (lambda: self._server.shutdown(socket.SHUT_RDWR), self._server.close):
+            try:
+                cerrar()
+            except OSError:
+                pass
+        with self._lock:
+            for cliente in self._clients:
+                try:
+                    cliente.shutdown(socket.SHUT_RDWR)
+                    cliente.close()
+                except OSError:
+                    pass
+            self._clients.clear()
+
+
+class ModeStateBus:
+    """
+    Cliente del bus de estado. get() responde desde memoria mientras hay conexión
+    y desde el archivo (con caché por mtime) si no la hay. Los suscriptores se
+    invocan desde el hilo lector en cuanto llega un cambio.
+
+    Args:
+        path: Archivo de estado (persistencia y respaldo)
+        host, port: Dirección del servidor local
+        host_hub: Si no hay servidor, hospedarlo en este proceso
+    """
+
+    def __init__(self, path: str = MODE_STATE_FILE, host: str = MODE_STATE_HOST,
+                 port: int = MODE_STATE_PORT, host_hub: bool = True):
+        self.host = host
+        self.port = port
+        self.host_hub = host_hub
+        self.hub: Optional[ModeStateHub] = None
+        self._file = CachedStateFile(path)
+        self._state: ModeState = None
+        self._sock: Optional[socket.socket] = None
+        self._send_lock = threading.Lock()
+        self._changed = threading.Condition()
+        self._connected = threading.Event()
+        self._callbacks: List[Callable[[ModeState], None]] = []
+        self._closed = False
+        self.version = 0
+
+    def start(self, timeout: float = 1.0) -> "ModeStateBus":
+        """Conecta en segundo plano; espera hasta timeout el estado inicial"""
+        threading.Thread(target=self._run, name="mode-state-bus", daemon=True).start()
+        self._connected.wait(timeout)
+        return self
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    def _connect(self) -> Optional[socket.socket]:
+        try:
+            return socket.create_connection((self.host, self.port), timeout=0.5)
+        except OSError:
+            pass
+        if not self.host_hub or self.hub is not None:
+            return None
+        try:
+            self.hub = ModeStateHub(self.host, self.port, self._file.read()).start()
+        except OSError:
+            # Otro proceso ganó la carrera por el puerto
+            return None
+        try:
+            return socket.create_connection((self.host, self.port), timeout=0.5)
+        except OSError:
+            return None
+
+    def _run(self) -> None:
+        while not self._closed:
+            sock = self._connect()
+            if sock is None:
+                time.sleep(RECONNECT_DELAY)
+                continue
+            sock.settimeout(None)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._sock = sock
+            try:
+                for linea in sock.makefile("r", encoding="utf-8"):
+                    try:
+                        self._apply(json.loads(linea).get("state"))
+                    except ValueError:
+                        continue
+                    self._connected.set()
+            except OSError:
+                pass
+            finally:
+                self._sock = None
+                self._connected.clear()
+                try:
+                    sock.close()
+                except OSError:
+                    pass
+            if not self._closed:
+                time.sleep(RECONNECT_DELAY)
+
+    def _apply(self, state: ModeState) -> None:
+        with self._changed:
+            if state == self._state:
+                return
+            self._state = state
+            self.version += 1
+            self._changed.notify_all()
+        for callback in list(self._callbacks):
+            try:
+                callback(state)
+            except Exception as e:
+                print(f"Error en suscriptor de estado: {e}")
+
+    def get(self) -> ModeState:
+        """Estado vigente (None si no hay modo especial activo)"""
+        if self._connected.is_set():
+            return self._state
+        return self._file.read()
+
+    def is_game_mode(self) -> bool:
+        return is_game_state(self.get())
+
+    def publish(self, state: ModeState) -> None:
+        """Publica un nuevo estado: lo persiste y lo difunde a todos los procesos"""
+        self._file.write(state)
+        if not self._send({"op": "set", "state": state}):
+            self._apply(state)
+
+    def clear(self) -> None:
+        self.publish(None)
+
+    def _send(self, message: Dict[str, Any]) -> bool:
+        sock = self._sock
+        if sock is None:
+            return False
+        try:
+            with self._send_lock:
+                sock.sendall(_encode(message))
+            return True
+        except OSError:
+            return False
+
+    def subscribe(self, callback: Callable[[ModeState], None]) -> None:
+        """Registra una función a invocar con cada nuevo estado"""
+        self._callbacks.append(callback)
+
+    def wait_for_change(self, version: int, timeout: Optional[float] = None) -> int:
+        """Bloquea hasta que version cambie respecto a la dada; retorna la versión actual"""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def close(self) -> None:
+        self._closed = True
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self.hub is not None:
+            self.hub.close()
+
+
+# Bus global del proceso actual
+_mode_bus = None
+_mode_bus_lock = threading.Lock()
+
+
+def get_mode_bus() -> ModeStateBus:
+    """Obtiene o crea (y conecta) el bus de estado global"""
+    global _mode_bus
+    if _mode_bus is None:
+        with _mode_bus_lock:
+            if _mode_bus is None:
+                _mode_bus = ModeStateBus().start()
+    return _mode_bus
+
+
+def benchmark(transitions: int = 2000) -> Dict[str, float]:
+    """
+    Mide transiciones por segundo y latencia de propagación publicador -> suscriptor,
+    y compara el costo de consultar el estado contra abrir y parsear el archivo.
+    """
+    import tempfile
+
+    directorio = tempfile.mkdtemp()
+    ruta = os.path.join(directorio, "mode_state.json")
+    hub = ModeStateHub(port=0).start()
+    publicador = ModeStateBus(ruta, port=hub.port, host_hub=False).start()
+    suscriptor = ModeStateBus(ruta, port=hub.port, host_hub=False).start()
+
+    latencias: List[int] = []
+    recibido = threading.Event()
+
+    def al_cambiar(state: ModeState) -> None:
+        if state:
+            latencias.append(time.monotonic_ns() - state["timestamp_ns"])
+            recibido.set()
+
+    suscriptor.subscribe(al_cambiar)
+
+    inicio = time.perf_counter()
+    for i in range(transitions):
+        recibido.clear()
+        publicador.publish({
+            "state": STATE_GAME if i % 2 == 0 else "aggressive",
+            "seq": i,
+            "timestamp_ns": time.monotonic_ns(),
+        })
+        recibido.wait(1.0)
+    duracion = time.perf_counter() - inicio
+
+    # Costo por consulta: bus en memoria vs archivo abierto y parseado cada vez
+    consultas = 20000
+    t0 = time.perf_counter()
+    for _ in range(consultas):
+        suscriptor.is_game_mode()
+    costo_bus = (time.perf_counter() - t0) / consultas
+    t0 = time.perf_counter()
+    for _ in range(consultas):
+        with open(ruta, "r", encoding="utf-8") as f:
+            is_game_state(json.load(f))
+    costo_archivo = (time.perf_counter() - t0) / consultas
+
+    publicador.close()
+    suscriptor.close()
+    hub.close()
+    try:
+        os.remove(ruta)
+        os.rmdir(directorio)
+    except OSError:
+        pass
+
+    muestras = sorted(latencias) or [0]
+    return {
+        'transitions': transitions,
+        'received': len(latencias),
+        'transitions_per_s': transitions / duracion if duracion else 0.0,
+        'latency_p50_ms': muestras[len(muestras) // 2] / 1e6,
+        'latency_p95_ms': muestras[min(len(muestras) - 1, int(len(muestras) * 0.95))] / 1e6,
+        'latency_max_ms': muestras[-1] / 1e6,
+        'bus_query_us': costo_bus * 1e6,
+        'file_query_us': costo_archivo * 1e6,
+    }
+
+
+if __name__ == "__main__":
+    resultado = benchmark()
+    print(f"Transiciones: {resultado['received']}/{resultado['transitions']} "
+          f"({resultado['transitions_per_s']:.0f}/s)")
+    print(f"Latencia de propagación: p50 {resultado['latency_p50_ms']:.3f} ms, "
+          f"p95 {resultado['latency_p95_ms']:.3f} ms, máx {resultado['latency_max_ms']:.3f} ms")
+    print(f"Consulta de estado: bus {resultado['bus_query_us']:.2f} us, "
+          f"archivo {resultado['file_query_us']:.2f} us")
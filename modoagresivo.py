@@ -21,7 +21,19 @@ try:
 except ImportError:
     sys.exit(1)
 
-STATE_FILE = ".mode_state.json"
+from process_snapshot import (
+    get_cpu_sampler, get_snapshot, get_snapshot_service, get_process_tree, open_process
+)
+from foreground_events import LatencyTracker, create_foreground_source
+from task_scheduler import CooperativeScheduler
+from demand_estimator import DemandEstimator
+from instrumentation import count as contar, dump as guardar_perfil, instrumented, profiler
+from mode_state import get_mode_bus, is_game_state
+from hardware_facts import is_laptop as hardware_is_laptop
+from priority_state_cache import (
+    AppliedStateCache, FIELD_AFFINITY, FIELD_IO_PRIORITY, FIELD_MEMORY_PRIORITY, FIELD_PRIORITY
+)
+
 CURRENT_MODE = "aggressive"
 NOMBRE_ARCHIVO_CONFIG = "config.json"
 PROCESS_SET_INFORMATION = 0x0200
@@ -30,10 +42,7 @@ INTERVALO_MONITOREO_RAM_SEGUNDOS = 60
 TIEMPO_ESPERA_POST_LIMPIEZA_MINUTOS = 60
 TIEMPO_INACTIVIDAD_PARA_CIERRE_MINUTOS = 60
 CPU_UMBRAL_INACTIVIDAD_PORCENTAJE = 1.0
-
-# Constantes para gestión de energía
-POWER_PLATFORM_ROLE_MOBILE = 3
-POWER_PLATFORM_ROLE_SLATE = 4
+INTERVALO_VERIFICACION_APAGADO_SEGUNDOS = 2.0
 
 class MEMORY_PRIORITY_INFORMATION(ctypes.Structure):
     _fields_ = [("MemoryPriority", ctypes.c_ulong)]
@@ -49,14 +58,8 @@ class SYSTEM_POWER_STATUS(ctypes.Structure):
     ]
 
 def check_shutdown_signal():
-    if not os.path.exists(STATE_FILE):
-        return False
-    try:
-        with open(STATE_FILE, "r", encoding="utf-8") as f:
-            state = json.load(f)
-            return state.get("state") == "game"
-    except (FileNotFoundError, json.JSONDecodeError, KeyError):
-        return False
+    """True si el modo juego está activo (consulta en memoria al bus de estado)"""
+    return get_mode_bus().is_game_mode()
 
 def es_admin():
     try:
@@ -70,25 +73,13 @@ def solicitar_admin():
 
 def es_laptop():
     """
-    Detecta si el equipo es una laptop/portátil.
+    Detecta si el equipo es una laptop/portátil (batería o tipo de chasis).
     Retorna True si es laptop, False si es PC de escritorio.
+    El chasis se consulta una vez por arranque (hardware_facts).
     """
     try:
-        # Método 1: Verificar si hay batería
-        battery = psutil.sensors_battery()
-        if battery is None:
-            return False
-        
-        # Método 2: Verificar el rol de la plataforma en Windows
-        PwrGetPlatformRole = ctypes.windll.powrprof.PowerDeterminePlatformRole
-        role = PwrGetPlatformRole()
-        
-        # Roles 3 y 4 corresponden a laptops/tablets
-        if role in [POWER_PLATFORM_ROLE_MOBILE, POWER_PLATFORM_ROLE_SLATE]:
-            return True
-        
-        return True  # Si tiene batería, es laptop
-    except:
+        return hardware_is_laptop()
+    except Exception:
         return False
 
 def obtener_estado_bateria():
@@ -331,90 +322,90 @@ def obtener_plan_energia_activo():
         pass
     return None
 
+# Estimador de demanda compartido (tasas sobre una ventana deslizante, sin bloquear)
+_estimador_demanda = None
+
 def calcular_demanda_sistema():
     """
     Calcula la demanda actual del sistema.
     Retorna un valor entre 0 (sin demanda) y 100 (demanda máxima)
     """
+    global _estimador_demanda
     try:
-        # Factores de demanda
-        cpu_percent = psutil.cpu_percent(interval=0.5)
-        
-        # Uso de disco (IO)
-        disk_io = psutil.disk_io_counters()
-        disk_usage = 0
-        if hasattr(disk_io, 'read_bytes') and hasattr(disk_io, 'write_bytes'):
-            # Simplificación: si hay actividad reciente de disco
-            disk_usage = min((disk_io.read_bytes + disk_io.write_bytes) / (100 * 1024 * 1024), 100)
-        
-        # Uso de red
-        net_io = psutil.net_io_counters()
-        net_usage = 0
-        if hasattr(net_io, 'bytes_sent') and hasattr(net_io, 'bytes_recv'):
-            net_usage = min((net_io.bytes_sent + net_io.bytes_recv) / (50 * 1024 * 1024), 100)
-        
-        # Ponderación: CPU es el factor más importante
-        demanda = (cpu_percent * 0.7) + (disk_usage * 0.2) + (net_usage * 0.1)
-        
-        return min(demanda, 100)
+        if _estimador_demanda is None:
+            _estimador_demanda = DemandEstimator()
+        demanda = _estimador_demanda.demand()
+        return 50 if demanda is None else demanda
     except:
         return 50  # Valor por defecto en caso de error
 
-def monitor_energia():
+INTERVALO_MONITOREO_ENERGIA_SEGUNDOS = 15
+RETARDO_INICIAL_ENERGIA_SEGUNDOS = 10
+# Con demanda alta se posterga el ahorro de batería hasta el nivel crítico
+UMBRAL_DEMANDA_ALTA = 70
+BATERIA_CRITICA_PORCENTAJE = 10
+
+def crear_tarea_energia():
     """
-    Monitorea el estado del sistema y ajusta el plan de energía dinámicamente.
+    Crea la tarea periódica que monitorea el estado del sistema y ajusta el plan
+    de energía dinámicamente. La primera ejecución aplica el plan inicial.
     """
     is_laptop = es_laptop()
-    plan_actual = None
-    ultimo_cambio = time.time()
+    estado = {"plan_actual": None, "ultimo_cambio": time.time()}
     TIEMPO_MIN_ENTRE_CAMBIOS = 30  # Segundos mínimos entre cambios de plan
     
-    # Esperar 10 segundos antes de comenzar
-    time.sleep(10)
+    # Primera muestra de contadores: la ventana ya tiene historia en el primer tick
+    calcular_demanda_sistema()
     
-    # Aplicar plan inicial
-    if is_laptop:
-        porcentaje_bat, conectada = obtener_estado_bateria()
-        if porcentaje_bat <= 20 and not conectada:
-            aplicar_plan_energia_profesional("ahorro_bateria")
-            mostrar_notificacion_energia("ahorro_bateria")
-            plan_actual = "ahorro_bateria"
-        else:
-            aplicar_plan_energia_profesional("eficiencia_laptop")
-            mostrar_notificacion_energia("eficiencia_laptop")
-            plan_actual = "eficiencia_laptop"
-    else:
-        aplicar_plan_energia_profesional("eficiencia_adaptativa")
-        mostrar_notificacion_energia("eficiencia_adaptativa")
-        plan_actual = "eficiencia_adaptativa"
+    def aplicar(tipo_plan):
+        aplicar_plan_energia_profesional(tipo_plan)
+        mostrar_notificacion_energia(tipo_plan)
+        estado["plan_actual"] = tipo_plan
+    
+    def ahorro_necesario(porcentaje_bat, conectada, demanda):
+        if conectada or porcentaje_bat > 20:
+            return False
+        if porcentaje_bat <= BATERIA_CRITICA_PORCENTAJE:
+            return True
+        return demanda < UMBRAL_DEMANDA_ALTA
     
-    while True:
+    def tarea():
         try:
-            if check_shutdown_signal():
-                break
+            # Demanda real sobre la ventana deslizante (retorna de inmediato)
+            demanda = calcular_demanda_sistema()
+            
+            # Aplicar plan inicial
+            if estado["plan_actual"] is None:
+                if is_laptop:
+                    porcentaje_bat, conectada = obtener_estado_bateria()
+                    if ahorro_necesario(porcentaje_bat, conectada, demanda):
+                        aplicar("ahorro_bateria")
+                    else:
+                        aplicar("eficiencia_laptop")
+                else:
+                    aplicar("eficiencia_adaptativa")
+                return INTERVALO_MONITOREO_ENERGIA_SEGUNDOS
             
             tiempo_actual = time.time()
             
             if is_laptop:
                 porcentaje_bat, conectada = obtener_estado_bateria()
+                puede_cambiar = (tiempo_actual - estado["ultimo_cambio"]) > TIEMPO_MIN_ENTRE_CAMBIOS
                 
-                # Lógica para laptop
-                if porcentaje_bat <= 20 and not conectada:
-                    if plan_actual != "ahorro_bateria" and (tiempo_actual - ultimo_cambio) > TIEMPO_MIN_ENTRE_CAMBIOS:
-                        aplicar_plan_energia_profesional("ahorro_bateria")
-                        mostrar_notificacion_energia("ahorro_bateria")
-                        plan_actual = "ahorro_bateria"
-                        ultimo_cambio = tiempo_actual
-                elif plan_actual != "eficiencia_laptop" and (tiempo_actual - ultimo_cambio) > TIEMPO_MIN_ENTRE_CAMBIOS:
-                    aplicar_plan_energia_profesional("eficiencia_laptop")
-                    mostrar_notificacion_energia("eficiencia_laptop")
-                    plan_actual = "eficiencia_laptop"
-                    ultimo_cambio = tiempo_actual
+                # Lógica para laptop: batería baja -> ahorro, salvo carga alta sostenida
+                if ahorro_necesario(porcentaje_bat, conectada, demanda):
+                    if estado["plan_actual"] != "ahorro_bateria" and puede_cambiar:
+                        aplicar("ahorro_bateria")
+                        estado["ultimo_cambio"] = tiempo_actual
+                elif estado["plan_actual"] != "eficiencia_laptop" and puede_cambiar:
+                    aplicar("eficiencia_laptop")
+                    estado["ultimo_cambio"] = tiempo_actual
             
-            # Pequeña pausa antes del siguiente chequeo
-            time.sleep(15)  # Verificar cada 15 segundos
+            return INTERVALO_MONITOREO_ENERGIA_SEGUNDOS
         except:
-            time.sleep(30)
+            return 30
+    
+    return tarea
 
 # Config cache for optimization
 _config_cache = None
@@ -467,44 +458,32 @@ def obtener_todos_hijos_recursivo(pid, hijos_set=None):
     """
     Obtiene todos los procesos hijos de un PID de forma recursiva.
     Retorna un set con todos los PIDs hijos (incluyendo nietos, bisnietos, etc.)
+    Se resuelve sobre el índice padre/hijos de la instantánea compartida.
     """
     if hijos_set is None:
         hijos_set = set()
     
     try:
-        proceso_padre = psutil.Process(pid)
-        hijos_directos = proceso_padre.children(recursive=False)
-        
-        for hijo in hijos_directos:
-            if hijo.pid not in hijos_set:
-                hijos_set.add(hijo.pid)
-                # Recursión para obtener todos los descendientes
-                obtener_todos_hijos_recursivo(hijo.pid, hijos_set)
+        hijos_set.update(get_process_tree().descendants(pid))
     except:
         pass
     
     return hijos_set
 
-def obtener_todas_instancias_proceso(nombre_proceso):
+def obtener_todas_instancias_proceso(nombre_proceso, snapshot=None):
     """
     Obtiene todos los PIDs de procesos con el mismo nombre.
     Ejemplo: todos los chrome.exe, todos los svchost.exe, etc.
+    Consulta la instantánea compartida en lugar de recorrer la tabla de procesos.
     """
-    pids = set()
-    nombre_lower = nombre_proceso.lower()
-    
     try:
-        for proc in psutil.process_iter(['pid', 'name']):
-            try:
-                if proc.info['name'].lower() == nombre_lower:
-                    pids.add(proc.pid)
-            except:
-                continue
+        if snapshot is None:
+            snapshot = get_snapshot()
+        return snapshot.pids_by_name(nombre_proceso)
     except:
-        pass
-    
-    return pids
+        return set()
 
+@instrumented()
 def obtener_grupo_completo_proceso(pid):
     """
     Obtiene el grupo completo de un proceso:
@@ -518,24 +497,20 @@ def obtener_grupo_completo_proceso(pid):
     nombre_proceso = None
     
     try:
-        proceso = psutil.Process(pid)
-        nombre_proceso = proceso.name()
-        
-        # 1. Agregar el PID principal
-        grupo_pids.add(pid)
+        snapshot = get_snapshot()
+        if pid not in snapshot:
+            # Proceso recién creado: forzar un recorrido nuevo
+            snapshot = get_snapshot_service().refresh()
+        nombre_proceso = snapshot.name(pid)
+        if nombre_proceso is None:
+            return grupo_pids, None
         
-        # 2. Obtener todos los hijos recursivamente
-        hijos = obtener_todos_hijos_recursivo(pid)
-        grupo_pids.update(hijos)
+        # 1. PID principal + todas las instancias con el mismo nombre
+        instancias_mismo_nombre = obtener_todas_instancias_proceso(nombre_proceso, snapshot)
+        instancias_mismo_nombre.add(pid)
         
-        # 3. Obtener todas las instancias con el mismo nombre
-        instancias_mismo_nombre = obtener_todas_instancias_proceso(nombre_proceso)
-        
-        # 4. Para cada instancia, obtener también sus hijos
-        for instancia_pid in instancias_mismo_nombre:
-            grupo_pids.add(instancia_pid)
-            hijos_instancia = obtener_todos_hijos_recursivo(instancia_pid)
-            grupo_pids.update(hijos_instancia)
+        # 2. Expandir con todos los descendientes de cada instancia
+        grupo_pids = get_process_tree().expand(instancias_mismo_nombre)
     except:
         pass
     
@@ -573,57 +548,118 @@ def establecer_prioridad_memoria(pid, prioridad):
         h_proceso = win32api.OpenProcess(PROCESS_SET_INFORMATION, False, pid)
         if h_proceso:
             info_prioridad = MEMORY_PRIORITY_INFORMATION(prioridad)
-            ctypes.windll.kernel32.SetProcessInformation(
+            ok = ctypes.windll.kernel32.SetProcessInformation(
                 int(h_proceso),
                 win32process.ProcessMemoryPriority,
                 ctypes.byref(info_prioridad),
                 ctypes.sizeof(info_prioridad)
             )
             win32api.CloseHandle(h_proceso)
+            return bool(ok)
     except:
         pass
+    return False
 
-def establecer_prioridad_io(pid, prioridad_io):
+def establecer_prioridad_io(pid, prioridad_io, proceso=None):
     try:
-        proceso = psutil.Process(pid)
+        if proceso is None:
+            proceso = psutil.Process(pid)
         proceso.ionice(prioridad_io)
+        return True
     except:
-        pass
+        return False
+
+# Último estado aplicado por proceso (pid, create_time)
+_estado_aplicado = AppliedStateCache()
+
+def calcular_afinidad_grupo(es_primer_plano, nucleos_totales):
+    """Retorna la lista de núcleos objetivo o None si no se modifica la afinidad"""
+    if es_primer_plano:
+        if nucleos_totales >= 8:
+            return tuple(range(1, nucleos_totales))
+        return tuple(range(nucleos_totales))
+    if nucleos_totales >= 8:
+        return tuple([0] + list(range(nucleos_totales - 3, nucleos_totales)))
+    elif nucleos_totales >= 4:
+        return (0, 3)
+    elif nucleos_totales >= 2:
+        return (1,)
+    return None
 
+@instrumented()
 def aplicar_configuracion_a_grupo(pids_grupo, es_primer_plano, nucleos_totales):
     """
     Aplica configuración de prioridad a un grupo completo de procesos.
+    Solo emite llamadas al sistema para los campos cuyo valor difiere del
+    último estado aplicado a ese proceso.
     """
     MEMORY_PRIORITY_LOW = 1
     MEMORY_PRIORITY_NORMAL = 3
     
+    if es_primer_plano:
+        objetivo = {
+            FIELD_PRIORITY: psutil.HIGH_PRIORITY_CLASS,
+            FIELD_MEMORY_PRIORITY: MEMORY_PRIORITY_NORMAL,
+            FIELD_IO_PRIORITY: psutil.IOPRIO_NORMAL,
+            FIELD_AFFINITY: calcular_afinidad_grupo(True, nucleos_totales),
+        }
+    else:
+        objetivo = {
+            FIELD_PRIORITY: psutil.BELOW_NORMAL_PRIORITY_CLASS,
+            FIELD_MEMORY_PRIORITY: MEMORY_PRIORITY_LOW,
+            FIELD_IO_PRIORITY: psutil.IOPRIO_VERYLOW,
+            FIELD_AFFINITY: calcular_afinidad_grupo(False, nucleos_totales),
+        }
+    
+    snapshot = get_snapshot()
     for pid in pids_grupo:
         try:
-            proc = psutil.Process(pid)
+            creado = snapshot.get_create_time(pid)
+            proc = None
+            if creado is None:
+                proc = psutil.Process(pid)
+                creado = proc.create_time()
+            clave = (pid, creado)
             
-            if es_primer_plano:
-                # Configuración para primer plano
-                proc.nice(psutil.HIGH_PRIORITY_CLASS)
-                establecer_prioridad_memoria(pid, MEMORY_PRIORITY_NORMAL)
-                establecer_prioridad_io(pid, psutil.IOPRIO_NORMAL)
-                if nucleos_totales >= 8:
-                    proc.cpu_affinity(list(range(1, nucleos_totales)))
-                else:
-                    proc.cpu_affinity(list(range(nucleos_totales)))
-            else:
-                # Configuración para segundo plano
-                proc.nice(psutil.BELOW_NORMAL_PRIORITY_CLASS)
-                establecer_prioridad_memoria(pid, MEMORY_PRIORITY_LOW)
-                establecer_prioridad_io(pid, psutil.IOPRIO_VERYLOW)
-                if nucleos_totales >= 8:
-                    proc.cpu_affinity([0] + list(range(nucleos_totales - 3, nucleos_totales)))
-                elif nucleos_totales >= 4:
-                    proc.cpu_affinity([0, 3])
-                elif nucleos_totales >= 2:
-                    proc.cpu_affinity([1])
+            cambios = _estado_aplicado.pending(clave, objetivo)
+            if not cambios:
+                continue
+            
+            if proc is None:
+                proc = psutil.Process(pid)
+            
+            contar("prioridades.llamadas", len(cambios))
+            for campo, valor in cambios.items():
+                ok = True
+                try:
+                    if campo == FIELD_PRIORITY:
+                        proc.nice(valor)
+                    elif campo == FIELD_MEMORY_PRIORITY:
+                        ok = establecer_prioridad_memoria(pid, valor)
+                    elif campo == FIELD_IO_PRIORITY:
+                        ok = establecer_prioridad_io(pid, valor, proc)
+                    elif campo == FIELD_AFFINITY:
+                        proc.cpu_affinity(list(valor))
+                except psutil.NoSuchProcess:
+                    _estado_aplicado.forget(clave)
+                    break
+                except:
+                    ok = False
+                _estado_aplicado.record(clave, campo, valor, ok)
         except:
             continue
 
+# Latencia desde el cambio de foco hasta que el grupo quedó configurado
+_latencias_primer_plano = LatencyTracker()
+
+def obtener_latencias_primer_plano():
+    """Resumen (ms) de latencias foco -> prioridad aplicada"""
+    return _latencias_primer_plano.summary()
+
+def obtener_estadisticas_aplicacion():
+    """Contadores de llamadas aplicadas/omitidas/fallidas del aplicador de prioridades"""
+    return _estado_aplicado.stats()
+
 def mostrar_notificacion_inicio():
     """Notificación de inicio del modo agresivo"""
     texto_notificacion = "OPTIMIZACION AGRESIVA ACTIVADA"
@@ -637,47 +673,42 @@ def mostrar_notificacion_cierre(nombre_proceso):
     texto_notificacion = f"Se detuvo la ejecución de\n'{nombre_proceso}'\npor inactividad prolongada."
     _crear_ventana_notificacion(texto_notificacion, duracion_ms=5000)
 
-def monitor_y_limpieza_ram():
-    while True:
+def tarea_limpieza_ram():
+    """
+    Una iteración del monitor de RAM. Retorna el retardo hasta la próxima:
+    tras una limpieza se espera TIEMPO_ESPERA_POST_LIMPIEZA_MINUTOS.
+    """
+    try:
+        uso_ram = psutil.virtual_memory().percent
+        if uso_ram <= LIMITE_RAM_PORCENTAJE:
+            return INTERVALO_MONITOREO_RAM_SEGUNDOS
+        if not os.path.exists("emptystandbylist.exe"):
+            return TIEMPO_ESPERA_POST_LIMPIEZA_MINUTOS * 60
         try:
-            if check_shutdown_signal():
-                break
-            uso_ram = psutil.virtual_memory().percent
-            if uso_ram > LIMITE_RAM_PORCENTAJE:
-                if not os.path.exists("emptystandbylist.exe"):
-                    time.sleep(TIEMPO_ESPERA_POST_LIMPIEZA_MINUTOS * 60)
-                    continue
-                try:
-                    comandos = [
-                        ["emptystandbylist.exe", "workingsets"], 
-                        ["emptystandbylist.exe", "standbylist"],
-                        ["emptystandbylist.exe", "modifiedpagelist"], 
-                        ["emptystandbylist.exe", "workingsets"]
-                    ]
-                    for cmd in comandos:
-                        subprocess.run(cmd, check=True, creationflags=subprocess.CREATE_NO_WINDOW)
-                    threading.Thread(target=mostrar_notificacion_limpieza, daemon=True).start()
-                    time.sleep(TIEMPO_ESPERA_POST_LIMPIEZA_MINUTOS * 60)
-                except:
-                    time.sleep(TIEMPO_ESPERA_POST_LIMPIEZA_MINUTOS * 60)
-            else:
-                time.sleep(INTERVALO_MONITOREO_RAM_SEGUNDOS)
+            comandos = [
+                ["emptystandbylist.exe", "workingsets"], 
+                ["emptystandbylist.exe", "standbylist"],
+                ["emptystandbylist.exe", "modifiedpagelist"], 
+                ["emptystandbylist.exe", "workingsets"]
+            ]
+            for cmd in comandos:
+                subprocess.run(cmd, check=True, creationflags=subprocess.CREATE_NO_WINDOW)
+            threading.Thread(target=mostrar_notificacion_limpieza, daemon=True).start()
         except:
-            time.sleep(INTERVALO_MONITOREO_RAM_SEGUNDOS)
+            pass
+        return TIEMPO_ESPERA_POST_LIMPIEZA_MINUTOS * 60
+    except:
+        return INTERVALO_MONITOREO_RAM_SEGUNDOS
 
-def monitorear_y_terminar_inactivos(ignorar):
+def crear_tarea_inactivos(ignorar):
     """
-    Monitorea y termina grupos completos de procesos inactivos.
+    Crea la tarea periódica que monitorea y termina grupos completos de procesos inactivos.
     Solo respeta la lista_ignorados para NO cerrar procesos.
     """
     procesos_inactivos = {}
-    grupos_procesados = {}
     
-    while True:
+    def tarea():
         try:
-            if check_shutdown_signal():
-                break
-            
             pid_primer_plano = obtener_pid_primer_plano()
             
             # Obtener grupo del proceso en primer plano
@@ -685,51 +716,51 @@ def monitorear_y_terminar_inactivos(ignorar):
             if pid_primer_plano:
                 grupo_primer_plano, _ = obtener_grupo_completo_proceso(pid_primer_plano)
             
+            # Una sola instantánea compartida por tick
+            snapshot = get_snapshot()
+            muestreo_cpu = get_cpu_sampler()
+            
             # Limpiar PIDs que ya no existen
-            pids_actuales = {p.pid for p in psutil.process_iter(['pid'])}
+            pids_actuales = snapshot.pid_set()
             pids_a_eliminar = set(procesos_inactivos.keys()) - pids_actuales
             for pid in pids_a_eliminar:
                 del procesos_inactivos[pid]
             
-            # Agrupar procesos por nombre para procesarlos juntos
-            procesos_por_nombre = {}
-            for proc in psutil.process_iter(['pid', 'name', 'cpu_percent']):
-                try:
-                    nombre = proc.info['name'].lower()
-                    if nombre not in procesos_por_nombre:
-                        procesos_por_nombre[nombre] = []
-                    procesos_por_nombre[nombre].append(proc)
-                except:
-                    continue
-            
             # Procesar cada grupo de procesos con el mismo nombre
-            for nombre_proc, lista_procs in procesos_por_nombre.items():
+            for nombre_proc, lista_pids in snapshot.groups_by_name().items():
                 try:
+                    if not nombre_proc:
+                        continue
+                    
                     # Verificar si está en ignorar (NO cerrar por inactividad)
                     if nombre_proc in ignorar:
-                        for proc in lista_procs:
-                            if proc.pid in procesos_inactivos:
-                                del procesos_inactivos[proc.pid]
+                        for pid in lista_pids:
+                            if pid in procesos_inactivos:
+                                del procesos_inactivos[pid]
                         continue
                     
                     # Verificar si alguno está en primer plano
-                    alguno_en_primer_plano = any(proc.pid in grupo_primer_plano for proc in lista_procs)
+                    alguno_en_primer_plano = any(pid in grupo_primer_plano for pid in lista_pids)
                     if alguno_en_primer_plano:
-                        for proc in lista_procs:
-                            if proc.pid in procesos_inactivos:
-                                del procesos_inactivos[proc.pid]
+                        for pid in lista_pids:
+                            if pid in procesos_inactivos:
+                                del procesos_inactivos[pid]
                         continue
                     
                     # Verificar si es el proceso propio
-                    if any(proc.pid == os.getpid() for proc in lista_procs):
+                    if os.getpid() in lista_pids:
                         continue
                     
-                    # Calcular CPU promedio del grupo
-                    cpu_total = sum(proc.info['cpu_percent'] for proc in lista_procs)
-                    cpu_promedio = cpu_total / len(lista_procs)
+                    # CPU promedio del grupo según la EWMA de cada proceso. Un proceso
+                    # sin muestras todavía (recién creado) no cuenta como inactivo.
+                    cpu_grupo = [muestreo_cpu.ewma(pid) for pid in lista_pids]
+                    if any(cpu is None for cpu in cpu_grupo):
+                        procesos_inactivos.pop(lista_pids[0], None)
+                        continue
+                    cpu_promedio = sum(cpu_grupo) / len(cpu_grupo)
                     
                     # Usar el primer PID como representante del grupo
-                    pid_representante = lista_procs[0].pid
+                    pid_representante = lista_pids[0]
                     
                     if cpu_promedio < CPU_UMBRAL_INACTIVIDAD_PORCENTAJE:
                         if pid_representante not in procesos_inactivos:
@@ -738,7 +769,10 @@ def monitorear_y_terminar_inactivos(ignorar):
                             tiempo_inactivo = time.time() - procesos_inactivos[pid_representante]
                             if tiempo_inactivo > TIEMPO_INACTIVIDAD_PARA_CIERRE_MINUTOS * 60:
                                 # Terminar todo el grupo
-                                for proc in lista_procs:
+                                for pid in lista_pids:
+                                    proc = open_process(pid, snapshot)
+                                    if proc is None:
+                                        continue
                                     try:
                                         proc.terminate()
                                     except:
@@ -759,81 +793,144 @@ def monitorear_y_terminar_inactivos(ignorar):
                 except:
                     continue
             
-            time.sleep(30)
+            return 30
         except:
-            time.sleep(60)
+            return 60
+    
+    return tarea
+
+def crear_tarea_apagado(planificador):
+    """
+    Tarea que detiene el planificador cuando se activa el modo juego.
+    El bus de estado avisa del cambio al instante; la tarea cubre el caso sin conexión.
+    """
+    def al_cambiar_estado(estado):
+        if is_game_state(estado):
+            planificador.shutdown()
+    
+    get_mode_bus().subscribe(al_cambiar_estado)
+    
+    def tarea():
+        if check_shutdown_signal():
+            planificador.shutdown()
+    return tarea
+
+def crear_planificador(ignorar):
+    """
+    Registra todos los monitores del modo agresivo en un único planificador
+    cooperativo (un hilo, un evento de apagado) en lugar de un hilo por bucle.
+    """
+    planificador = CooperativeScheduler()
+    planificador.add_task("apagado", crear_tarea_apagado(planificador),
+                          interval=INTERVALO_VERIFICACION_APAGADO_SEGUNDOS)
+    planificador.add_task("energia", crear_tarea_energia(),
+                          interval=INTERVALO_MONITOREO_ENERGIA_SEGUNDOS,
+                          initial_delay=RETARDO_INICIAL_ENERGIA_SEGUNDOS, jitter=1.0)
+    planificador.add_task("escritorio", organizar_escritorio_main,
+                          interval=0, initial_delay=60, one_shot=True)
+    planificador.add_task("ram", tarea_limpieza_ram,
+                          interval=INTERVALO_MONITOREO_RAM_SEGUNDOS, jitter=2.0)
+    planificador.add_task("inactivos", crear_tarea_inactivos(ignorar),
+                          interval=30, jitter=2.0)
+    return planificador
+
+def ajustar_prioridades_primer_plano(pid_actual_primer_plano, lista_blanca, nucleos_totales):
+    """
+    Aplica la configuración de primer plano al grupo del PID dado y la de segundo
+    plano a todos los demás grupos de procesos (una ejecución por cambio de foco).
+    """
+    procesos_ya_configurados = set()
+    _estado_aplicado.prune(get_snapshot().pid_set())
+    
+    # Obtener grupo completo del proceso en primer plano
+    grupo_primer_plano, nombre_primer_plano = obtener_grupo_completo_proceso(pid_actual_primer_plano)
+    
+    # Verificar si el proceso en primer plano está en lista blanca
+    proceso_fg_en_lista_blanca = False
+    if nombre_primer_plano:
+        proceso_fg_en_lista_blanca = nombre_primer_plano.lower() in lista_blanca
+    
+    # Aplicar configuración al grupo de primer plano (solo si NO está en lista_blanca)
+    if not proceso_fg_en_lista_blanca and grupo_primer_plano:
+        aplicar_configuracion_a_grupo(grupo_primer_plano, True, nucleos_totales)
+        procesos_ya_configurados.update(grupo_primer_plano)
+    
+    # Agrupar todos los demás procesos por nombre
+    procesos_por_nombre = {}
+    for pid, nombre in get_snapshot().iter_processes():
+        if pid in procesos_ya_configurados:
+            continue
+        
+        nombre_proceso = nombre.lower()
+        
+        # Ignorar solo lista_blanca para ajustes de prioridad
+        # (NO ignorar ignorar aquí, solo en cierre por inactividad)
+        if not nombre_proceso or nombre_proceso in lista_blanca or pid == os.getpid():
+            continue
+        
+        if nombre_proceso not in procesos_por_nombre:
+            procesos_por_nombre[nombre_proceso] = set()
+        procesos_por_nombre[nombre_proceso].add(pid)
+    
+    # Aplicar configuración de segundo plano a cada grupo
+    arbol = get_process_tree()
+    for nombre_proc, pids_grupo in procesos_por_nombre.items():
+        # Expandir grupo con todos los hijos
+        grupo_completo = arbol.expand(pids_grupo)
+        
+        # Aplicar configuración al grupo completo
+        aplicar_configuracion_a_grupo(grupo_completo, False, nucleos_totales)
+        procesos_ya_configurados.update(grupo_completo)
 
-def monitorear_y_ajustar_base_agresivo():
+def monitorear_y_ajustar_base_agresivo(planificador=None):
     """
     Monitorea y ajusta prioridades considerando grupos completos de procesos.
     Solo ignora ajustes de prioridad para procesos en lista_blanca.
+    El bucle termina cuando el planificador recibe la señal de apagado.
     """
     lista_blanca, _, ignorar = cargar_config()
     nucleos_totales = psutil.cpu_count()
     ultimo_pid_primer_plano = None
-    procesos_ya_configurados = set()
+    fuente_primer_plano = create_foreground_source(obtener_pid_primer_plano)
+    
+    if planificador is None:
+        planificador = CooperativeScheduler()
+        planificador.add_task("apagado", crear_tarea_apagado(planificador),
+                              interval=INTERVALO_VERIFICACION_APAGADO_SEGUNDOS)
+        planificador.start()
+    planificador.on_shutdown(fuente_primer_plano.interrupt)
     
     try:
-        while True:
-            if check_shutdown_signal():
-                break
-            
-            pid_actual_primer_plano = obtener_pid_primer_plano()
+        while not planificador.shutdown_event.is_set():
+            # Dormir hasta el próximo cambio de foco o hasta el apagado (sin sondeo)
+            cambio = fuente_primer_plano.wait()
+            if cambio is None:
+                continue
+            pid_actual_primer_plano = cambio.pid
             
             if pid_actual_primer_plano != ultimo_pid_primer_plano and pid_actual_primer_plano is not None:
                 ultimo_pid_primer_plano = pid_actual_primer_plano
-                procesos_ya_configurados.clear()
-                
-                # Obtener grupo completo del proceso en primer plano
-                grupo_primer_plano, nombre_primer_plano = obtener_grupo_completo_proceso(pid_actual_primer_plano)
-                
-                # Verificar si el proceso en primer plano está en lista blanca
-                proceso_fg_en_lista_blanca = False
-                if nombre_primer_plano:
-                    proceso_fg_en_lista_blanca = nombre_primer_plano.lower() in lista_blanca
+                ajustar_prioridades_primer_plano(pid_actual_primer_plano, lista_blanca, nucleos_totales)
                 
-                # Aplicar configuración al grupo de primer plano (solo si NO está en lista_blanca)
-                if not proceso_fg_en_lista_blanca and grupo_primer_plano:
-                    aplicar_configuracion_a_grupo(grupo_primer_plano, True, nucleos_totales)
-                    procesos_ya_configurados.update(grupo_primer_plano)
-                
-                # Agrupar todos los demás procesos por nombre
-                procesos_por_nombre = {}
-                for proc in psutil.process_iter(['pid', 'name']):
-                    try:
-                        if proc.pid in procesos_ya_configurados:
-                            continue
-                        
-                        nombre_proceso = proc.info['name'].lower()
-                        
-                        # Ignorar solo lista_blanca para ajustes de prioridad
-                        # (NO ignorar ignorar aquí, solo en cierre por inactividad)
-                        if nombre_proceso in lista_blanca or proc.pid == os.getpid():
-                            continue
-                        
-                        if nombre_proceso not in procesos_por_nombre:
-                            procesos_por_nombre[nombre_proceso] = set()
-                        procesos_por_nombre[nombre_proceso].add(proc.pid)
-                    except:
-                        continue
-                
-                # Aplicar configuración de segundo plano a cada grupo
-                for nombre_proc, pids_grupo in procesos_por_nombre.items():
-                    # Expandir grupo con todos los hijos
-                    grupo_completo = set()
-                    for pid in pids_grupo:
-                        grupo_completo.add(pid)
-                        hijos = obtener_todos_hijos_recursivo(pid)
-                        grupo_completo.update(hijos)
-                    
-                    # Aplicar configuración al grupo completo
-                    aplicar_configuracion_a_grupo(grupo_completo, False, nucleos_totales)
-                    procesos_ya_configurados.update(grupo_completo)
-            
-            time.sleep(0.75)
+                # Sin salida por cambio de foco: los datos van al perfil y al resumen final
+                latencia_ns = _latencias_primer_plano.record(cambio)
+                if profiler.enabled:
+                    profiler.record("primer_plano.latencia", latencia_ns)
     except KeyboardInterrupt:
         pass
     finally:
+        planificador.shutdown()
+        fuente_primer_plano.stop()
+        for nombre, datos in planificador.stats().items():
+            print(f"Tarea {nombre}: {datos['runs']} ejecuciones, "
+                  f"{datos['avg_ms']:.1f} ms promedio, {datos['max_ms']:.1f} ms máx")
+        estadisticas = obtener_estadisticas_aplicacion()
+        latencias = _latencias_primer_plano.summary()
+        print(f"Prioridades: {estadisticas['applied']} aplicadas, "
+              f"{estadisticas['skipped']} omitidas (sin cambios), {estadisticas['failed']} fallidas; "
+              f"latencia foco -> prioridad p95 {latencias['p95_ms']:.1f} ms en {latencias['count']} cambios")
+        # os._exit() no ejecuta atexit: volcar el perfil explícitamente
+        guardar_perfil()
         os._exit(0)
 
 def crear_acceso_directo(carpeta_destino, nombre_acceso):
@@ -901,10 +998,6 @@ def organizar_escritorio_main():
         texto_notif = "para optimizar el rendimiento del sistema y ademas una mejor gestion se reubicaron archivos presentes en el escritorio organizados por categorias.para facilitar su acceso se creo un link en el escritorio"
         threading.Thread(target=_crear_ventana_notificacion, args=(texto_notif, 8000), daemon=True).start()
 
-def ejecutar_tarea_programada(delay, tarea):
-    time.sleep(delay)
-    tarea()
-
 if __name__ == "__main__":
     if es_admin():
         # Mostrar notificación de inicio
@@ -912,16 +1005,9 @@ if __name__ == "__main__":
         
         lista_blanca_global, _, ignorar_global = cargar_config()
         
-        # Iniciar monitor de energía
-        hilo_energia = threading.Thread(target=monitor_energia, daemon=True)
-        hilo_energia.start()
-        
-        hilo_escritorio = threading.Thread(target=ejecutar_tarea_programada, args=(60, organizar_escritorio_main), daemon=True)
-        hilo_escritorio.start()
-        hilo_ram = threading.Thread(target=monitor_y_limpieza_ram, daemon=True)
-        hilo_ram.start()
-        hilo_cierre = threading.Thread(target=monitorear_y_terminar_inactivos, args=(ignorar_global,), daemon=True)
-        hilo_cierre.start()
-        monitorear_y_ajustar_base_agresivo()
+        # Energía, escritorio, RAM e inactividad comparten un único hilo planificador
+        planificador = crear_planificador(ignorar_global)
+        planificador.start()
+        monitorear_y_ajustar_base_agresivo(planificador)
     else:
-        solicitar_admin()
\ No newline at end of file
+        solicitar_admin()
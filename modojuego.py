@@ -48,9 +48,29 @@ except ImportError:
     print("ERROR: PyWin32 no instalado. Ejecute: pip install pywin32")
     sys.exit(1)
 
+from process_snapshot import get_snapshot, get_process_tree
+from process_events import GameLaunchWatcher, ProcessStart, ProcessStartSource
+from session_enforcer import POLICY_BACKGROUND, POLICY_GAME, POLICY_GAME_CHILD, ProcessEnforcer
+from mode_state import STATE_GAME, get_mode_bus
+from instrumentation import instrumented, profiler
+from task_graph import TaskGraph, GraphReport, TaskResult
+from powershell_pool import get_pool, run_powershell, close_pool
+from hardware_facts import get_hardware_facts, is_laptop
+
 # === CONFIGURACIÓN ===
 NOMBRE_ARCHIVO_CONFIG = "config.json"
-STATE_FILE = ".mode_state.json"
+
+# === ACTIVACIÓN EN PARALELO ===
+# Pasos simultáneos (la mayoría esperan a PowerShell, powercfg o al registro)
+ACTIVATION_WORKERS = 8
+# powercfg modifica SCHEME_CURRENT: un cambio a la vez
+ACTIVATION_LIMITS = {"powercfg": 1}
+# Un paso colgado no retrasa el monitoreo del juego más de esto
+ACTIVATION_STEP_TIMEOUT = 60
+
+# === CACHÉ DE HARDWARE (hardware_facts.py) ===
+# Un plan instalado puede borrarse a mano: se vuelve a comprobar cada hora
+POWER_PLAN_TTL = 3600
 
 # === CONSTANTES ADICIONALES PARA PRIORIDADES ===
 # I/O Priority
@@ -168,99 +188,6 @@ class MEMORYSTATUSEX(ctypes.Structure):
         ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
     ]
 
-# === POWERSHELL CONNECTION POOLING - Optimization #6 ===
-class PowerShellSession:
-    """
-    Persistent PowerShell session for subprocess calls.
-    Performance improvement: 50-80ms reduction per PowerShell call.
-    Total savings: ~500-800ms for 10+ calls during game mode initialization.
-    """
-    def __init__(self):
-        self.process = None
-        self._lock = threading.Lock()
-        self._initialize()
-    
-    def _initialize(self):
-        """Initialize PowerShell process"""
-        try:
-            self.process = subprocess.Popen(
-                ["powershell", "-NoLogo", "-NoProfile", "-NonInteractive", "-Command", "-"],
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1
-            )
-        except Exception as e:
-            print(f"ERROR: Failed to initialize PowerShell session: {e}")
-            self.process = None
-    
-    def execute(self, command: str, timeout: int = 10) -> Optional[str]:
-        """
-        Execute a PowerShell command in the persistent session.
-        Returns command output or None on error.
-        """
-        with self._lock:
-            if self.process is None or self.process.poll() is not None:
-                self._initialize()
-            
-            if self.process is None:
-                return None
-            
-            try:
-                # Add marker to detect end of output
-                marker = f"###END_{id(command)}###"
-                full_command = f"{command}; Write-Output '{marker}'\n"
-                
-                self.process.stdin.write(full_command)
-                self.process.stdin.flush()
-                
-                # Read until marker
-                output_lines = []
-                start_time = time.time()
-                while True:
-                    if time.time() - start_time > timeout:
-                        print(f"WARN: PowerShell command timeout: {command[:50]}")
-                        return None
-                    
-                    try:
-                        line = self.process.stdout.readline()
-                        if marker in line:
-                            break
-                        output_lines.append(line)
-                    except Exception:
-                        break
-                
-                return "".join(output_lines)
-            
-            except Exception as e:
-                print(f"ERROR executing PowerShell command: {e}")
-                return None
-    
-    def close(self):
-        """Close the PowerShell session"""
-        with self._lock:
-            if self.process and self.process.poll() is None:
-                try:
-                    self.process.stdin.write("exit\n")
-                    self.process.stdin.flush()
-                    self.process.wait(timeout=5)
-                except Exception:
-                    try:
-                        self.process.terminate()
-                    except Exception:
-                        pass
-                self.process = None
-
-# Global PowerShell session instance
-_ps_session = None
-
-def get_ps_session() -> PowerShellSession:
-    """Get or create global PowerShell session"""
-    global _ps_session
-    if _ps_session is None:
-        _ps_session = PowerShellSession()
-    return _ps_session
 
 # === ESTADO GLOBAL SIMPLIFICADO (SIN BACKUP) ===
 class GameModeState:
@@ -346,40 +273,8 @@ def show_game_mode_notification():
 
 # === GESTIÓN DE PLANES DE ENERGÍA (SIN RESTAURACIÓN) ===
 
-def is_laptop() -> bool:
-    """Detecta si el sistema es laptop o PC de escritorio"""
-    try:
-        battery = psutil.sensors_battery()
-        if battery is not None:
-            return True
-        
-        ps_command = """
-        $chassis = Get-CimInstance -ClassName Win32_SystemEnclosure
-        $chassis.ChassisTypes
-        """
-        
-        result = subprocess.run(
-            ["powershell", "-Command", ps_command],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        
-        if result.returncode == 0:
-            chassis_types = result.stdout.strip()
-            laptop_chassis = ['8', '9', '10', '11', '12', '14', '18', '21', '30', '31', '32']
-            for chassis in laptop_chassis:
-                if chassis in chassis_types:
-                    return True
-        
-        return False
-    
-    except Exception as e:
-        print(f"ERROR detectando tipo de sistema: {e}")
-        return False
-
-def power_plan_exists(plan_name: str) -> bool:
-    """Verifica si un plan de energía con nombre específico existe"""
+def _probe_power_plan(plan_name: str) -> Optional[bool]:
+    """True si powercfg lista el plan; None si no está o no se pudo consultar"""
     try:
         result = subprocess.run(
             ["powercfg", "/list"],
@@ -388,14 +283,19 @@ def power_plan_exists(plan_name: str) -> bool:
             timeout=5
         )
         
-        if result.returncode == 0:
-            return plan_name.lower() in result.stdout.lower()
+        if result.returncode == 0 and plan_name.lower() in result.stdout.lower():
+            return True
         
-        return False
+        return None
     
     except Exception as e:
         print(f"ERROR verificando existencia de plan: {e}")
-        return False
+        return None
+
+def power_plan_exists(plan_name: str) -> bool:
+    """Verifica si un plan de energía con nombre específico existe (solo se cachea si existe)"""
+    return bool(get_hardware_facts().get(f"power_plan:{plan_name.lower()}",
+                                         lambda: _probe_power_plan(plan_name), ttl=POWER_PLAN_TTL))
 
 def install_power_plan(pow_file_path: str) -> bool:
     """Instala un plan de energía desde archivo .pow"""
@@ -482,6 +382,7 @@ def setup_power_plan() -> bool:
             if not install_power_plan(pow_path):
                 print(f"WARN: No se pudo instalar plan de energía")
                 return False
+            get_hardware_facts().put(f"power_plan:{plan_name.lower()}", True, ttl=POWER_PLAN_TTL)
         
         if activate_power_plan_by_name(plan_name):
             print(f"INFO: Plan de energía '{plan_name}' activado PERMANENTEMENTE")
@@ -570,71 +471,82 @@ def calculate_affinity_masks(core_count: int) -> Tuple[int, int]:
     
     return game_mask, others_mask
 
+def affinity_cpus(mask: int) -> List[int]:
+    """CPUs lógicas incluidas en una máscara de afinidad"""
+    return [i for i in range(psutil.cpu_count(logical=True)) if mask & (1 << i)]
+
+def apply_process_policy(pid: int, policy: str, game_cpus: List[int], others_cpus: List[int],
+                         state: GameModeState) -> bool:
+    """
+    Aplica la política de un proceso: juego (tiempo real, núcleos del juego), hijo del juego
+    (prioridad alta, núcleos del juego) o fondo (inactiva, núcleos reservados a otros)
+    """
+    process = psutil.Process(pid)
+    
+    # Guardar configuración original
+    if pid not in state.original_priorities:
+        try:
+            state.original_priorities[pid] = process.nice()
+            state.original_affinities[pid] = process.cpu_affinity()
+        except:
+            pass
+    
+    if policy == POLICY_GAME:
+        # === CONFIGURACIÓN PARA JUEGO ===
+        prioridad, io, memoria, cpus = psutil.REALTIME_PRIORITY_CLASS, IO_PRIORITY_HIGH, MEMORY_PRIORITY_NORMAL, game_cpus
+    elif policy == POLICY_GAME_CHILD:
+        # === PROCESOS LANZADOS POR EL JUEGO (anti-cheat, shaders, lanzador) ===
+        prioridad, io, memoria, cpus = psutil.HIGH_PRIORITY_CLASS, IO_PRIORITY_NORMAL, MEMORY_PRIORITY_NORMAL, game_cpus
+    else:
+        # === CONFIGURACIÓN PARA OTROS PROCESOS ===
+        prioridad, io, memoria, cpus = psutil.IDLE_PRIORITY_CLASS, IO_PRIORITY_VERY_LOW, MEMORY_PRIORITY_VERY_LOW, others_cpus
+    
+    try:
+        process.nice(prioridad)
+    except:
+        pass
+    
+    set_process_io_priority(pid, io)
+    set_process_memory_priority(pid, memoria)
+    
+    try:
+        process.cpu_affinity(cpus)
+    except:
+        pass
+    
+    state.modified_priority_pids.add(pid)
+    return True
+
+@instrumented()
 def apply_priority_and_affinity_system(game_pid: int, whitelist: Set[str], state: GameModeState):
     """Aplica sistema completo de prioridades y afinidad (RESPETANDO WHITELIST)"""
     try:
         core_count = get_cpu_core_count()
         game_affinity, others_affinity = calculate_affinity_masks(core_count)
+        game_cpus, others_cpus = affinity_cpus(game_affinity), affinity_cpus(others_affinity)
         
         print(f"INFO: CPU con {core_count} núcleos físicos detectada")
         print(f"INFO: Afinidad juego: {bin(game_affinity)}, otros: {bin(others_affinity)}")
         
-        for proc in psutil.process_iter(['pid', 'name']):
+        procesos = get_snapshot().iter_processes()
+        # El recorrido anterior sincronizó el árbol: los hijos ya abiertos del juego van con él
+        familia_juego = get_process_tree().descendants(game_pid)
+        
+        for pid, name in procesos:
             try:
-                pid = proc.info['pid']
-                name = (proc.info.get('name') or "").lower()
+                name = name.lower()
                 
                 # CRÍTICO: RESPETAR WHITELIST
                 if name in whitelist or pid == os.getpid() or pid <= 4:
                     continue
                 
-                process = psutil.Process(pid)
-                
-                # Guardar configuración original
-                if pid not in state.original_priorities:
-                    try:
-                        state.original_priorities[pid] = process.nice()
-                        state.original_affinities[pid] = process.cpu_affinity()
-                    except:
-                        pass
-                
                 if pid == game_pid:
-                    # === CONFIGURACIÓN PARA JUEGO ===
-                    try:
-                        process.nice(psutil.REALTIME_PRIORITY_CLASS)
-                    except:
-                        pass
-                    
-                    set_process_io_priority(pid, IO_PRIORITY_HIGH)
-                    set_process_memory_priority(pid, MEMORY_PRIORITY_NORMAL)
-                    
-                    try:
-                        cpu_list = [i for i in range(psutil.cpu_count(logical=True)) 
-                                   if game_affinity & (1 << i)]
-                        process.cpu_affinity(cpu_list)
-                    except:
-                        pass
-                    
-                    state.modified_priority_pids.add(pid)
-                
+                    policy = POLICY_GAME
+                elif pid in familia_juego:
+                    policy = POLICY_GAME_CHILD
                 else:
-                    # === CONFIGURACIÓN PARA OTROS PROCESOS ===
-                    try:
-                        process.nice(psutil.IDLE_PRIORITY_CLASS)
-                    except:
-                        pass
-                    
-                    set_process_io_priority(pid, IO_PRIORITY_VERY_LOW)
-                    set_process_memory_priority(pid, MEMORY_PRIORITY_VERY_LOW)
-                    
-                    try:
-                        cpu_list = [i for i in range(psutil.cpu_count(logical=True)) 
-                                   if others_affinity & (1 << i)]
-                        process.cpu_affinity(cpu_list)
-                    except:
-                        pass
-                    
-                    state.modified_priority_pids.add(pid)
+                    policy = POLICY_BACKGROUND
+                apply_process_policy(pid, policy, game_cpus, others_cpus, state)
             
             except (psutil.NoSuchProcess, psutil.AccessDenied):
                 continue
@@ -646,6 +558,37 @@ def apply_priority_and_affinity_system(game_pid: int, whitelist: Set[str], state
         print(f"ERROR aplicando prioridades: {e}")
         return False
 
+def build_session_enforcer(source: ProcessStartSource, game_pid: int, whitelist: Set[str],
+                           state: GameModeState) -> ProcessEnforcer:
+    """
+    Enforcer de la partida: aplica la política del juego o de fondo a los procesos
+    que arrancan después de la activación (ver session_enforcer.py)
+    """
+    game_affinity, others_affinity = calculate_affinity_masks(get_cpu_core_count())
+    game_cpus, others_cpus = affinity_cpus(game_affinity), affinity_cpus(others_affinity)
+    propio = os.getpid()
+    familia_juego = {game_pid} | get_process_tree().descendants(game_pid)
+    
+    def classify(inicio: ProcessStart) -> Optional[str]:
+        pid = inicio.pid
+        # Ya tratados en la activación (la fuente también trae lo que arrancó durante ella)
+        if pid in state.modified_priority_pids or pid == propio or pid <= 4:
+            return None
+        # El nombre del evento puede venir truncado (WMI): la whitelist se compara con el real
+        proceso = psutil.Process(pid)
+        if proceso.name().lower() in whitelist:
+            return None
+        ppid = inicio.ppid if inicio.ppid is not None else proceso.ppid()
+        if ppid in familia_juego:
+            familia_juego.add(pid)
+            return POLICY_GAME_CHILD
+        return POLICY_BACKGROUND
+    
+    def apply(pid: int, policy: str) -> bool:
+        return apply_process_policy(pid, policy, game_cpus, others_cpus, state)
+    
+    return ProcessEnforcer(source, classify, apply)
+
 def restore_priority_and_affinity(state: GameModeState):
     """Restaura prioridades y afinidad originales"""
     if not state.modified_priority_pids:
@@ -740,12 +683,7 @@ def enable_large_pages_for_game(state: GameModeState) -> bool:
         }}
         """
         
-        result = subprocess.run(
-            ["powershell", "-Command", ps_command],
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
+        result = run_powershell(ps_command, timeout=30)
         
         if "OK" in result.stdout:
             # Habilitar Large Pages en el sistema
@@ -810,7 +748,11 @@ class CPUTopology:
     
     @staticmethod
     def get_cpu_info() -> Dict[str, any]:
-        """Obtiene información detallada de CPU"""
+        """Obtiene información detallada de CPU (cacheada hasta reiniciar)"""
+        return get_hardware_facts().get("cpu_topology", CPUTopology._probe_cpu_info)
+    
+    @staticmethod
+    def _probe_cpu_info() -> Dict[str, any]:
         try:
             logical_cores = psutil.cpu_count(logical=True)
             physical_cores = psutil.cpu_count(logical=False) or logical_cores
@@ -851,15 +793,15 @@ def notify_game_mode_start(game_pid: int, game_name: str, previous_mode: str = N
     """Notifica al orquestador que el modo juego ha iniciado"""
     try:
         state_data = {
-            "state": "game",
+            "state": STATE_GAME,
             "game_pid": game_pid,
             "game_name": game_name,
             "previous_mode": previous_mode,
             "timestamp": time.time()
         }
         
-        with open(STATE_FILE, "w", encoding="utf-8") as f:
-            json.dump(state_data, f, indent=2)
+        # Persiste el estado y lo difunde a los demás modos sin que tengan que sondear el archivo
+        get_mode_bus().publish(state_data)
         
         print(f"INFO: Estado 'game' notificado al orquestador")
         return True
@@ -871,8 +813,7 @@ def notify_game_mode_start(game_pid: int, game_name: str, previous_mode: str = N
 def notify_game_mode_end():
     """Notifica al orquestador que el modo juego ha finalizado"""
     try:
-        if os.path.exists(STATE_FILE):
-            os.remove(STATE_FILE)
+        get_mode_bus().clear()
         
         print(f"INFO: Estado 'game' limpiado")
         return True
@@ -1033,9 +974,51 @@ def optimize_gpu_settings() -> bool:
         print(f"ERROR GPU settings: {e}")
         return False
 
+def gpu_vendor_from_name(gpu_name: str) -> Optional[str]:
+    """NVIDIA / AMD / INTEL según el nombre del adaptador"""
+    gpu_name = gpu_name.upper()
+    if any(keyword in gpu_name for keyword in ["NVIDIA", "RTX", "GTX", "GEFORCE"]):
+        return "NVIDIA"
+    elif any(keyword in gpu_name for keyword in ["AMD", "RADEON", "RX"]):
+        return "AMD"
+    elif any(keyword in gpu_name for keyword in ["INTEL", "UHD", "IRIS"]):
+        return "INTEL"
+    return None
+
+def _probe_video_controllers() -> Optional[List[Dict[str, any]]]:
+    ps_command = """
+    Get-CimInstance -ClassName Win32_VideoController | ForEach-Object {
+        [pscustomobject]@{
+            name = $_.Name
+            pnp = $_.PNPDeviceID
+            dedicated = ($_.AdapterDACType -ne "Internal" -or $_.AdapterRAM -gt 1GB)
+        }
+    } | ConvertTo-Json -Compress
+    """
+    try:
+        result = run_powershell(ps_command, timeout=10)
+        if result.returncode != 0 or not result.stdout.strip():
+            return None
+        controllers = json.loads(result.stdout)
+    except Exception as e:
+        print(f"ERROR listando adaptadores de video: {e}")
+        return None
+    # ConvertTo-Json devuelve un objeto suelto cuando hay un solo adaptador
+    return controllers if isinstance(controllers, list) else [controllers]
+
+def get_video_controllers() -> List[Dict[str, any]]:
+    """Adaptadores de video (nombre, PNPDeviceID, dedicado), cacheados hasta reiniciar"""
+    return get_hardware_facts().get("video_controllers", _probe_video_controllers) or []
+
 def detect_active_gpu_for_process(game_pid: int) -> Optional[str]:
     """Detecta qué GPU está usando REALMENTE el proceso del juego"""
     try:
+        controllers = get_video_controllers()
+        vendors = {gpu_vendor_from_name(c.get('name') or "") for c in controllers} - {None}
+        if len(vendors) == 1:
+            # Un solo fabricante: no hace falta consultar los contadores de GPU del proceso
+            return vendors.pop()
+        
         ps_command = f"""
         $proc = Get-Process -Id {game_pid} -ErrorAction SilentlyContinue
         if ($proc) {{
@@ -1050,43 +1033,19 @@ def detect_active_gpu_for_process(game_pid: int) -> Optional[str]:
         }}
         """
         
-        result = subprocess.run(
-            ["powershell", "-Command", ps_command],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
+        result = run_powershell(ps_command, timeout=5)
         
         if result.returncode == 0 and result.stdout.strip():
-            gpu_name = result.stdout.strip().upper()
-            
-            if any(keyword in gpu_name for keyword in ["NVIDIA", "RTX", "GTX", "GEFORCE"]):
-                return "NVIDIA"
-            elif any(keyword in gpu_name for keyword in ["AMD", "RADEON", "RX"]):
-                return "AMD"
-            elif any(keyword in gpu_name for keyword in ["INTEL", "UHD", "IRIS"]):
-                return "INTEL"
-        
-        ps_command_fallback = """
-        Get-CimInstance -ClassName Win32_VideoController | 
-        Where-Object {$_.AdapterDACType -ne "Internal" -or $_.AdapterRAM -gt 1GB} |
-        Select-Object -ExpandProperty Name -First 1
-        """
+            vendor = gpu_vendor_from_name(result.stdout.strip())
+            if vendor:
+                return vendor
         
-        result = subprocess.run(
-            ["powershell", "-Command", ps_command_fallback],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        
-        if result.returncode == 0 and result.stdout.strip():
-            gpu_name = result.stdout.strip().upper()
-            
-            if any(keyword in gpu_name for keyword in ["NVIDIA", "RTX", "GTX", "GEFORCE"]):
-                return "NVIDIA"
-            elif any(keyword in gpu_name for keyword in ["AMD", "RADEON", "RX"]):
-                return "AMD"
+        # Fallback: primer adaptador dedicado
+        for controller in controllers:
+            if controller.get('dedicated'):
+                vendor = gpu_vendor_from_name(controller.get('name') or "")
+                if vendor in ("NVIDIA", "AMD"):
+                    return vendor
         
         return None
     
@@ -1095,35 +1054,15 @@ def detect_active_gpu_for_process(game_pid: int) -> Optional[str]:
         return None
 
 def get_gpu_pnp_device_id_powershell(gpu_vendor: str) -> Optional[str]:
-    """Obtiene PNPDeviceID de GPU usando PowerShell"""
+    """Obtiene PNPDeviceID de GPU (de la caché de adaptadores de video)"""
     if not gpu_vendor or gpu_vendor == "INTEL":
         return None
     
-    try:
-        ps_command = f"""
-        Get-CimInstance -ClassName Win32_VideoController | 
-        Where-Object {{
-            $_.Name -like "*{gpu_vendor}*" -and 
-            ($_.AdapterDACType -ne "Internal" -or $_.AdapterRAM -gt 1GB)
-        }} | 
-        Select-Object -ExpandProperty PNPDeviceID -First 1
-        """
-        
-        result = subprocess.run(
-            ["powershell", "-Command", ps_command],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        
-        if result.returncode == 0 and result.stdout.strip():
-            return result.stdout.strip()
-        
-        return None
+    for controller in get_video_controllers():
+        if controller.get('dedicated') and gpu_vendor.lower() in (controller.get('name') or "").lower():
+            return controller.get('pnp') or None
     
-    except Exception as e:
-        print(f"ERROR obteniendo GPU PNPDeviceID: {e}")
-        return None
+    return None
 
 def set_gpu_irq_priority_and_affinity(gpu_vendor: str) -> bool:
     """Establece prioridad IRQ de GPU Y afinidad a núcleos aislados (SIN BACKUP)"""
@@ -1199,12 +1138,7 @@ def create_qos_policy_for_game(game_name: str, state: GameModeState) -> bool:
             f'-Precedence 127'
         )
         
-        result = subprocess.run(
-            ["powershell", "-Command", ps_command],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
+        result = run_powershell(ps_command, timeout=10)
         
         if result.returncode == 0:
             state.qos_policy_name = policy_name
@@ -1224,12 +1158,7 @@ def remove_qos_policy(state: GameModeState) -> bool:
     try:
         ps_command = f'Remove-NetQosPolicy -Name "{state.qos_policy_name}" -Confirm:$false'
         
-        result = subprocess.run(
-            ["powershell", "-Command", ps_command],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
+        result = run_powershell(ps_command, timeout=10)
         
         return result.returncode == 0
     
@@ -1297,6 +1226,7 @@ def flush_pagefile_to_ram() -> bool:
             if not result:
                 print("ERROR: VirtualFree falló - posible memory leak")
 
+@instrumented()
 def aggressive_trim_processes(game_pid: int, whitelist: Set[str]) -> bool:
     """Trim agresivo de procesos (RESPETANDO WHITELIST)"""
     try:
@@ -1308,10 +1238,9 @@ def aggressive_trim_processes(game_pid: int, whitelist: Set[str]) -> bool:
         PROCESS_QUERY_INFORMATION = 0x0400
         PROCESS_SET_QUOTA = 0x0100
         
-        for proc in psutil.process_iter(['pid', 'name']):
+        for pid, name in get_snapshot().iter_processes():
             try:
-                pid = proc.info['pid']
-                name = (proc.info.get('name') or "").lower()
+                name = name.lower()
                 
                 # RESPETAR WHITELIST
                 if pid == game_pid or pid == os.getpid() or name in whitelist:
@@ -1687,9 +1616,10 @@ def optimize_io_scheduler(game_install_path: Optional[str] = None) -> bool:
                 drive_letter = 'C'
             drives = [drive_letter]
         
-        ps_session = get_ps_session()
         success = False
         
+        # Un script por disco, enviados juntos a una sola sesión del pool
+        ps_commands = []
         for drive in drives:
             # Comando PowerShell para optimizar el disco
             ps_command = f"""
@@ -1709,9 +1639,10 @@ def optimize_io_scheduler(game_install_path: Optional[str] = None) -> bool:
                 Write-Output "ERROR: $_"
             }}
             """
-            
-            result = ps_session.execute(ps_command, timeout=15)
-            if result and "OK" in result:
+            ps_commands.append(ps_command)
+        
+        for drive, result in zip(drives, get_pool().run_batch(ps_commands, timeout=15 * len(drives))):
+            if "OK" in result.stdout:
                 print(f"✓ I/O scheduler optimizado para disco {drive}:")
                 success = True
             else:
@@ -1723,6 +1654,102 @@ def optimize_io_scheduler(game_install_path: Optional[str] = None) -> bool:
         print(f"Error optimizando I/O scheduler: {e}")
         return False
 
+# === GRAFO DE ACTIVACIÓN ===
+
+def build_activation_graph(game_pid: int, game_name: str, lista_blanca: Set[str],
+                           procesos_a_terminar: List[str], servicios_a_detener: List[str],
+                           state: GameModeState) -> TaskGraph:
+    """
+    Declara los pasos de activación y sus dependencias. Las dependencias solo
+    ordenan (un paso corre aunque el anterior haya fallado), igual que en la
+    secuencia original; la prioridad decide qué arranca primero.
+    """
+    graph = TaskGraph(max_workers=ACTIVATION_WORKERS, limits=ACTIVATION_LIMITS, skip_on_failure=False)
+    gpu = {}
+
+    def timer():
+        state.timer_changed = set_high_timer_resolution()
+        return state.timer_changed
+
+    def qos():
+        state.qos_policy_created = create_qos_policy_for_game(game_name, state)
+        return state.qos_policy_created
+
+    def procesos():
+        state.processes_killed = terminar_procesos(procesos_a_terminar, lista_blanca)
+
+    def servicios():
+        state.services_stopped = detener_servicios(servicios_a_detener)
+
+    def explorer():
+        state.explorer_killed = kill_explorer()
+
+    def gpu_activa():
+        gpu['vendor'] = detect_active_gpu_for_process(game_pid)
+        if gpu['vendor']:
+            print(f"INFO: GPU activa detectada: {gpu['vendor']}")
+
+    def gpu_irq():
+        if gpu.get('vendor'):
+            return set_gpu_irq_priority_and_affinity(gpu['vendor'])
+
+    # (nombre, función, dependencias, recursos, prioridad)
+    pasos = [
+        # Críticos: el juego recibe prioridad, afinidad y timer antes que nada
+        ("Prioridad y afinidad", lambda: apply_priority_and_affinity_system(game_pid, lista_blanca, state), (), (), 100),
+        ("Timer resolution", timer, (), (), 90),
+        ("Caché CPU", lambda: optimize_cpu_cache_for_game(game_pid), (), (), 80),
+        # Lentos: arrancan temprano para no quedar al final
+        ("Large Pages", lambda: enable_large_pages_for_game(state), (), (), 50),
+        ("Servicios", servicios, (), (), 40),
+        ("Procesos", procesos, (), (), 40),
+        ("Explorer", explorer, (), (), 40),
+        ("Plan de energía", setup_power_plan, (), ("powercfg",), 30),
+        ("Core parking", lambda: optimize_core_parking(state), ("Plan de energía",), ("powercfg",), 30),
+        ("Térmica", monitor_thermals_and_adjust, ("Plan de energía",), ("powercfg",), 20),
+        ("GPU activa", gpu_activa, (), (), 20),
+        ("GPU IRQ", gpu_irq, ("GPU activa",), (), 20),
+        ("QoS", qos, (), (), 20),
+        ("I/O scheduler", optimize_io_scheduler, (), (), 10),
+        ("Memoria GPU", lambda: optimize_gpu_memory_advanced(game_pid), (), (), 10),
+        ("Game DVR", disable_game_dvr, (), (), 0),
+        ("GPU", optimize_gpu_settings, (), (), 0),
+        ("Red", optimize_network, (), (), 0),
+        ("Quantum", set_quantum_length, (), (), 0),
+        ("MMCSS", lambda: optimize_mmcss_for_game(state), (), (), 0),
+        ("Flush de pagefile", flush_pagefile_to_ram, (), (), 0),
+        # El trim va después de cerrar procesos (no vale la pena recortar los que se cierran)
+        ("Trim de procesos", lambda: aggressive_trim_processes(game_pid, lista_blanca),
+         ("Procesos", "Flush de pagefile"), (), 0),
+    ]
+    for nombre, func, deps, recursos, prioridad in pasos:
+        graph.add(nombre, func, deps=deps, resources=recursos, priority=prioridad,
+                  timeout=ACTIVATION_STEP_TIMEOUT)
+    return graph
+
+def report_activation_step(result: TaskResult):
+    """Imprime la latencia de cada paso y la registra en la instrumentación"""
+    marca = "✓" if result.ok else "✗"
+    detalle = f" ({result.error})" if result.error else ""
+    print(f"  {marca} {result.name}: {result.duration * 1000:.0f} ms{detalle}")
+    if profiler.enabled:
+        profiler.record(f"modojuego.activacion.{result.name}", int(result.duration * 1e9), error=not result.ok)
+
+def apply_game_mode(game_pid: int, game_name: str, lista_blanca: Set[str],
+                    procesos_a_terminar: List[str], servicios_a_detener: List[str],
+                    state: GameModeState) -> GraphReport:
+    """Aplica todas las optimizaciones en paralelo según el grafo de activación"""
+    graph = build_activation_graph(game_pid, game_name, lista_blanca,
+                                   procesos_a_terminar, servicios_a_detener, state)
+    report = graph.run(on_finish=report_activation_step)
+    if profiler.enabled:
+        profiler.record("modojuego.activacion", int(report.elapsed * 1e9), error=bool(report.failed))
+    lentos = ", ".join(f"{r.name} {r.duration:.1f}s" for r in report.slowest(3))
+    print(f"INFO: Activación en {report.elapsed:.1f}s (secuencial: {report.busy_time:.1f}s). Más lentos: {lentos}")
+    if report.failed:
+        print(f"WARN: Pasos con fallo: {', '.join(report.failed)}")
+    return report
+
 # === BLOQUE DE EJECUCIÓN PRINCIPAL ===
 
 def check_admin() -> bool:
@@ -1751,19 +1778,27 @@ def main():
     
     juego_encontrado_proc = None
 
-    # 1. Bucle de Detección: Busca continuamente un proceso de juego.
-    while juego_encontrado_proc is None:
-        for proc in psutil.process_iter(['pid', 'name']):
+    # Sesiones de PowerShell listas antes de detectar el juego (la activación no paga el arranque en frío)
+    get_pool().warm()
+
+    # 1. Detección: un recorrido inicial por si el juego ya está abierto y, después,
+    # solo eventos de inicio de procesos (ver process_events.py).
+    vigilante = GameLaunchWatcher(juegos_configurados)
+    vigilante.start()
+    try:
+        while juego_encontrado_proc is None:
+            inicio = vigilante.wait_for_game()
+            if inicio is None:
+                continue
             try:
-                proc_name = (proc.info.get('name') or "").lower()
-                if proc_name in juegos_configurados:
-                    juego_encontrado_proc = proc
-                    break
+                juego_encontrado_proc = psutil.Process(inicio.pid)
             except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
-        
-        if juego_encontrado_proc is None:
-            time.sleep(2) # Espera 2 segundos antes de volver a escanear
+                juego_encontrado_proc = None
+    except BaseException:
+        vigilante.stop()
+        raise
+    # La fuente sigue encolando los inicios durante la activación: el enforcer los trata después
+    fuente_inicios = vigilante.detach()
 
     game_pid = juego_encontrado_proc.pid
     game_name = juego_encontrado_proc.name()
@@ -1781,49 +1816,18 @@ def main():
 
     notify_game_mode_start(game_pid, game_name, previous_mode)
 
-    # Aplicar todas las optimizaciones
-    setup_power_plan()
-    state.timer_changed = set_high_timer_resolution()
-    disable_game_dvr()
-    optimize_gpu_settings()
-    optimize_network()
-    
-    # Nuevas optimizaciones avanzadas
-    set_quantum_length()
-    optimize_cpu_cache_for_game(game_pid)
-    optimize_gpu_memory_advanced(game_pid)
-    monitor_thermals_and_adjust()
-    optimize_io_scheduler()  # Nueva: Optimización del I/O scheduler
-    
-    active_gpu = detect_active_gpu_for_process(game_pid)
-    if active_gpu:
-        print(f"INFO: GPU activa detectada: {active_gpu}")
-        set_gpu_irq_priority_and_affinity(active_gpu)
-
-    state.qos_policy_created = create_qos_policy_for_game(game_name, state)
-    
-    # NUEVAS OPTIMIZACIONES EXTREMAS
-    optimize_core_parking(state)
-    enable_large_pages_for_game(state)
-    optimize_mmcss_for_game(state)
-    
-    flush_pagefile_to_ram()
-    aggressive_trim_processes(game_pid, lista_blanca)
-    
-    # Aplicar sistema de prioridades y afinidad
-    apply_priority_and_affinity_system(game_pid, lista_blanca, state)
-
-    # Detener procesos y servicios
-    state.processes_killed = terminar_procesos(procesos_a_terminar, lista_blanca)
-    state.services_stopped = detener_servicios(servicios_a_detener)
-    state.explorer_killed = kill_explorer()
+    # Aplicar todas las optimizaciones (en paralelo, ver build_activation_graph)
+    apply_game_mode(game_pid, game_name, lista_blanca, procesos_a_terminar, servicios_a_detener, state)
 
     print("\n=========================================")
     print("=== MODO JUEGO ACTIVADO. ¡A JUGAR!  ===")
     print(f"=== Monitoreando {game_name}...     ===")
     print("=========================================\n")
 
-    # 3. Fase de Monitoreo: Espera a que el proceso del juego termine.
+    # 3. Fase de Monitoreo: Espera a que el proceso del juego termine mientras el
+    # enforcer aplica las políticas a los procesos que arrancan durante la partida.
+    enforcer = build_session_enforcer(fuente_inicios, game_pid, lista_blanca, state)
+    enforcer.start()
     try:
         juego_encontrado_proc.wait() 
     except psutil.NoSuchProcess:
@@ -1831,6 +1835,11 @@ def main():
         pass
     except KeyboardInterrupt:
         print("\nInterrupción manual detectada. Restaurando el sistema...")
+    enforcer.stop()
+    metricas = enforcer.metrics.summary()
+    print(f"INFO: Procesos nuevos durante la partida: {metricas['seen']}, "
+          f"políticas aplicadas: {metricas['applied']}, "
+          f"latencia p95: {metricas['latency']['p95_ms']:.1f} ms")
 
     # 4. Fase de Restauración
     print("\n=========================================")
@@ -1855,11 +1864,8 @@ def main():
     reiniciar_servicios(state.services_stopped)
     # No se reinician procesos para no interrumpir al usuario.
     
-    # Cleanup: Close PowerShell session if it was used
-    global _ps_session
-    if _ps_session is not None:
-        _ps_session.close()
-        _ps_session = None
+    # Cleanup: cerrar las sesiones de PowerShell del pool
+    close_pool()
     
     notify_game_mode_end()
     
@@ -18,6 +18,8 @@ import logging
 from typing import Optional, List, Dict, Tuple
 from pathlib import Path
 
+from powershell_pool import get_pool, run_powershell
+
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -65,10 +67,7 @@ def detectar_ssd_principal() -> bool:
         Get-PhysicalDisk | Where-Object {$_.DeviceID -eq 0} | 
         Select-Object -ExpandProperty MediaType
         """
-        result = subprocess.run(
-            ["powershell", "-Command", ps_command],
-            capture_output=True, text=True, timeout=10, check=False
-        )
+        result = run_powershell(ps_command, timeout=10)
         return "SSD" in result.stdout
     except subprocess.TimeoutExpired:
         logger.warning("Timeout detectando tipo de disco, asumiendo HDD")
@@ -252,10 +251,7 @@ def es_disco_ssd(letra_disco: str) -> bool:
         $disk = Get-PhysicalDisk | Where-Object {{$_.DeviceID -eq $partition.DiskNumber}}
         $disk.MediaType
         """
-        result = subprocess.run(
-            ["powershell", "-Command", ps_command],
-            capture_output=True, text=True, timeout=10, check=False
-        )
+        result = run_powershell(ps_command, timeout=10)
         return "SSD" in result.stdout
     except Exception:
         return False
@@ -369,16 +365,13 @@ def optimizar_archivo_paginacion() -> bool:
         $pagefileset.Put() | Out-Null
         """
         
-        result = subprocess.run(
-            ["powershell", "-Command", ps_command],
-            capture_output=True, timeout=30, check=False
-        )
+        result = run_powershell(ps_command, timeout=30)
         
         if result.returncode == 0:
             logger.info(f"✓ Archivo de paginación configurado: {min_size_mb}-{max_size_mb} MB")
             return True
         else:
-            logger.warning(f"Advertencia configurando pagefile: {result.stderr.decode('utf-8', errors='ignore')}")
+            logger.warning(f"Advertencia configurando pagefile: {result.stderr}")
             return False
             
     except subprocess.TimeoutExpired:
@@ -397,10 +390,7 @@ def configurar_paginacion_administrada() -> bool:
         $computersys.AutomaticManagedPagefile = $True
         $computersys.Put() | Out-Null
         """
-        subprocess.run(
-            ["powershell", "-Command", ps_command],
-            capture_output=True, timeout=15, check=False
-        )
+        run_powershell(ps_command, timeout=15)
         logger.info("✓ Paginación configurada como administrada por sistema")
         return True
     except Exception as e:
@@ -543,10 +533,7 @@ def optimizar_adaptadores_red() -> bool:
         Get-NetAdapter | Where-Object {$_.Status -eq 'Up'} | 
         Select-Object -ExpandProperty Name
         """
-        result = subprocess.run(
-            ["powershell", "-Command", ps_command],
-            capture_output=True, text=True, timeout=15, check=False
-        )
+        result = run_powershell(ps_command, timeout=15)
         
         adaptadores = [a.strip() for a in result.stdout.split('\n') if a.strip()]
         
@@ -554,9 +541,11 @@ def optimizar_adaptadores_red() -> bool:
             logger.warning("No se encontraron adaptadores de red activos")
             return False
         
+        # Un script por adaptador, enviados juntos a una sola sesión del pool
+        scripts = []
         for adaptador in adaptadores:
             # Optimizar configuraciones avanzadas
-            ps_optimizar = f"""
+            scripts.append(f"""
             # Optimizar buffers
             Set-NetAdapterAdvancedProperty -Name '{adaptador}' -DisplayName 'Receive Buffers' -RegistryValue 2048 -ErrorAction SilentlyContinue
             Set-NetAdapterAdvancedProperty -Name '{adaptador}' -DisplayName 'Transmit Buffers' -RegistryValue 2048 -ErrorAction SilentlyContinue
@@ -566,12 +555,8 @@ def optimizar_adaptadores_red() -> bool:
             
             # RSS
             Enable-NetAdapterRss -Name '{adaptador}' -ErrorAction SilentlyContinue
-            """
-            
-            subprocess.run(
-                ["powershell", "-Command", ps_optimizar],
-                capture_output=True, timeout=15, check=False
-            )
+            """)
+        get_pool().run_batch(scripts, timeout=15 * len(scripts))
         
         logger.info(f"✓ {len(adaptadores)} adaptador(es) de red optimizados")
         return True
@@ -614,10 +599,7 @@ def optimizar_puntos_restauracion() -> bool:
             vssadmin Resize ShadowStorage /For={letra_disco}: /On={letra_disco}: /MaxSize={porcentaje_max}% 2>&1 | Out-Null
             """
             
-            subprocess.run(
-                ["powershell", "-Command", ps_command],
-                capture_output=True, timeout=30, check=False
-            )
+            run_powershell(ps_command, timeout=30)
             
             logger.info(f"✓ Puntos de restauración configurados ({porcentaje_max}% en {letra_disco}:)")
         
@@ -697,10 +679,7 @@ def optimizar_windows_update() -> bool:
         New-ItemProperty -Path "HKLM:\\SOFTWARE\\Microsoft\\Windows\\CurrentVersion\\DeliveryOptimization\\Settings" -Name "DownloadPercentageMaxBackground" -Value 50 -PropertyType DWORD -Force | Out-Null
         """
         
-        subprocess.run(
-            ["powershell", "-Command", ps_command],
-            capture_output=True, timeout=20, check=False
-        )
+        run_powershell(ps_command, timeout=20)
         
         # Limpiar caché de Windows Update
         try:
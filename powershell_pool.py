@@ -0,0 +1,470 @@
+# -*- coding: utf-8 -*-
+"""
+powershell_pool.py - Pool de sesiones de PowerShell persistentes
+Cada arranque en frío de powershell.exe cuesta 300-800 ms. El pool mantiene N
+sesiones abiertas (-Command -) y les envía cada script codificado en base64 en
+una sola línea; la sesión responde con una línea JSON marcada con el id único
+de la petición (salida, errores y código). Varias peticiones pueden viajar
+juntas en una sola escritura (run_batch), y run/submit reparten el trabajo
+entre las sesiones libres.
+
+Una sesión que se cae o excede el timeout se descarta y el pool abre otra en
+la siguiente petición. FakePowerShell habla el mismo protocolo dentro del
+proceso, para pruebas y benchmarks sin Windows.
+"""
+
+import atexit
+import base64
+import itertools
+import json
+import os
+import queue
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_TIMEOUT = 30
+# Una sesión se recicla tras tantas peticiones (PowerShell acumula memoria)
+MAX_REQUESTS_PER_SESSION = 200
+
+POWERSHELL_COMMAND = ["powershell", "-NoLogo", "-NoProfile", "-NonInteractive",
+                      "-ExecutionPolicy", "Bypass", "-Command", "-"]
+RESPONSE_PREFIX = "###PSPOOL "
+
+# Función que la sesión define al arrancar: ejecuta un script en base64 y
+# responde con una sola línea JSON (los registros verbose y warning van a la
+# salida con el mismo prefijo que imprime powershell.exe). El código sigue a
+# powershell -Command: 1 si hubo errores (también no terminantes) o si la
+# última instrucción falló ($? falso)
+_HELPER = r"""
+function __PoolRun([string]$id, [string]$b64) {
+    $global:LASTEXITCODE = 0
+    $global:__PoolLastOk = $true
+    $lines = New-Object System.Collections.Generic.List[string]
+    $errors = New-Object System.Collections.Generic.List[string]
+    $code = 0
+    try {
+        $source = [Text.Encoding]::UTF8.GetString([Convert]::FromBase64String($b64))
+        $script = [scriptblock]::Create($source + "`n" + '$global:__PoolLastOk = $?')
+        & $script *>&1 | ForEach-Object {
+            if ($_ -is [System.Management.Automation.ErrorRecord]) { $errors.Add($_.ToString()) }
+            elseif ($_ -is [System.Management.Automation.VerboseRecord]) { $lines.Add("VERBOSE: " + $_.Message) }
+            elseif ($_ -is [System.Management.Automation.WarningRecord]) { $lines.Add("WARNING: " + $_.Message) }
+            elseif ($_ -is [string]) { $lines.Add($_) }
+            else { $lines.Add(($_ | Out-String).TrimEnd()) }
+        }
+        if ($LASTEXITCODE) { $code = $LASTEXITCODE }
+        elseif ($errors.Count -gt 0 -or -not $global:__PoolLastOk) { $code = 1 }
+    } catch {
+        $errors.Add($_.ToString())
+        $code = 1
+    }
+    $response = @{ id = $id; code = $code; out = ($lines -join "`n"); err = ($errors -join "`n") }
+    [Console]::Out.WriteLine('###PSPOOL ' + ($response | ConvertTo-Json -Compress))
+    [Console]::Out.Flush()
+}
+[Console]::OutputEncoding = [System.Text.Encoding]::UTF8
+"""
+
+_REQUEST = re.compile(r"^__PoolRun '([^']*)' '([^']*)'$")
+_ids = itertools.count(1)
+
+
+def _b64(texto: str) -> str:
+    return base64.b64encode(texto.encode("utf-8")).decode("ascii")
+
+
+def _spawn_powershell():
+    return subprocess.Popen(
+        POWERSHELL_COMMAND,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        encoding="utf-8",
+        errors="replace",
+        creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+    )
+
+
+class PowerShellResult:
+    """Resultado de un script (mismos campos que subprocess.CompletedProcess)"""
+
+    __slots__ = ('args', 'returncode', 'stdout', 'stderr', 'duration')
+
+    def __init__(self, args: str, returncode: int, stdout: str = "", stderr: str = "",
+                 duration: float = 0.0):
+        self.args = args
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.duration = duration
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+    def __repr__(self) -> str:
+        return f"PowerShellResult(returncode={self.returncode}, stdout={self.stdout[:60]!r})"
+
+
+class PowerShellSession:
+    """
+    Un proceso de PowerShell persistente. No es seguro entre hilos: el pool
+    entrega cada sesión a un solo hilo a la vez.
+
+    Args:
+        spawn: Crea el proceso (por defecto powershell.exe; FakePowerShell en pruebas)
+    """
+
+    def __init__(self, spawn: Optional[Callable[[], object]] = None):
+        self.process = (spawn or _spawn_powershell)()
+        self.requests = 0
+        self.dead = False
+        self._lines: "queue.SimpleQueue" = queue.SimpleQueue()
+        threading.Thread(target=self._read, name="ps-session-reader", daemon=True).start()
+        self._send(f"Invoke-Expression ([Text.Encoding]::UTF8.GetString([Convert]::FromBase64String('{_b64(_HELPER)}')))\n")
+
+    def _read(self) -> None:
+        try:
+            for linea in self.process.stdout:
+                self._lines.put(linea)
+        except (OSError, ValueError):
+            pass
+        self._lines.put(None)
+
+    def _send(self, texto: str) -> bool:
+        try:
+            self.process.stdin.write(texto)
+            self.process.stdin.flush()
+            return True
+        except (OSError, ValueError):
+            self.dead = True
+            return False
+
+    def _response(self, request_id: str, deadline: float) -> Optional[dict]:
+        """Espera la respuesta de request_id; None si la sesión terminó"""
+        while True:
+            restante = deadline - time.monotonic()
+            if restante <= 0:
+                raise queue.Empty
+            linea = self._lines.get(timeout=restante)
+            if linea is None:
+                self.dead = True
+                return None
+            if not linea.startswith(RESPONSE_PREFIX):
+                continue   # eco de la consola u otra salida suelta
+            try:
+                datos = json.loads(linea[len(RESPONSE_PREFIX):])
+            except ValueError:
+                continue
+            if datos.get("id") == request_id:
+                return datos
+
+    def run_many(self, scripts: Sequence[str], timeout: float = DEFAULT_TIMEOUT) -> List[PowerShellResult]:
+        """
+        Envía todos los scripts en una sola escritura y lee las respuestas en orden.
+        Si se agota el timeout (total) la sesión se cierra y se lanza
+        subprocess.TimeoutExpired, igual que subprocess.run.
+        """
+        inicio = time.monotonic()
+        deadline = inicio + timeout
+        ids = [f"{os.getpid()}-{next(_ids)}" for _ in scripts]
+        self.requests += len(scripts)
+        enviado = not self.dead and self._send(
+            "".join(f"__PoolRun '{request_id}' '{_b64(script)}'\n" for request_id, script in zip(ids, scripts)))
+        resultados = []
+        for request_id, script in zip(ids, scripts):
+            datos = None
+            if enviado and not self.dead:
+                try:
+                    datos = self._response(request_id, deadline)
+                except queue.Empty:
+                    self.close(force=True)
+                    raise subprocess.TimeoutExpired(script[:80], timeout)
+            ahora = time.monotonic()
+            if datos is None:
+                resultados.append(PowerShellResult(script, -1, "", "La sesión de PowerShell terminó", ahora - inicio))
+                continue
+            salida = datos.get("out") or ""
+            errores = datos.get("err") or ""
+            resultados.append(PowerShellResult(
+                script, int(datos.get("code") or 0),
+                salida + "\n" if salida else "", errores + "\n" if errores else "", ahora - inicio))
+            inicio = ahora
+        return resultados
+
+    def run(self, script: str, timeout: float = DEFAULT_TIMEOUT) -> PowerShellResult:
+        return self.run_many([script], timeout)[0]
+
+    def close(self, force: bool = False) -> None:
+        """Cierra la sesión; la mata si no sale sola o si force (tras un timeout)"""
+        self.dead = True
+        if not force:
+            try:
+                self.process.stdin.write("exit\n")
+                self.process.stdin.flush()
+                self.process.stdin.close()
+                self.process.wait(timeout=2)
+                return
+            except Exception:
+                pass
+        try:
+            self.process.kill()
+        except Exception:
+            pass
+
+
+class PowerShellPool:
+    """
+    Hasta `size` sesiones calientes compartidas entre hilos
+
+    Args:
+        size: Sesiones simultáneas como máximo
+        spawn: Crea cada proceso (ver PowerShellSession)
+        max_requests: Peticiones por sesión antes de reciclarla
+    """
+
+    def __init__(self, size: int = DEFAULT_POOL_SIZE, spawn: Optional[Callable[[], object]] = None,
+                 max_requests: int = MAX_REQUESTS_PER_SESSION):
+        self.size = max(1, size)
+        self.spawn = spawn
+        self.max_requests = max_requests
+        self.spawned = 0
+        self.recycled = 0
+        self._idle: List[PowerShellSession] = []
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._closed = False
+
+    def _new_session(self) -> PowerShellSession:
+        sesion = PowerShellSession(self.spawn)
+        with self._lock:
+            self.spawned += 1
+        return sesion
+
+    def _acquire(self) -> PowerShellSession:
+        self._slots.acquire()
+        with self._lock:
+            sesion = self._idle.pop() if self._idle else None
+        if sesion is None:
+            try:
+                sesion = self._new_session()
+            except Exception:
+                self._slots.release()
+                raise
+        return sesion
+
+    def _release(self, sesion: PowerShellSession) -> None:
+        if sesion.dead or sesion.requests >= self.max_requests or self._closed:
+            sesion.close()
+            with self._lock:
+                self.recycled += 1
+        else:
+            with self._lock:
+                self._idle.append(sesion)
+        self._slots.release()
+
+    def warm(self, count: Optional[int] = None) -> int:
+        """Abre sesiones por adelantado (el arranque de PowerShell sigue en segundo plano)"""
+        abiertas = 0
+        with self._lock:
+            faltan = min(count or self.size, self.size) - len(self._idle)
+        for _ in range(max(0, faltan)):
+            if not self._slots.acquire(blocking=False):
+                break
+            try:
+                sesion = self._new_session()
+            except Exception:
+                self._slots.release()
+                break
+            with self._lock:
+                self._idle.append(sesion)
+            self._slots.release()
+            abiertas += 1
+        return abiertas
+
+    def run(self, script: str, timeout: float = DEFAULT_TIMEOUT) -> PowerShellResult:
+        """Ejecuta un script en una sesión libre (lanza TimeoutExpired u OSError como subprocess.run)"""
+        return self.run_batch([script], timeout)[0]
+
+    def run_batch(self, scripts: Sequence[str], timeout: float = DEFAULT_TIMEOUT) -> List[PowerShellResult]:
+        """Varios scripts en una sola ida y vuelta a la misma sesión (timeout total)"""
+        if not scripts:
+            return []
+        sesion = self._acquire()
+        try:
+            return sesion.run_many(scripts, timeout)
+        finally:
+            self._release(sesion)
+
+    def submit(self, script: str, timeout: float = DEFAULT_TIMEOUT) -> "Future[PowerShellResult]":
+        """Ejecuta en segundo plano; el Future trae el resultado o la excepción"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="ps-pool")
+            executor = self._executor
+        return executor.submit(self.run, script, timeout)
+
+    def close(self) -> None:
+        """Cierra las sesiones libres; las que estén en uso se cierran al devolverse"""
+        self._closed = True
+        with self._lock:
+            sesiones, self._idle = self._idle, []
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+        for sesion in sesiones:
+            sesion.close()
+
+
+class FakePowerShell:
+    """
+    Proceso falso con la interfaz de Popen que responde el protocolo del pool
+    dentro del proceso. handler(script) devuelve la salida, o una tupla
+    (salida, errores) para simular errores no terminantes (código 1 con salida);
+    una excepción se reporta como error terminante (código 1) y un script
+    "exit" termina la sesión.
+
+    Args:
+        handler: Función script -> salida o (salida, errores)
+        startup_delay: Segundos antes de atender la primera petición (arranque en frío)
+    """
+
+    def __init__(self, handler: Optional[Callable[[str], Union[str, Tuple[str, str]]]] = None, startup_delay: float = 0.0):
+        self.handler = handler or (lambda script: "")
+        self.startup_delay = startup_delay
+        self.returncode: Optional[int] = None
+        lectura_in, escritura_in = os.pipe()
+        lectura_out, escritura_out = os.pipe()
+        self.stdin = open(escritura_in, "w", encoding="utf-8")
+        self.stdout = open(lectura_out, "r", encoding="utf-8")
+        self._requests = open(lectura_in, "r", encoding="utf-8")
+        self._responses = open(escritura_out, "w", encoding="utf-8")
+        self._thread = threading.Thread(target=self._serve, name="fake-powershell", daemon=True)
+        self._thread.start()
+
+    def _serve(self) -> None:
+        time.sleep(self.startup_delay)
+        try:
+            for linea in self._requests:
+                linea = linea.strip()
+                if linea == "exit":
+                    break
+                peticion = _REQUEST.match(linea)
+                if not peticion:
+                    continue
+                script = base64.b64decode(peticion.group(2)).decode("utf-8")
+                if script.strip() == "exit":
+                    break
+                try:
+                    salida = self.handler(script)
+                    errores = ""
+                    if isinstance(salida, tuple):
+                        salida, errores = salida
+                    respuesta = {"id": peticion.group(1), "code": 1 if errores else 0,
+                                 "out": salida.rstrip("\n"), "err": errores}
+                except Exception as e:
+                    respuesta = {"id": peticion.group(1), "code": 1, "out": "", "err": str(e)}
+                self._responses.write(RESPONSE_PREFIX + json.dumps(respuesta) + "\n")
+                self._responses.flush()
+        except (OSError, ValueError):
+            pass
+        finally:
+            if self.returncode is None:
+                self.returncode = 0
+            for archivo in (self._responses, self._requests):
+                try:
+                    archivo.close()
+                except OSError:
+                    pass
+
+    def poll(self) -> Optional[int]:
+        return None if self._thread.is_alive() else self.returncode
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            raise subprocess.TimeoutExpired("fake-powershell", timeout)
+        return self.returncode
+
+    def kill(self) -> None:
+        self.returncode = -9
+        for archivo in (self.stdin, self._responses):
+            try:
+                archivo.close()
+            except OSError:
+                pass
+
+    terminate = kill
+
+
+_default_pool: Optional[PowerShellPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_pool() -> PowerShellPool:
+    """Pool compartido del proceso"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = PowerShellPool()
+            atexit.register(close_pool)
+        return _default_pool
+
+
+def run_powershell(script: str, timeout: float = DEFAULT_TIMEOUT) -> PowerShellResult:
+    """Atajo: ejecuta un script en el pool compartido"""
+    return get_pool().run(script, timeout)
+
+
+def close_pool() -> None:
+    """Cierra el pool compartido (se vuelve a crear si se usa otra vez)"""
+    global _default_pool
+    with _default_pool_lock:
+        pool, _default_pool = _default_pool, None
+    if pool is not None:
+        pool.close()
+
+
+if __name__ == "__main__":
+    import shutil
+    import sys
+
+    # Sin powershell.exe se mide contra el proceso falso con arranque de 300 ms
+    real = shutil.which("powershell") is not None and "--fake" not in sys.argv
+    spawn = None if real else (lambda: FakePowerShell(lambda script: "ok", startup_delay=0.3))
+    scripts = ["Write-Output 'ok'"] * 8
+
+    inicio = time.perf_counter()
+    for script in scripts:
+        frio_pool = PowerShellPool(1, spawn)
+        frio_pool.run(script)
+        frio_pool.close()
+    frio = time.perf_counter() - inicio
+
+    pool = PowerShellPool(4, spawn)
+    pool.warm()
+    pool.run(scripts[0])
+    inicio = time.perf_counter()
+    [futuro.result() for futuro in [pool.submit(script) for script in scripts]]
+    caliente = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    pool.run_batch(scripts)
+    lote = time.perf_counter() - inicio
+    pool.close()
+
+    # Un error no terminante (p. ej. Optimize-Volume sobre una unidad sin soporte) debe dar código 1
+    if real:
+        error = run_powershell("Get-Item 'C:\\__no_existe__'; Write-Output 'sigue'")
+    else:
+        falso = PowerShellPool(1, lambda: FakePowerShell(lambda script: ("sigue", "No se encuentra la ruta")))
+        error = falso.run("Get-Item 'C:\\__no_existe__'; Write-Output 'sigue'")
+        falso.close()
+    assert error.returncode == 1 and error.stdout.strip() == "sigue", error
+    print(f"{'powershell.exe' if real else 'FakePowerShell'}: {len(scripts)} scripts en frío {frio * 1000:.0f} ms, "
+          f"pool {caliente * 1000:.0f} ms, lote {lote * 1000:.0f} ms")
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+priority_state_cache.py - Caché del estado aplicado por el optimizador a cada proceso
+Registra la última prioridad, afinidad, prioridad de I/O y de memoria que se fijó
+para cada proceso (clave: pid + create_time) y permite emitir llamadas al sistema
+solo cuando el estado objetivo realmente difiere del ya aplicado.
+"""
+
+import threading
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Campos de estado que el optimizador controla
+FIELD_PRIORITY = "priority"
+FIELD_AFFINITY = "affinity"
+FIELD_IO_PRIORITY = "io_priority"
+FIELD_MEMORY_PRIORITY = "memory_priority"
+
+ProcessKey = Tuple[int, float]
+
+
+class AppliedStateCache:
+    """
+    Caché por proceso del último estado aplicado.
+    Un PID reutilizado por otro proceso tiene otro create_time, por lo que no
+    hereda el estado del anterior.
+    """
+
+    def __init__(self):
+        self._state: Dict[ProcessKey, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.applied = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def __len__(self) -> int:
+        return len(self._state)
+
+    def pending(self, key: ProcessKey, target: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Calcula los campos que difieren del estado ya aplicado
+
+        Args:
+            key: (pid, create_time) del proceso
+            target: Estado objetivo; los valores None se ignoran
+
+        Returns:
+            Diccionario solo con los campos que requieren una llamada al sistema
+        """
+        with self._lock:
+            actual = self._state.get(key, {})
+            cambios = {}
+            for campo, valor in target.items():
+                if valor is None:
+                    continue
+                if actual.get(campo) == valor:
+                    self.skipped += 1
+                else:
+                    cambios[campo] = valor
+            return cambios
+
+    def record(self, key: ProcessKey, field: str, value: Any, success: bool = True) -> None:
+        """
+        Registra el resultado de una llamada al sistema.
+        Los fallos también se registran: un proceso protegido seguirá negando
+        el acceso durante toda su vida y reintentar solo genera llamadas inútiles.
+        """
+        with self._lock:
+            self._state.setdefault(key, {})[field] = value
+            if success:
+                self.applied += 1
+            else:
+                self.failed += 1
+
+    def forget(self, key: ProcessKey) -> None:
+        """Descarta el estado registrado de un proceso"""
+        with self._lock:
+            self._state.pop(key, None)
+
+    def prune(self, live_pids: Iterable[int]) -> int:
+        """
+        Elimina entradas de procesos que ya no existen
+
+        Returns:
+            Cantidad de entradas eliminadas
+        """
+        vivos = set(live_pids)
+        with self._lock:
+            muertos = [clave for clave in self._state if clave[0] not in vivos]
+            for clave in muertos:
+                del self._state[clave]
+        return len(muertos)
+
+    def get(self, key: ProcessKey) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            estado = self._state.get(key)
+            return dict(estado) if estado is not None else None
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores de llamadas aplicadas, omitidas y fallidas"""
+        with self._lock:
+            return {
+                'applied': self.applied,
+                'skipped': self.skipped,
+                'failed': self.failed,
+                'tracked': len(self._state),
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.applied = 0
+            self.skipped = 0
+            self.failed = 0
@@ -0,0 +1,392 @@
+# -*- coding: utf-8 -*-
+"""
+process_events.py - Fuente de eventos de inicio de procesos
+Reemplaza el recorrido completo de procesos cada 2 segundos por eventos: el
+backend de producción se suscribe a Win32_ProcessStartTrace (WMI, vía pywin32),
+el de respaldo compara la lista de PIDs y solo consulta el nombre de los PIDs
+nuevos, y uno guionado sirve para pruebas sin Windows.
+
+GameLaunchWatcher combina una fuente con el conjunto de juegos configurados
+(nombres en minúsculas, precalculado) y avisa en cuanto arranca uno.
+"""
+
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional, Tuple
+
+import psutil
+
+# Intervalo del backend de sondeo (solo se piden nombres de PIDs nuevos)
+POLL_INTERVAL = 0.5
+# Espera máxima de NextEvent (ms): cada cuánto el hilo WMI revisa si debe detenerse
+WMI_WAIT_MS = 500
+WMI_QUERY = "SELECT ProcessID, ParentProcessID, ProcessName FROM Win32_ProcessStartTrace"
+# Cada cuánto wait_for_game() revisa que la fuente siga viva
+HEALTH_CHECK_INTERVAL = 5.0
+# HRESULT de NextEvent cuando vence la espera sin eventos
+WBEM_E_TIMED_OUT = 0x80043001
+
+
+@dataclass
+class ProcessStart:
+    """Inicio de proceso: PID, nombre del ejecutable y momento (monotonic ns) del evento"""
+    pid: int
+    name: str
+    timestamp_ns: int
+    ppid: Optional[int] = None  # Solo si el backend lo informa (WMI)
+
+
+class ProcessStartSource:
+    """
+    Interfaz mínima de una fuente de inicios de procesos.
+    Los backends publican eventos con _emit(); los consumidores esperan con wait().
+    """
+
+    def __init__(self):
+        self._events: "queue.Queue[Optional[ProcessStart]]" = queue.Queue()
+
+    def start(self) -> bool:
+        """Inicia el backend. Retorna False si no está disponible."""
+        return True
+
+    def stop(self) -> None:
+        """Detiene el backend"""
+
+    def healthy(self) -> bool:
+        """False si el backend dejó de entregar eventos"""
+        return True
+
+    def interrupt(self) -> None:
+        """Despierta a un consumidor bloqueado en wait(), que retorna None"""
+        self._events.put(None)
+
+    def _emit(self, pid: Optional[int], name: Optional[str], ppid: Optional[int] = None) -> None:
+        if not pid or not name:
+            return
+        self._events.put(ProcessStart(pid, name, time.monotonic_ns(), ppid))
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[ProcessStart]:
+        """Bloquea hasta el próximo inicio de proceso o hasta agotar el timeout"""
+        try:
+            return self._events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def drain(self) -> List[ProcessStart]:
+        """Inicios pendientes, sin bloquear"""
+        eventos = []
+        while True:
+            try:
+                evento = self._events.get_nowait()
+            except queue.Empty:
+                return eventos
+            if evento is not None:
+                eventos.append(evento)
+
+
+def _wbem_timeout(error) -> bool:
+    """True si el com_error es el vencimiento normal de NextEvent"""
+    codigos = [getattr(error, "hresult", None)]
+    excepinfo = getattr(error, "excepinfo", None)
+    if excepinfo and len(excepinfo) > 5:
+        codigos.append(excepinfo[5])
+    return any(c is not None and (c & 0xFFFFFFFF) == WBEM_E_TIMED_OUT for c in codigos)
+
+
+def _full_name(pid: int, event_name: str) -> str:
+    """
+    Nombre completo del ejecutable. ProcessName de Win32_ProcessStartTrace es el
+    nombre de imagen del kernel, truncado a ~15 caracteres (FortniteClient-Win64-Shipping.exe
+    llega como "FortniteClient-"); solo se usa si el proceso ya terminó.
+    """
+    try:
+        return psutil.Process(pid).name()
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return event_name
+
+
+class WmiProcessStartSource(ProcessStartSource):
+    """
+    Backend de producción: consulta de eventos Win32_ProcessStartTrace en un hilo propio.
+    Requiere privilegios de administrador; sin ellos start() retorna False.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._ok = False
+
+    def start(self) -> bool:
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout=10)
+        return self._ok
+
+    def _run(self) -> None:
+        try:
+            import pythoncom
+            import pywintypes
+            import win32com.client
+        except ImportError:
+            self._ready.set()
+            return
+        pythoncom.CoInitialize()
+        try:
+            servicio = win32com.client.GetObject(r"winmgmts:{impersonationLevel=impersonate}!\\.\root\cimv2")
+            eventos = servicio.ExecNotificationQuery(WMI_QUERY)
+            # La suscripción puede fallar recién al pedir el primer evento (acceso denegado)
+            try:
+                evento = eventos.NextEvent(1)
+            except pywintypes.com_error as e:
+                if not _wbem_timeout(e):
+                    raise
+                evento = None
+            self._ok = True
+            self._ready.set()
+
+            while not self._stop.is_set():
+                if evento is not None:
+                    pid = int(evento.ProcessID)
+                    self._emit(pid, _full_name(pid, str(evento.ProcessName)), int(evento.ParentProcessID))
+                try:
+                    evento = eventos.NextEvent(WMI_WAIT_MS)
+                except pywintypes.com_error as e:
+                    if not _wbem_timeout(e):
+                        raise
+                    evento = None
+        except Exception as e:
+            if self._ok:
+                print(f"Error en eventos WMI de procesos: {e}")
+            self._ok = False
+        finally:
+            self._ready.set()
+            pythoncom.CoUninitialize()
+
+    def healthy(self) -> bool:
+        return self._ok and self._thread is not None and self._thread.is_alive()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+class PollingProcessStartSource(ProcessStartSource):
+    """
+    Backend de respaldo: compara la lista de PIDs entre sondeos y solo
+    consulta el nombre de los PIDs que no se habían visto.
+    El primer sondeo solo registra los PIDs existentes.
+    """
+
+    def __init__(self, interval: float = POLL_INTERVAL,
+                 list_pids: Callable[[], Iterable[int]] = psutil.pids,
+                 get_name: Optional[Callable[[int], str]] = None):
+        super().__init__()
+        self.interval = interval
+        self._list_pids = list_pids
+        self._get_name = get_name or (lambda pid: psutil.Process(pid).name())
+        self._stop = threading.Event()
+        self._known: Optional[set] = None
+
+    def start(self) -> bool:
+        self.poll()
+        threading.Thread(target=self._run, daemon=True).start()
+        return True
+
+    def poll(self) -> int:
+        """Un sondeo: emite los PIDs nuevos y retorna cuántos hubo"""
+        actuales = set(self._list_pids())
+        if self._known is None:
+            self._known = actuales
+            return 0
+        nuevos = actuales - self._known
+        self._known = actuales
+        for pid in sorted(nuevos):
+            try:
+                self._emit(pid, self._get_name(pid))
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return len(nuevos)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                continue
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+class ScriptedProcessStartSource(ProcessStartSource):
+    """
+    Backend guionado para pruebas: emite una secuencia fija de (retardo_s, pid, nombre)
+    """
+
+    def __init__(self, script: Iterable[Tuple[float, int, str]]):
+        super().__init__()
+        self._script = list(script)
+        self._stop = threading.Event()
+
+    def start(self) -> bool:
+        threading.Thread(target=self._run, daemon=True).start()
+        return True
+
+    def _run(self) -> None:
+        for retardo, pid, nombre in self._script:
+            if self._stop.wait(retardo):
+                return
+            self._emit(pid, nombre)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+def create_process_start_source(interval: float = POLL_INTERVAL) -> ProcessStartSource:
+    """Crea la mejor fuente disponible: eventos WMI y, si fallan, sondeo de PIDs nuevos"""
+    fuente = WmiProcessStartSource()
+    if not fuente.start():
+        fuente.stop()
+        fuente = PollingProcessStartSource(interval)
+        fuente.start()
+    return fuente
+
+
+class GameLaunchWatcher:
+    """
+    Avisa cuando arranca un juego configurado
+
+    Los procesos que ya estaban abiertos se buscan con un único recorrido
+    completo al empezar y cada vez que cambia la lista de juegos; después solo
+    se miran los inicios que informa la fuente.
+
+    Args:
+        games: Nombres de ejecutables de juegos (se comparan en minúsculas)
+        source: Fuente de inicios (por defecto create_process_start_source())
+    """
+
+    def __init__(self, games: Iterable[str], source: Optional[ProcessStartSource] = None):
+        self.games = frozenset(g.lower() for g in games)
+        self.source = source
+        self._rescan = True
+        self._started = False
+        self._interrupted = False
+
+    def start(self) -> None:
+        if self._started:
+            return
+        self._interrupted = False
+        if self.source is None:
+            self.source = create_process_start_source()
+        elif not self.source.start():
+            raise OSError("La fuente de inicios de procesos no está disponible")
+        self._started = True
+
+    def stop(self) -> None:
+        self._interrupted = True
+        if self.source is not None:
+            self.source.stop()
+            self.source.interrupt()
+        self._started = False
+
+    def detach(self) -> Optional[ProcessStartSource]:
+        """
+        Entrega la fuente sin detenerla: los inicios posteriores a la detección
+        siguen encolados para otro consumidor (ver session_enforcer.py)
+        """
+        fuente, self.source = self.source, None
+        self._started = False
+        return fuente
+
+    def interrupt(self) -> None:
+        """Despierta a wait_for_game(), que retorna None"""
+        self._interrupted = True
+        if self.source is not None:
+            self.source.interrupt()
+
+    def set_games(self, games: Iterable[str]) -> bool:
+        """Actualiza la lista de juegos; retorna True si cambió"""
+        juegos = frozenset(g.lower() for g in games)
+        if juegos == self.games:
+            return False
+        self.games = juegos
+        self._rescan = True
+        return True
+
+    def matches(self, name: str) -> bool:
+        return name.lower() in self.games
+
+    def running_game(self) -> Optional[ProcessStart]:
+        """Recorrido completo: un juego configurado que ya esté abierto"""
+        if not self.games:
+            return None
+        from process_snapshot import get_snapshot
+        pid = get_snapshot(max_age=0).has_name(self.games)
+        if pid is None:
+            return None
+        try:
+            return ProcessStart(pid, psutil.Process(pid).name(), time.monotonic_ns())
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return None
+
+    def _check_source(self) -> None:
+        # Si el backend murió (p. ej. se reinició el servicio WMI) se pasa al sondeo y
+        # se recorre todo una vez por si un juego arrancó mientras no había eventos
+        if self._started and not self.source.healthy():
+            self.source.stop()
+            self.source = PollingProcessStartSource()
+            self.source.start()
+            self._rescan = True
+
+    def _pending_scan(self) -> Optional[ProcessStart]:
+        if not self._rescan:
+            return None
+        self._rescan = False
+        return self.running_game()
+
+    def poll(self) -> Optional[ProcessStart]:
+        """Sin bloquear: el primer juego iniciado desde la última consulta, o None"""
+        self._check_source()
+        juego = self._pending_scan()
+        for evento in self.source.drain():
+            if juego is None and self.matches(evento.name):
+                juego = evento
+        return juego
+
+    def wait_for_game(self, timeout: Optional[float] = None) -> Optional[ProcessStart]:
+        """Bloquea hasta que arranque un juego (o uno ya esté abierto); None si vence el timeout o se interrumpe"""
+        limite = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            self._check_source()
+            juego = self._pending_scan()
+            if juego is not None:
+                return juego
+            espera = HEALTH_CHECK_INTERVAL
+            if limite is not None:
+                espera = min(espera, max(0.0, limite - time.monotonic()))
+            evento = self.source.wait(espera)
+            if evento is None:
+                # interrupt() o stop() desde otro hilo, o vencimiento del timeout
+                if self._interrupted:
+                    # Un interrupt() despierta una sola espera; tras stop() todas retornan
+                    self._interrupted = not self._started
+                    return None
+                if limite is not None and time.monotonic() >= limite:
+                    return None
+                continue
+            if self.matches(evento.name):
+                return evento
+
+
+if __name__ == "__main__":
+    fuente = ScriptedProcessStartSource([(0.1, 100, "notepad.exe"), (0.05, 200, "Game.EXE")])
+    vigilante = GameLaunchWatcher(["game.exe"], fuente)
+    vigilante.start()
+    juego = vigilante.wait_for_game(timeout=2)
+    vigilante.stop()
+    if juego:
+        print(f"Juego {juego.name} (PID {juego.pid}) detectado en "
+              f"{(time.monotonic_ns() - juego.timestamp_ns) / 1e6:.3f} ms")
@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+"""
+process_snapshot.py - Servicio compartido de instantáneas de procesos
+Realiza un único recorrido de psutil.process_iter por intervalo y permite que
+todos los monitores (modo agresivo, modo juego, GUI) consulten la misma tabla
+en lugar de recorrer la lista de procesos cada uno por su cuenta.
+"""
+
+import threading
+import time
+from array import array
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import psutil
+
+from cpu_sampler import CpuSampler
+
+
+# Atributos que se leen en el único recorrido por intervalo.
+# cpu_percent no se pide: lo calcula CpuSampler a partir de diferencias de cpu_times.
+SNAPSHOT_ATTRS = ['pid', 'ppid', 'name', 'cpu_times', 'memory_info', 'create_time']
+
+# Intervalo por defecto entre recorridos completos (segundos)
+DEFAULT_SNAPSHOT_INTERVAL = 1.0
+
+
+class ProcessSnapshot:
+    """
+    Tabla compacta e inmutable con los procesos vistos en un único recorrido.
+    Las columnas numéricas se guardan en arrays para reducir memoria con 400+ procesos.
+    """
+
+    __slots__ = (
+        'timestamp', 'pids', 'ppids', 'names', 'cpu_percent', 'cpu_time',
+        'rss', 'create_time', '_index', '_by_name'
+    )
+
+    def __init__(self, timestamp: float):
+        self.timestamp = timestamp
+        self.pids = array('q')
+        self.ppids = array('q')
+        self.names: List[str] = []
+        self.cpu_percent = array('d')
+        self.cpu_time = array('d')
+        self.rss = array('Q')
+        self.create_time = array('d')
+        self._index: Dict[int, int] = {}
+        self._by_name: Dict[str, List[int]] = {}
+
+    def _append(self, pid: int, ppid: int, name: str, cpu_percent: float,
+                cpu_time: float, rss: int, create_time: float) -> None:
+        """Agrega una fila (solo durante la construcción de la instantánea)"""
+        self._index[pid] = len(self.pids)
+        self.pids.append(pid)
+        self.ppids.append(ppid)
+        self.names.append(name)
+        self.cpu_percent.append(cpu_percent)
+        self.cpu_time.append(cpu_time)
+        self.rss.append(rss)
+        self.create_time.append(create_time)
+        self._by_name.setdefault(name.lower(), []).append(pid)
+
+    def __len__(self) -> int:
+        return len(self.pids)
+
+    def __contains__(self, pid: int) -> bool:
+        return pid in self._index
+
+    @property
+    def age(self) -> float:
+        """Antigüedad de la instantánea en segundos"""
+        return time.monotonic() - self.timestamp
+
+    def row(self, pid: int) -> Optional[int]:
+        """Índice de fila de un PID o None si no estaba vivo en el recorrido"""
+        return self._index.get(pid)
+
+    def name(self, pid: int) -> Optional[str]:
+        """Nombre del proceso tal como lo reporta el sistema"""
+        idx = self._index.get(pid)
+        return self.names[idx] if idx is not None else None
+
+    def ppid(self, pid: int) -> Optional[int]:
+        idx = self._index.get(pid)
+        return self.ppids[idx] if idx is not None else None
+
+    def get_create_time(self, pid: int) -> Optional[float]:
+        idx = self._index.get(pid)
+        return self.create_time[idx] if idx is not None else None
+
+    def get_cpu_percent(self, pid: int) -> float:
+        """Uso de CPU desde la instantánea anterior (0.0 si el proceso es nuevo)"""
+        idx = self._index.get(pid)
+        return self.cpu_percent[idx] if idx is not None else 0.0
+
+    def pid_set(self) -> Set[int]:
+        """Conjunto de PIDs vivos en el recorrido"""
+        return set(self._index)
+
+    def pids_by_name(self, name: str) -> Set[int]:
+        """Todos los PIDs cuyo nombre coincide (sin distinguir mayúsculas)"""
+        return set(self._by_name.get(name.lower(), ()))
+
+    def groups_by_name(self) -> Dict[str, List[int]]:
+        """Procesos agrupados por nombre en minúsculas"""
+        return {nombre: list(pids) for nombre, pids in self._by_name.items()}
+
+    def has_name(self, names: Set[str]) -> Optional[int]:
+        """Retorna el primer PID cuyo nombre (minúsculas) está en el conjunto dado"""
+        for nombre in names:
+            pids = self._by_name.get(nombre)
+            if pids:
+                return pids[0]
+        return None
+
+    def iter_processes(self) -> Iterator[Tuple[int, str]]:
+        """Itera pares (pid, nombre)"""
+        return zip(self.pids, self.names)
+
+
+class ProcessTree:
+    """
+    Índice incremental ppid -> hijos.
+    Se actualiza por diferencias entre instantáneas (PIDs nuevos se enlazan,
+    PIDs muertos o reutilizados se podan), de modo que "todos los descendientes
+    de X" se resuelve con búsquedas en diccionario sin llamar a Process.children().
+    """
+
+    def __init__(self):
+        self._parent: Dict[int, int] = {}
+        self._children: Dict[int, Set[int]] = {}
+        self._create_time: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self.last_added = 0
+        self.last_removed = 0
+
+    def __len__(self) -> int:
+        return len(self._create_time)
+
+    def update(self, snapshot: ProcessSnapshot) -> None:
+        """Aplica la diferencia entre el estado actual del índice y la instantánea"""
+        with self._lock:
+            actuales = snapshot._index
+
+            # 1. Podar PIDs muertos o reutilizados (create_time distinto)
+            muertos = [
+                pid for pid, creado in self._create_time.items()
+                if pid not in actuales or snapshot.create_time[actuales[pid]] != creado
+            ]
+            for pid in muertos:
+                self._remove(pid)
+
+            # 2. Registrar PIDs nuevos antes de enlazar (el padre puede venir después)
+            nuevos = []
+            for pid, idx in actuales.items():
+                if pid not in self._create_time:
+                    self._create_time[pid] = snapshot.create_time[idx]
+                    nuevos.append(pid)
+
+            # 3. Enlazar nuevos y reenlazar los que cambiaron de padre
+            for pid, idx in actuales.items():
+                ppid = snapshot.ppids[idx]
+                if self._parent.get(pid) != ppid:
+                    self._link(pid, ppid)
+
+            self.last_added = len(nuevos)
+            self.last_removed = len(muertos)
+
+    def _link(self, pid: int, ppid: int) -> None:
+        anterior = self._parent.get(pid)
+        if anterior is not None:
+            hermanos = self._children.get(anterior)
+            if hermanos is not None:
+                hermanos.discard(pid)
+        self._parent[pid] = ppid
+        # Un padre creado después que el hijo es un PID reutilizado: no enlazar
+        creado_padre = self._create_time.get(ppid)
+        if ppid == pid or creado_padre is None or creado_padre > self._create_time[pid]:
+            return
+        self._children.setdefault(ppid, set()).add(pid)
+
+    def _remove(self, pid: int) -> None:
+        ppid = self._parent.pop(pid, None)
+        if ppid is not None:
+            hermanos = self._children.get(ppid)
+            if hermanos is not None:
+                hermanos.discard(pid)
+        # Los hijos huérfanos quedan sin enlazar: un PID reutilizado no los hereda
+        self._children.pop(pid, None)
+        self._create_time.pop(pid, None)
+
+    def children(self, pid: int) -> Set[int]:
+        """Hijos directos de un PID"""
+        with self._lock:
+            return set(self._children.get(pid, ()))
+
+    def descendants(self, pid: int) -> Set[int]:
+        """Todos los descendientes de un PID (hijos, nietos, ...), sin incluirlo"""
+        return self.expand((pid,)) - {pid}
+
+    def expand(self, pids) -> Set[int]:
+        """Conjunto de PIDs dado más todos sus descendientes"""
+        resultado = set(pids)
+        pendientes = list(resultado)
+        with self._lock:
+            while pendientes:
+                hijos = self._children.get(pendientes.pop())
+                if not hijos:
+                    continue
+                for hijo in hijos:
+                    if hijo not in resultado:
+                        resultado.add(hijo)
+                        pendientes.append(hijo)
+        return resultado
+
+
+class ProcessSnapshotService:
+    """
+    Servicio que mantiene la última instantánea de procesos.
+    Cualquier número de consumidores puede pedirla; solo se realiza un recorrido
+    de process_iter por intervalo aunque varios hilos la soliciten a la vez.
+    """
+
+    def __init__(self, interval: float = DEFAULT_SNAPSHOT_INTERVAL,
+                 process_iter: Callable = psutil.process_iter):
+        self.interval = interval
+        self._process_iter = process_iter
+        self._snapshot: Optional[ProcessSnapshot] = None
+        self.tree = ProcessTree()
+        self.cpu = CpuSampler()
+        self._lock = threading.Lock()
+        self.scan_count = 0
+        self.last_scan_duration = 0.0
+
+    def get(self, max_age: Optional[float] = None) -> ProcessSnapshot:
+        """
+        Obtiene la instantánea vigente, recorriendo la tabla solo si está vencida
+
+        Args:
+            max_age: Antigüedad máxima aceptada (por defecto, el intervalo del servicio)
+
+        Returns:
+            ProcessSnapshot compartida
+        """
+        limite = self.interval if max_age is None else max_age
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.age <= limite:
+            return snapshot
+
+        with self._lock:
+            # Otro hilo pudo refrescar mientras se esperaba el lock
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.age <= limite:
+                return snapshot
+            return self._scan()
+
+    def refresh(self) -> ProcessSnapshot:
+        """Fuerza un recorrido nuevo"""
+        with self._lock:
+            return self._scan()
+
+    def _scan(self) -> ProcessSnapshot:
+        inicio = time.monotonic()
+        snapshot = ProcessSnapshot(inicio)
+
+        for proc in self._process_iter(SNAPSHOT_ATTRS):
+            try:
+                info = proc.info
+                cpu_times = info.get('cpu_times')
+                memory_info = info.get('memory_info')
+                snapshot._append(
+                    info['pid'],
+                    info.get('ppid') or 0,
+                    info.get('name') or "",
+                    0.0,
+                    (cpu_times.user + cpu_times.system) if cpu_times else 0.0,
+                    memory_info.rss if memory_info else 0,
+                    info.get('create_time') or 0.0,
+                )
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                continue
+
+        self.tree.update(snapshot)
+        self.cpu.update(snapshot)
+        self.scan_count += 1
+        self.last_scan_duration = time.monotonic() - inicio
+        self._snapshot = snapshot
+        return snapshot
+
+
+def open_process(pid: int, snapshot: Optional[ProcessSnapshot] = None) -> Optional[psutil.Process]:
+    """
+    Abre un psutil.Process verificando que el PID no haya sido reutilizado
+    desde que se tomó la instantánea (compara create_time).
+    """
+    try:
+        proc = psutil.Process(pid)
+        if snapshot is not None:
+            esperado = snapshot.get_create_time(pid)
+            if esperado and abs(proc.create_time() - esperado) > 0.01:
+                return None
+        return proc
+    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+        return None
+
+
+# Servicio global compartido por todos los monitores del proceso actual
+_snapshot_service = None
+_snapshot_service_lock = threading.Lock()
+
+
+def get_snapshot_service() -> ProcessSnapshotService:
+    """Obtiene o crea el servicio global de instantáneas"""
+    global _snapshot_service
+    if _snapshot_service is None:
+        with _snapshot_service_lock:
+            if _snapshot_service is None:
+                _snapshot_service = ProcessSnapshotService()
+    return _snapshot_service
+
+
+def get_snapshot(max_age: Optional[float] = None) -> ProcessSnapshot:
+    """Atajo para obtener la instantánea vigente del servicio global"""
+    return get_snapshot_service().get(max_age)
+
+
+def get_process_tree() -> ProcessTree:
+    """Índice padre/hijos del servicio global (sincronizado con cada recorrido)"""
+    return get_snapshot_service().tree
+
+
+def get_cpu_sampler() -> CpuSampler:
+    """Ventanas de uso de CPU por proceso del servicio global"""
+    return get_snapshot_service().cpu
+
+
+if __name__ == "__main__":
+    servicio = get_snapshot_service()
+    instantanea = servicio.refresh()
+    print(f"Procesos en la instantánea: {len(instantanea)}")
+    print(f"Duración del recorrido: {servicio.last_scan_duration * 1000:.1f} ms")
+    for _ in range(5):
+        servicio.get()
+    print(f"Recorridos realizados tras 6 consultas: {servicio.scan_count}")
+    print(f"Procesos indexados en el árbol: {len(servicio.tree)}")
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+program_inventory.py - Inventario de programas instalados leído del registro
+Enumera las claves Uninstall (64 bits, 32 bits y usuario) en el mismo proceso a
+través de registry_access, en lugar de un `reg query` por subclave, y produce
+registros con nombre, versión, editor, fecha de instalación y tamaño.
+"""
+
+import json
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from registry_access import RegistryReader, get_registry
+
+# (origen, clave) en el orden en que se leen
+UNINSTALL_KEYS = (
+    ("HKLM", r"HKLM\SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall"),
+    ("HKLM-32", r"HKLM\SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall"),
+    ("HKCU", r"HKCU\SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall"),
+)
+
+
+@dataclass
+class InstalledProgram:
+    """Programa instalado (una subclave Uninstall con DisplayName)"""
+    name: str
+    version: Optional[str] = None
+    publisher: Optional[str] = None
+    install_date: Optional[str] = None   # ISO (AAAA-MM-DD) cuando el dato lo permite
+    size_bytes: Optional[int] = None
+    source: str = ""
+    key: str = ""
+
+    def as_dict(self) -> Dict[str, object]:
+        return asdict(self)
+
+
+def _text(valores: Dict[str, tuple], nombre: str) -> Optional[str]:
+    dato = valores.get(nombre, (None, 0))[0]
+    if dato is None:
+        return None
+    texto = str(dato).strip()
+    return texto or None
+
+
+def parse_install_date(raw: Optional[str]) -> Optional[str]:
+    """InstallDate suele ser AAAAMMDD; otros formatos se conservan tal cual"""
+    if not raw:
+        return None
+    if len(raw) == 8 and raw.isdigit():
+        try:
+            return datetime.strptime(raw, "%Y%m%d").strftime("%Y-%m-%d")
+        except ValueError:
+            return raw
+    return raw
+
+
+def _size_bytes(valores: Dict[str, tuple]) -> Optional[int]:
+    # EstimatedSize es un DWORD en KB
+    dato = valores.get("EstimatedSize", (None, 0))[0]
+    try:
+        return int(dato) * 1024 if dato is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def collect_installed_programs(registry: Optional[RegistryReader] = None) -> List[InstalledProgram]:
+    """
+    Lee las tres claves Uninstall. Se omiten las subclaves sin DisplayName y los
+    duplicados (mismo nombre, versión y editor en más de una vista).
+
+    Returns:
+        Programas ordenados por nombre (sin distinguir mayúsculas)
+    """
+    registro = registry or get_registry()
+    programas: List[InstalledProgram] = []
+    vistos = set()
+    for origen, ruta in UNINSTALL_KEYS:
+        for subclave in registro.subkeys(ruta):
+            valores = registro.values(f"{ruta}\\{subclave}")
+            nombre = _text(valores, "DisplayName")
+            if not nombre:
+                continue
+            programa = InstalledProgram(
+                name=nombre,
+                version=_text(valores, "DisplayVersion"),
+                publisher=_text(valores, "Publisher"),
+                install_date=parse_install_date(_text(valores, "InstallDate")),
+                size_bytes=_size_bytes(valores),
+                source=origen,
+                key=subclave,
+            )
+            identidad = (nombre.lower(), programa.version, programa.publisher)
+            if identidad in vistos:
+                continue
+            vistos.add(identidad)
+            programas.append(programa)
+    programas.sort(key=lambda programa: programa.name.lower())
+    return programas
+
+
+def write_inventory(programs: List[InstalledProgram], path: str) -> None:
+    """Guarda el inventario en JSON"""
+    datos = {
+        "generated": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "count": len(programs),
+        "programs": [programa.as_dict() for programa in programs],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(datos, f, indent=2, ensure_ascii=False)
+
+
+def load_inventory(path: str) -> List[InstalledProgram]:
+    """Lee un inventario guardado con write_inventory"""
+    with open(path, "r", encoding="utf-8") as f:
+        datos = json.load(f)
+    return [InstalledProgram(**programa) for programa in datos.get("programs", [])]
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    inicio = time.perf_counter()
+    inventario = collect_installed_programs()
+    print(f"{len(inventario)} programas en {(time.perf_counter() - inicio) * 1000:.1f} ms")
+    if len(sys.argv) > 1:
+        write_inventory(inventario, sys.argv[1])
+    for programa in inventario[:20]:
+        print(f"  {programa.name} {programa.version or ''} ({programa.publisher or '-'})")
@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+"""
+reg_diff.py - Restauración diferencial de archivos .reg
+Lee un .reg exportado (regedit 5.00 en UTF-16 o REGEDIT4), lo compara con el
+registro actual a través de registry_access y produce el conjunto mínimo de
+cambios que `reg import` realmente haría: claves que faltan y valores distintos
+o inexistentes (y las eliminaciones explícitas "[-clave]" / "valor"=-).
+Aplicar solo ese conjunto evita reescribir cientos de miles de valores iguales
+y deja un informe legible de lo que se revirtió.
+
+Comparar y aplicar aceptan un plazo (time.monotonic()): al vencer se detienen
+entre dos operaciones y marcan el ChangeSet como timed_out, de modo que el hilo
+nunca sigue escribiendo después de que la tarea se dio por vencida.
+"""
+
+import codecs
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from registry_access import (
+    REG_BINARY, REG_DWORD, REG_EXPAND_SZ, REG_MULTI_SZ, REG_NONE, REG_QWORD, REG_SZ,
+    RegistryReader,
+)
+
+# Tipos de cambio
+CHANGE_CREATE_KEY = "create_key"
+CHANGE_SET_VALUE = "set_value"
+CHANGE_DELETE_VALUE = "delete_value"
+CHANGE_DELETE_KEY = "delete_key"
+
+_HEADERS = ("Windows Registry Editor Version 5.00", "REGEDIT4")
+_REPORT_VALUE_CHARS = 60
+
+
+class RegKey:
+    """Bloque [clave] de un .reg"""
+
+    __slots__ = ('path', 'delete', 'values', 'deleted_values')
+
+    def __init__(self, path: str, delete: bool = False):
+        self.path = path
+        self.delete = delete
+        self.values: Dict[str, Tuple[object, int]] = {}
+        self.deleted_values: List[str] = []
+
+
+class RegChange:
+    """Un cambio a aplicar; old es el dato actual (None si no existe)"""
+
+    __slots__ = ('kind', 'key', 'name', 'data', 'value_type', 'old')
+
+    def __init__(self, kind: str, key: str, name: Optional[str] = None, data: object = None,
+                 value_type: int = REG_NONE, old: object = None):
+        self.kind = kind
+        self.key = key
+        self.name = name
+        self.data = data
+        self.value_type = value_type
+        self.old = old
+
+    def describe(self) -> str:
+        nombre = "@" if self.name == "" else f'"{self.name}"'
+        if self.kind == CHANGE_CREATE_KEY:
+            return f"+ [{self.key}]"
+        if self.kind == CHANGE_DELETE_KEY:
+            return f"- [{self.key}]"
+        if self.kind == CHANGE_DELETE_VALUE:
+            return f"- [{self.key}] {nombre}"
+        if self.old is None:
+            return f"+ [{self.key}] {nombre} = {_short(self.data)}"
+        return f"~ [{self.key}] {nombre}: {_short(self.old)} -> {_short(self.data)}"
+
+
+def _short(dato: object) -> str:
+    texto = dato.hex() if isinstance(dato, (bytes, bytearray)) else repr(dato)
+    return texto if len(texto) <= _REPORT_VALUE_CHARS else texto[:_REPORT_VALUE_CHARS - 3] + "..."
+
+
+class ChangeSet:
+    """Cambios de un archivo .reg contra el registro actual"""
+
+    def __init__(self, source: str = ""):
+        self.source = source
+        self.changes: List[RegChange] = []
+        self.keys_checked = 0
+        self.values_checked = 0
+        self.applied = 0
+        self.failed: List[Tuple[RegChange, str]] = []
+        self.timed_out = False
+
+    def __len__(self) -> int:
+        return len(self.changes)
+
+    def counts(self) -> Dict[str, int]:
+        conteo: Dict[str, int] = {}
+        for cambio in self.changes:
+            conteo[cambio.kind] = conteo.get(cambio.kind, 0) + 1
+        return conteo
+
+    def format_report(self, limit: int = 200) -> str:
+        """Informe legible: resumen y hasta `limit` cambios"""
+        lineas = [f"{self.source}: {len(self.changes)} cambios "
+                  f"({self.values_checked} valores en {self.keys_checked} claves revisados)"]
+        for tipo, cantidad in sorted(self.counts().items()):
+            lineas.append(f"  {tipo}: {cantidad}")
+        for cambio in self.changes[:limit]:
+            lineas.append(f"  {cambio.describe()}")
+        if len(self.changes) > limit:
+            lineas.append(f"  ... y {len(self.changes) - limit} cambios más")
+        for cambio, error in self.failed:
+            lineas.append(f"  ERROR {cambio.describe()}: {error}")
+        if self.timed_out:
+            lineas.append(f"  PLAZO VENCIDO: {self.applied} cambios aplicados, el resto queda pendiente")
+        return "\n".join(lineas)
+
+
+# ============================================================================
+# LECTURA DEL .REG
+# ============================================================================
+
+def _open_text(path: str):
+    with open(path, "rb") as f:
+        inicio = f.read(2)
+    if inicio in (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE):
+        return open(path, "r", encoding="utf-16", newline=None)
+    # REGEDIT4: página de códigos ANSI
+    return open(path, "r", encoding="cp1252", errors="replace", newline=None)
+
+
+def _logical_lines(f) -> Iterator[str]:
+    """Une las líneas continuadas con '\\' (datos hex largos)"""
+    pendiente = ""
+    for linea in f:
+        linea = linea.rstrip("\r\n")
+        if pendiente:
+            linea = pendiente + linea.lstrip()
+            pendiente = ""
+        if linea.endswith("\\"):
+            pendiente = linea[:-1]
+            continue
+        yield linea
+    if pendiente:
+        yield pendiente
+
+
+def _read_quoted(texto: str, inicio: int) -> Tuple[str, int]:
+    """Lee "..." con escapes \\\\ y \\" desde texto[inicio] == '"'; retorna (cadena, índice siguiente)"""
+    fin = texto.find('"', inicio + 1)
+    if fin >= 0 and texto.find("\\", inicio + 1, fin) < 0:
+        # Caso común: sin escapes
+        return texto[inicio + 1:fin], fin + 1
+    partes = []
+    i = inicio + 1
+    while i < len(texto):
+        c = texto[i]
+        if c == "\\" and i + 1 < len(texto):
+            partes.append(texto[i + 1])
+            i += 2
+            continue
+        if c == '"':
+            return "".join(partes), i + 1
+        partes.append(c)
+        i += 1
+    raise ValueError(f"Cadena sin cerrar: {texto[:80]}")
+
+
+def _hex_bytes(texto: str) -> bytes:
+    # bytes.fromhex ignora los espacios; las comas se quitan antes
+    return bytes.fromhex(texto.replace(",", "").replace("\t", ""))
+
+
+def _utf16_text(datos: bytes) -> str:
+    return datos.decode("utf-16-le", errors="replace")
+
+
+def parse_value(texto: str) -> Optional[Tuple[object, int]]:
+    """Dato de un valor .reg -> (dato, tipo) con los mismos tipos que retorna winreg; None = eliminar"""
+    if texto == "-":
+        return None
+    if texto.startswith('"'):
+        cadena, _ = _read_quoted(texto, 0)
+        return cadena, REG_SZ
+    if texto.startswith("dword:"):
+        return int(texto[6:], 16), REG_DWORD
+    if texto.startswith("hex:"):
+        return _hex_bytes(texto[4:]), REG_BINARY
+    if texto.startswith("hex("):
+        cierre = texto.index(")")
+        tipo = int(texto[4:cierre], 16)
+        datos = _hex_bytes(texto[cierre + 2:])
+        if tipo in (REG_SZ, REG_EXPAND_SZ):
+            return _utf16_text(datos).split("\0", 1)[0], tipo
+        if tipo == REG_MULTI_SZ:
+            cadenas = _utf16_text(datos).rstrip("\0").split("\0")
+            return ([] if cadenas == [""] else cadenas), tipo
+        if tipo == REG_DWORD and len(datos) == 4:
+            return int.from_bytes(datos, "little"), tipo
+        if tipo == REG_QWORD and len(datos) == 8:
+            return int.from_bytes(datos, "little"), tipo
+        return datos, tipo
+    raise ValueError(f"Formato de valor desconocido: {texto[:40]}")
+
+
+def parse_reg_file(path: str) -> Iterator[RegKey]:
+    """Recorre los bloques de un .reg sin cargar el archivo completo"""
+    actual: Optional[RegKey] = None
+    with _open_text(path) as f:
+        for numero, linea in enumerate(_logical_lines(f), 1):
+            linea = linea.lstrip("\ufeff")
+            limpia = linea.strip()
+            if not limpia or limpia.startswith(";") or limpia in _HEADERS:
+                continue
+            if limpia.startswith("[") and limpia.endswith("]"):
+                if actual is not None:
+                    yield actual
+                ruta = limpia[1:-1]
+                actual = RegKey(ruta[1:], delete=True) if ruta.startswith("-") else RegKey(ruta)
+                continue
+            if actual is None:
+                continue
+            try:
+                if limpia.startswith("@="):
+                    nombre, resto = "", limpia[2:]
+                elif limpia.startswith('"'):
+                    nombre, fin = _read_quoted(limpia, 0)
+                    if limpia[fin:fin + 1] != "=":
+                        raise ValueError("falta '='")
+                    resto = limpia[fin + 1:]
+                else:
+                    raise ValueError("línea no reconocida")
+                valor = parse_value(resto)
+            except ValueError as e:
+                raise ValueError(f"{path}:{numero}: {e}") from None
+            if valor is None:
+                actual.deleted_values.append(nombre)
+            else:
+                actual.values[nombre] = valor
+    if actual is not None:
+        yield actual
+
+
+# ============================================================================
+# COMPARACIÓN Y APLICACIÓN
+# ============================================================================
+
+def _normalized(dato: object, tipo: int) -> Tuple[object, int]:
+    """winreg retorna None para datos binarios vacíos y listas para MULTI_SZ"""
+    if dato is None and tipo not in (REG_SZ, REG_EXPAND_SZ, REG_DWORD, REG_QWORD, REG_MULTI_SZ):
+        return b"", tipo
+    if tipo in (REG_SZ, REG_EXPAND_SZ) and isinstance(dato, str):
+        return dato.split("\0", 1)[0], tipo
+    if tipo == REG_MULTI_SZ and isinstance(dato, (list, tuple)):
+        return [cadena for cadena in dato], tipo
+    return dato, tipo
+
+
+def _expired(deadline: Optional[float]) -> bool:
+    return deadline is not None and time.monotonic() >= deadline
+
+
+def diff_reg_file(path: str, registry: RegistryReader, deadline: Optional[float] = None) -> ChangeSet:
+    """Cambios mínimos para que el registro quede como indica el .reg (incompletos si vence el plazo)"""
+    cambios = ChangeSet(path)
+    for bloque in parse_reg_file(path):
+        if _expired(deadline):
+            cambios.timed_out = True
+            break
+        cambios.keys_checked += 1
+        if bloque.delete:
+            if registry.exists(bloque.path):
+                cambios.changes.append(RegChange(CHANGE_DELETE_KEY, bloque.path))
+            continue
+
+        existe = registry.exists(bloque.path)
+        actuales = registry.values(bloque.path) if existe else {}
+        por_nombre = {nombre.lower(): (nombre, valor) for nombre, valor in actuales.items()}
+        if not existe:
+            cambios.changes.append(RegChange(CHANGE_CREATE_KEY, bloque.path))
+
+        for nombre, (dato, tipo) in bloque.values.items():
+            cambios.values_checked += 1
+            previo = por_nombre.get(nombre.lower())
+            if previo is not None and _normalized(*previo[1]) == _normalized(dato, tipo):
+                continue
+            cambios.changes.append(RegChange(CHANGE_SET_VALUE, bloque.path, nombre, dato, tipo,
+                                             previo[1][0] if previo is not None else None))
+        for nombre in bloque.deleted_values:
+            previo = por_nombre.get(nombre.lower())
+            if previo is not None:
+                cambios.changes.append(RegChange(CHANGE_DELETE_VALUE, bloque.path, previo[0],
+                                                 old=previo[1][0]))
+    return cambios
+
+
+def apply_changes(changes: ChangeSet, registry: RegistryReader, deadline: Optional[float] = None) -> ChangeSet:
+    """
+    Aplica los cambios en orden; los que fallan (E/S o datos inválidos) quedan en
+    changes.failed. Un ChangeSet incompleto (timed_out) no se aplica.
+    """
+    if changes.timed_out:
+        return changes
+    for cambio in changes.changes:
+        if _expired(deadline):
+            changes.timed_out = True
+            break
+        try:
+            if cambio.kind == CHANGE_CREATE_KEY:
+                registry.create_key(cambio.key)
+            elif cambio.kind == CHANGE_SET_VALUE:
+                registry.set_value(cambio.key, cambio.name, cambio.data, cambio.value_type)
+            elif cambio.kind == CHANGE_DELETE_VALUE:
+                registry.delete_value(cambio.key, cambio.name)
+            elif cambio.kind == CHANGE_DELETE_KEY:
+                registry.delete_tree(cambio.key)
+            changes.applied += 1
+        except (OSError, TypeError, ValueError) as e:
+            # TypeError/ValueError: dato mal tipado en el .reg (p. ej. hex(4) que no mide 4 bytes)
+            changes.failed.append((cambio, str(e)))
+    return changes
+
+
+def restore_reg_file(path: str, registry: RegistryReader, deadline: Optional[float] = None) -> ChangeSet:
+    """Atajo: compara y aplica solo las diferencias dentro del plazo"""
+    return apply_changes(diff_reg_file(path, registry, deadline), registry, deadline)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    from registry_access import get_registry
+
+    if len(sys.argv) < 2:
+        print("Uso: reg_diff.py <archivo.reg> [--apply]")
+        sys.exit(1)
+    inicio = time.perf_counter()
+    resultado = diff_reg_file(sys.argv[1], get_registry())
+    if "--apply" in sys.argv:
+        apply_changes(resultado, get_registry())
+    print(resultado.format_report())
+    print(f"{time.perf_counter() - inicio:.2f} s")
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+registry_access.py - Acceso al registro de Windows sin procesos externos
+Interfaz mínima (subclaves y valores de una ruta "HKLM\\...", y escritura de
+claves y valores) con un backend de producción sobre winreg y uno respaldado por
+un diccionario para pruebas sin Windows. Reemplaza los `reg query` / `reg import`
+por clave, que lanzan un proceso cada uno.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Tipos de valor (mismos números que winreg)
+REG_NONE = 0
+REG_SZ = 1
+REG_EXPAND_SZ = 2
+REG_BINARY = 3
+REG_DWORD = 4
+REG_MULTI_SZ = 7
+REG_QWORD = 11
+
+# Abreviaturas y nombres completos de las raíces
+HIVE_ALIASES = {
+    "HKLM": "HKEY_LOCAL_MACHINE",
+    "HKCU": "HKEY_CURRENT_USER",
+    "HKCR": "HKEY_CLASSES_ROOT",
+    "HKU": "HKEY_USERS",
+    "HKCC": "HKEY_CURRENT_CONFIG",
+}
+
+# Valor: (dato, tipo)
+RegistryValue = Tuple[object, int]
+
+
+def split_key(path: str) -> Tuple[str, str]:
+    """'HKLM\\SOFTWARE\\X' -> ('HKEY_LOCAL_MACHINE', 'SOFTWARE\\X')"""
+    raiz, _, resto = path.strip("\\").partition("\\")
+    raiz = raiz.upper()
+    return HIVE_ALIASES.get(raiz, raiz), resto
+
+
+def normalize_key(path: str) -> str:
+    """Forma canónica de una ruta (raíz completa, sin barras sobrantes, en minúsculas)"""
+    raiz, resto = split_key(path)
+    partes = [parte for parte in resto.split("\\") if parte]
+    return "\\".join([raiz] + partes).lower()
+
+
+class RegistryReader:
+    """Interfaz de lectura del registro. Una clave inexistente no es un error."""
+
+    def exists(self, path: str) -> bool:
+        raise NotImplementedError
+
+    def subkeys(self, path: str) -> List[str]:
+        """Nombres de las subclaves directas ([] si la clave no existe)"""
+        raise NotImplementedError
+
+    def values(self, path: str) -> Dict[str, RegistryValue]:
+        """Valores de la clave: {nombre: (dato, tipo)} ({} si no existe)"""
+        raise NotImplementedError
+
+    # Escritura (lanzan OSError si no se puede)
+
+    def create_key(self, path: str) -> None:
+        """Crea la clave y sus intermedias (sin error si ya existe)"""
+        raise NotImplementedError
+
+    def set_value(self, path: str, name: str, data: object, value_type: int) -> None:
+        raise NotImplementedError
+
+    def delete_value(self, path: str, name: str) -> None:
+        raise NotImplementedError
+
+    def delete_tree(self, path: str) -> None:
+        """Elimina la clave con todas sus subclaves"""
+        raise NotImplementedError
+
+
+class WinregRegistry(RegistryReader):
+    """
+    Backend de producción. Lee siempre la vista de 64 bits, de modo que las rutas
+    con WOW6432Node apuntan a la vista de 32 bits de forma explícita.
+    """
+
+    def __init__(self):
+        import winreg
+        self._winreg = winreg
+        self._access = winreg.KEY_READ | getattr(winreg, "KEY_WOW64_64KEY", 0)
+
+    def _hive(self, path: str):
+        raiz, resto = split_key(path)
+        hive = getattr(self._winreg, raiz, None)
+        if hive is None:
+            raise FileNotFoundError(path)
+        return hive, resto
+
+    def _open(self, path: str, access: Optional[int] = None):
+        hive, resto = self._hive(path)
+        return self._winreg.OpenKey(hive, resto, 0, access if access is not None else self._access)
+
+    def _write_access(self) -> int:
+        return self._winreg.KEY_ALL_ACCESS | getattr(self._winreg, "KEY_WOW64_64KEY", 0)
+
+    def exists(self, path: str) -> bool:
+        try:
+            self._open(path).Close()
+            return True
+        except OSError:
+            return False
+
+    def subkeys(self, path: str) -> List[str]:
+        try:
+            clave = self._open(path)
+        except OSError:
+            return []
+        nombres = []
+        try:
+            cantidad = self._winreg.QueryInfoKey(clave)[0]
+            for indice in range(cantidad):
+                try:
+                    nombres.append(self._winreg.EnumKey(clave, indice))
+                except OSError:
+                    break
+        finally:
+            clave.Close()
+        return nombres
+
+    def values(self, path: str) -> Dict[str, RegistryValue]:
+        try:
+            clave = self._open(path)
+        except OSError:
+            return {}
+        valores = {}
+        try:
+            cantidad = self._winreg.QueryInfoKey(clave)[1]
+            for indice in range(cantidad):
+                try:
+                    nombre, dato, tipo = self._winreg.EnumValue(clave, indice)
+                except OSError:
+                    break
+                valores[nombre] = (dato, tipo)
+        finally:
+            clave.Close()
+        return valores
+
+    def create_key(self, path: str) -> None:
+        hive, resto = self._hive(path)
+        self._winreg.CreateKeyEx(hive, resto, 0, self._write_access()).Close()
+
+    def set_value(self, path: str, name: str, data: object, value_type: int) -> None:
+        hive, resto = self._hive(path)
+        clave = self._winreg.CreateKeyEx(hive, resto, 0, self._write_access())
+        try:
+            self._winreg.SetValueEx(clave, name, 0, value_type, data)
+        finally:
+            clave.Close()
+
+    def delete_value(self, path: str, name: str) -> None:
+        clave = self._open(path, self._write_access())
+        try:
+            self._winreg.DeleteValue(clave, name)
+        finally:
+            clave.Close()
+
+    def delete_tree(self, path: str) -> None:
+        # DeleteKey no borra claves con hijos: primero las subclaves
+        for subclave in self.subkeys(path):
+            self.delete_tree(f"{path}\\{subclave}")
+        padre, _, nombre = path.rstrip("\\").rpartition("\\")
+        clave = self._open(padre, self._write_access())
+        try:
+            self._winreg.DeleteKey(clave, nombre)
+        finally:
+            clave.Close()
+
+
+class DictRegistry(RegistryReader):
+    """
+    Registro en memoria para pruebas: {ruta: {nombre: dato o (dato, tipo)}}.
+    Las claves intermedias existen implícitamente; las rutas no distinguen mayúsculas.
+    """
+
+    def __init__(self, keys: Optional[Dict[str, Dict[str, object]]] = None):
+        self._keys: Dict[str, Dict[str, RegistryValue]] = {}
+        self._children: Dict[str, Dict[str, str]] = {}
+        for ruta, valores in (keys or {}).items():
+            self.set_key(ruta, valores)
+
+    @staticmethod
+    def _infer(dato: object) -> RegistryValue:
+        if isinstance(dato, tuple):
+            return dato
+        if isinstance(dato, int):
+            return int(dato), REG_DWORD if 0 <= int(dato) <= 0xFFFFFFFF else REG_QWORD
+        if isinstance(dato, (bytes, bytearray)):
+            return bytes(dato), REG_BINARY
+        if isinstance(dato, list):
+            return list(dato), REG_MULTI_SZ
+        return dato, REG_SZ
+
+    def set_key(self, path: str, values: Optional[Dict[str, object]] = None) -> None:
+        """Crea la clave (y sus intermedias) y agrega o reemplaza valores"""
+        raiz, resto = split_key(path)
+        partes = [raiz] + [parte for parte in resto.split("\\") if parte]
+        for fin in range(1, len(partes) + 1):
+            clave = "\\".join(partes[:fin]).lower()
+            self._keys.setdefault(clave, {})
+            self._children.setdefault(clave, {})
+            if fin > 1:
+                padre = "\\".join(partes[:fin - 1]).lower()
+                self._children[padre].setdefault(partes[fin - 1].lower(), partes[fin - 1])
+        clave = "\\".join(partes).lower()
+        for nombre, dato in (values or {}).items():
+            self._keys[clave][nombre] = self._infer(dato)
+
+    def delete_key(self, path: str) -> None:
+        """Elimina la clave y todo su árbol"""
+        clave = normalize_key(path)
+        for hija in list(self._children.get(clave, {})):
+            self.delete_key(clave + "\\" + hija)
+        self._keys.pop(clave, None)
+        self._children.pop(clave, None)
+        padre, _, nombre = clave.rpartition("\\")
+        self._children.get(padre, {}).pop(nombre, None)
+
+    def exists(self, path: str) -> bool:
+        return normalize_key(path) in self._keys
+
+    def subkeys(self, path: str) -> List[str]:
+        return list(self._children.get(normalize_key(path), {}).values())
+
+    def values(self, path: str) -> Dict[str, RegistryValue]:
+        return dict(self._keys.get(normalize_key(path), {}))
+
+    def create_key(self, path: str) -> None:
+        self.set_key(path)
+
+    def set_value(self, path: str, name: str, data: object, value_type: int) -> None:
+        self.set_key(path, {name: (data, value_type)})
+
+    def delete_value(self, path: str, name: str) -> None:
+        valores = self._keys.get(normalize_key(path))
+        if valores is None or name not in valores:
+            raise FileNotFoundError(f"{path}\\{name}")
+        del valores[name]
+
+    def delete_tree(self, path: str) -> None:
+        if not self.exists(path):
+            raise FileNotFoundError(path)
+        self.delete_key(path)
+
+    def paths(self) -> Iterable[str]:
+        """Todas las claves (en minúsculas)"""
+        return list(self._keys)
+
+
+_default_registry: Optional[RegistryReader] = None
+
+
+def get_registry() -> RegistryReader:
+    """Backend winreg compartido (falla con ImportError fuera de Windows)"""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = WinregRegistry()
+    return _default_registry
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+scan_index.py - Índice persistente de carpetas para recorridos incrementales
+Guarda en SQLite, por carpeta, su mtime, el tamaño y la cantidad de archivos
+directos, los nombres de sus subcarpetas y si quedó "limpia" (ningún archivo
+coincide con las reglas). En el recorrido siguiente, una carpeta cuyo mtime no
+cambió (no se crearon, borraron ni renombraron entradas) no se vuelve a listar:
+se reutilizan sus totales y solo se verifica el mtime de sus subcarpetas.
+
+Limitación conocida: sobrescribir un archivo en su lugar no cambia el mtime de
+la carpeta, por lo que su nuevo tamaño se detecta cuando la carpeta cambie.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+INDEX_FORMAT_VERSION = 1
+
+# Separador de nombres de subcarpetas (no puede aparecer en un nombre de archivo)
+_SEPARATOR = "\0"
+
+
+class DirRecord:
+    """Datos guardados de una carpeta"""
+
+    __slots__ = ('mtime_ns', 'size', 'files', 'subdirs', 'clean')
+
+    def __init__(self, mtime_ns: int, size: int, files: int, subdirs: List[str], clean: bool):
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.files = files
+        self.subdirs = subdirs
+        self.clean = clean
+
+
+class ScanIndex:
+    """
+    Índice de carpetas en memoria respaldado por un archivo SQLite.
+    Se carga completo al abrir y se escribe en una sola transacción con save().
+
+    Args:
+        path: Archivo SQLite (None = solo en memoria, útil para pruebas)
+        namespace: Separa índices de distintos recorridos en el mismo archivo
+            (p. ej. medición de cachés y reglas del perfil)
+    """
+
+    def __init__(self, path: Optional[str] = None, namespace: str = "scan"):
+        self.path = path
+        self.namespace = namespace
+        self._records: Dict[str, DirRecord] = {}
+        self._dirty: Dict[str, Optional[DirRecord]] = {}
+        self._seen: Set[str] = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(path):
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def _connect(self) -> sqlite3.Connection:
+        conexion = sqlite3.connect(self.path)
+        conexion.execute(
+            "CREATE TABLE IF NOT EXISTS dirs ("
+            " namespace TEXT NOT NULL, path TEXT NOT NULL, mtime_ns INTEGER NOT NULL,"
+            " size INTEGER NOT NULL, files INTEGER NOT NULL, subdirs TEXT NOT NULL,"
+            " clean INTEGER NOT NULL, PRIMARY KEY (namespace, path))"
+        )
+        conexion.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        return conexion
+
+    def _load(self) -> None:
+        try:
+            conexion = self._connect()
+        except sqlite3.Error:
+            return
+        try:
+            fila = conexion.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if fila is not None and fila[0] != str(INDEX_FORMAT_VERSION):
+                return
+            for ruta, mtime_ns, tamano, archivos, subcarpetas, limpia in conexion.execute(
+                "SELECT path, mtime_ns, size, files, subdirs, clean FROM dirs WHERE namespace = ?",
+                (self.namespace,),
+            ):
+                self._records[ruta] = DirRecord(
+                    mtime_ns, tamano, archivos,
+                    subcarpetas.split(_SEPARATOR) if subcarpetas else [], bool(limpia),
+                )
+        except sqlite3.Error:
+            # Índice dañado: se reconstruye en el próximo recorrido
+            self._records.clear()
+        finally:
+            conexion.close()
+
+    def lookup(self, path: str, mtime_ns: int) -> Optional[DirRecord]:
+        """Registro de la carpeta si su mtime no cambió desde que se guardó"""
+        with self._lock:
+            self._seen.add(path)
+            registro = self._records.get(path)
+            if registro is not None and registro.mtime_ns == mtime_ns:
+                self.hits += 1
+                return registro
+            self.misses += 1
+            return None
+
+    def put(self, path: str, mtime_ns: int, size: int, files: int,
+            subdirs: Iterable[str], clean: bool = True) -> None:
+        registro = DirRecord(mtime_ns, size, files, list(subdirs), clean)
+        with self._lock:
+            self._seen.add(path)
+            self._records[path] = registro
+            self._dirty[path] = registro
+
+    def forget_unseen(self, roots: Iterable[str]) -> int:
+        """Descarta carpetas bajo estas raíces que ya no se visitaron (borradas)"""
+        raices = [os.path.normcase(raiz).rstrip(os.sep) + os.sep for raiz in roots]
+        with self._lock:
+            borrar = [
+                ruta for ruta in self._records
+                if ruta not in self._seen and any(os.path.normcase(ruta).startswith(r) for r in raices)
+            ]
+            for ruta in borrar:
+                del self._records[ruta]
+                self._dirty[ruta] = None
+            return len(borrar)
+
+    def save(self) -> None:
+        """Escribe los cambios pendientes en una sola transacción"""
+        if not self.path or not self._dirty:
+            return
+        with self._lock:
+            pendientes = self._dirty
+            self._dirty = {}
+        try:
+            conexion = self._connect()
+        except sqlite3.Error as e:
+            print(f"Error abriendo índice de carpetas: {e}")
+            return
+        try:
+            with conexion:
+                conexion.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)",
+                                 (str(INDEX_FORMAT_VERSION),))
+                conexion.execute("INSERT OR REPLACE INTO meta VALUES ('saved', ?)", (str(time.time()),))
+                conexion.executemany(
+                    "DELETE FROM dirs WHERE namespace = ? AND path = ?",
+                    [(self.namespace, ruta) for ruta, registro in pendientes.items() if registro is None],
+                )
+                conexion.executemany(
+                    "INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (self.namespace, ruta, registro.mtime_ns, registro.size, registro.files,
+                         _SEPARATOR.join(registro.subdirs), int(registro.clean))
+                        for ruta, registro in pendientes.items() if registro is not None
+                    ],
+                )
+        except sqlite3.Error as e:
+            print(f"Error guardando índice de carpetas: {e}")
+        finally:
+            conexion.close()
+
+    def stats(self) -> Tuple[int, int]:
+        """(carpetas reutilizadas, carpetas listadas) desde la apertura"""
+        return self.hits, self.misses
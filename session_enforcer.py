@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+session_enforcer.py - Aplicación incremental de políticas durante la partida
+Las prioridades y afinidades del modo juego se aplican una vez al activarse;
+lo que arranca después (anti-cheat, lanzadores, compiladores de shaders o una
+app de fondo que se reinicia) quedaría con los valores por defecto. Este módulo
+consume los inicios de procesos de process_events.py y aplica la política que
+corresponda solo a los PIDs nuevos, con un presupuesto acotado por tick para
+que una ráfaga de procesos no le robe CPU al juego.
+"""
+
+import collections
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Optional
+
+import psutil
+
+from foreground_events import LatencyTracker
+from instrumentation import profiler
+from process_events import ProcessStart, ProcessStartSource
+
+# Políticas que puede devolver el clasificador (None = no tocar el proceso)
+POLICY_GAME = "game"
+POLICY_GAME_CHILD = "game_child"
+POLICY_BACKGROUND = "background"
+
+# Presupuesto por tick: como máximo N procesos y T milisegundos; el resto espera al siguiente
+MAX_PER_TICK = 32
+TICK_BUDGET_MS = 15.0
+# Pausa entre ticks mientras quedan pendientes
+TICK_INTERVAL = 0.1
+# Espera máxima por un inicio cuando no hay pendientes (solo para revisar stop())
+IDLE_WAIT = 1.0
+
+
+@dataclass
+class EnforcerMetrics:
+    """Contadores del enforcer durante una sesión"""
+    ticks: int = 0
+    seen: int = 0
+    applied: Dict[str, int] = field(default_factory=dict)
+    skipped: int = 0
+    failed: int = 0
+    deferred: int = 0
+    max_backlog: int = 0
+    busy_ns: int = 0
+    latency: LatencyTracker = field(default_factory=LatencyTracker)
+
+    def summary(self) -> dict:
+        return {
+            'ticks': self.ticks,
+            'seen': self.seen,
+            'applied': dict(self.applied),
+            'skipped': self.skipped,
+            'failed': self.failed,
+            'deferred': self.deferred,
+            'max_backlog': self.max_backlog,
+            'busy_ms': self.busy_ns / 1e6,
+            'latency': self.latency.summary(),
+        }
+
+
+class ProcessEnforcer:
+    """
+    Aplica políticas a procesos nuevos en un hilo propio
+
+    Args:
+        source: Fuente de inicios de procesos (ya iniciada)
+        classify: ProcessStart -> política (POLICY_*) o None para ignorarlo
+        apply: (pid, política) -> True si se aplicó
+        max_per_tick: Procesos como máximo por tick
+        tick_budget_ms: Tiempo como máximo por tick
+        tick_interval: Pausa entre ticks mientras quedan pendientes
+    """
+
+    def __init__(self, source: ProcessStartSource,
+                 classify: Callable[[ProcessStart], Optional[str]],
+                 apply: Callable[[int, str], bool],
+                 max_per_tick: int = MAX_PER_TICK,
+                 tick_budget_ms: float = TICK_BUDGET_MS,
+                 tick_interval: float = TICK_INTERVAL):
+        self.source = source
+        self.classify = classify
+        self.apply = apply
+        self.max_per_tick = max_per_tick
+        self.tick_budget_ns = int(tick_budget_ms * 1e6)
+        self.tick_interval = tick_interval
+        self.metrics = EnforcerMetrics()
+        self._backlog: Deque[ProcessStart] = collections.deque()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _collect(self) -> None:
+        nuevos = self.source.drain()
+        self._backlog.extend(nuevos)
+        self.metrics.seen += len(nuevos)
+        if len(self._backlog) > self.metrics.max_backlog:
+            self.metrics.max_backlog = len(self._backlog)
+
+    def tick(self) -> int:
+        """Recoge los inicios pendientes y trata los que entren en el presupuesto; retorna cuántos trató"""
+        self._collect()
+        inicio_ns = time.perf_counter_ns()
+        tratados = 0
+        while self._backlog and tratados < self.max_per_tick:
+            if tratados and time.perf_counter_ns() - inicio_ns >= self.tick_budget_ns:
+                break
+            evento = self._backlog.popleft()
+            tratados += 1
+            try:
+                politica = self.classify(evento)
+                if politica is None:
+                    self.metrics.skipped += 1
+                    continue
+                if self.apply(evento.pid, politica):
+                    self.metrics.applied[politica] = self.metrics.applied.get(politica, 0) + 1
+                    self.metrics.latency.record(evento)
+                else:
+                    self.metrics.failed += 1
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                # Procesos efímeros: terminaron antes de llegar a tratarlos
+                self.metrics.failed += 1
+        duracion = time.perf_counter_ns() - inicio_ns
+        self.metrics.ticks += 1
+        self.metrics.busy_ns += duracion
+        if self._backlog:
+            self.metrics.deferred += len(self._backlog)
+        if profiler.enabled and tratados:
+            profiler.record("session_enforcer.tick", duracion)
+        return tratados
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if not self._backlog:
+                evento = self.source.wait(IDLE_WAIT)
+                if evento is None:
+                    continue
+                self._backlog.append(evento)
+                self.metrics.seen += 1
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"WARN: Error aplicando políticas a procesos nuevos: {e}")
+            if self._backlog:
+                self._stop.wait(self.tick_interval)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Detiene el hilo y la fuente de inicios"""
+        self._stop.set()
+        self.source.interrupt()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.source.stop()
+
+
+if __name__ == "__main__":
+    from process_events import ScriptedProcessStartSource
+
+    # Ráfaga de 100 procesos: el presupuesto la reparte en varios ticks
+    guion = [(0.0, 1000 + i, "shadercompiler.exe" if i % 2 else "updater.exe") for i in range(100)]
+    fuente = ScriptedProcessStartSource(guion)
+    fuente.start()
+
+    def clasificar(evento: ProcessStart) -> Optional[str]:
+        return POLICY_GAME_CHILD if evento.name == "shadercompiler.exe" else POLICY_BACKGROUND
+
+    def aplicar(pid: int, politica: str) -> bool:
+        time.sleep(0.002)
+        return True
+
+    enforcer = ProcessEnforcer(fuente, clasificar, aplicar, max_per_tick=8)
+    enforcer.start()
+    time.sleep(2.5)
+    enforcer.stop()
+    print(enforcer.metrics.summary())
@@ -0,0 +1,368 @@
+# -*- coding: utf-8 -*-
+"""
+task_graph.py - Ejecución concurrente de un grafo de tareas con dependencias
+Cada tarea declara de qué tareas depende y qué recursos ocupa; un recurso con
+límite (p. ej. "pesado": 1) serializa solo las tareas que lo comparten. Las
+tareas independientes corren en paralelo hasta max_workers, por lo que el
+tiempo total queda acotado por la cadena más lenta y no por la suma.
+
+Las funciones de inicio y fin se invocan desde el hilo que llama a run(), no
+desde los hilos de trabajo (útil para actualizar una interfaz). Una tarea que
+excede su timeout se da por terminada y su hilo (daemon) queda abandonado; un
+TaskJournal registra las tareas completadas para reanudar una ejecución cortada.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+DEFAULT_WORKERS = 4
+
+# Estados de una tarea en el informe
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+STATUS_SKIPPED = "skipped"   # una dependencia falló
+STATUS_TIMEOUT = "timeout"   # excedió su timeout (cuenta como fallo)
+STATUS_RESUMED = "resumed"   # completada en una ejecución anterior (según el journal)
+
+
+class GraphTask:
+    """
+    Tarea del grafo
+
+    Args:
+        name: Nombre único (se usa en dependencias e informes)
+        func: Función sin argumentos; un retorno False o una excepción cuentan como fallo
+        deps: Tareas que deben terminar bien antes de empezar esta
+        resources: Recursos que ocupa mientras corre (ver limits en TaskGraph)
+        priority: Entre las tareas listas, las de mayor prioridad arrancan primero
+            (conviene para las más lentas, así no quedan para el final)
+        timeout: Segundos máximos de ejecución (None = sin límite)
+    """
+
+    __slots__ = ('name', 'func', 'deps', 'resources', 'priority', 'timeout')
+
+    def __init__(self, name: str, func: Callable[[], object], deps: Iterable[str] = (),
+                 resources: Iterable[str] = (), priority: int = 0, timeout: Optional[float] = None):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.resources = tuple(resources)
+        self.priority = priority
+        self.timeout = timeout
+
+
+class TaskResult:
+    """Resultado de una tarea"""
+
+    __slots__ = ('name', 'status', 'error', 'started', 'duration')
+
+    def __init__(self, name: str, status: str, error: Optional[str] = None,
+                 started: float = 0.0, duration: float = 0.0):
+        self.name = name
+        self.status = status
+        self.error = error
+        self.started = started
+        self.duration = duration
+
+    @property
+    def ok(self) -> bool:
+        return self.status in (STATUS_OK, STATUS_RESUMED)
+
+    def as_dict(self) -> Dict[str, object]:
+        datos = {'status': self.status, 'started': round(self.started, 3),
+                 'duration': round(self.duration, 3)}
+        if self.error:
+            datos['error'] = self.error
+        return datos
+
+
+class GraphReport:
+    """Resultados de una ejecución, en orden de finalización"""
+
+    def __init__(self):
+        self.results: Dict[str, TaskResult] = {}
+        self.elapsed = 0.0
+
+    @property
+    def failed(self) -> List[str]:
+        return [nombre for nombre, resultado in self.results.items()
+                if resultado.status in (STATUS_FAILED, STATUS_TIMEOUT)]
+
+    @property
+    def skipped(self) -> List[str]:
+        return [nombre for nombre, resultado in self.results.items() if resultado.status == STATUS_SKIPPED]
+
+    @property
+    def busy_time(self) -> float:
+        """Suma de las duraciones (lo que tardaría la ejecución secuencial)"""
+        return sum(resultado.duration for resultado in self.results.values())
+
+    def slowest(self, n: int = 5) -> List[TaskResult]:
+        return sorted(self.results.values(), key=lambda resultado: resultado.duration, reverse=True)[:n]
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            'elapsed': round(self.elapsed, 3),
+            'busy_time': round(self.busy_time, 3),
+            'failed': self.failed,
+            'skipped': self.skipped,
+            'resumed': [nombre for nombre, resultado in self.results.items() if resultado.status == STATUS_RESUMED],
+            'tasks': {nombre: resultado.as_dict() for nombre, resultado in self.results.items()},
+        }
+
+
+class TaskGraph:
+    """
+    Grafo de tareas con límite de hilos y de recursos
+
+    Args:
+        max_workers: Tareas simultáneas como máximo
+        limits: {recurso: tareas simultáneas}; un recurso sin límite no restringe
+        skip_on_failure: Si es False, las dependencias solo ordenan: una tarea corre
+            aunque su dependencia haya fallado (p. ej. importaciones del registro)
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS, limits: Optional[Dict[str, int]] = None,
+                 skip_on_failure: bool = True):
+        self.max_workers = max(1, max_workers)
+        self.limits = dict(limits or {})
+        self.skip_on_failure = skip_on_failure
+        self.tasks: Dict[str, GraphTask] = {}
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    def add(self, name: str, func: Callable[[], object], deps: Iterable[str] = (),
+            resources: Iterable[str] = (), priority: int = 0,
+            timeout: Optional[float] = None) -> GraphTask:
+        if name in self.tasks:
+            raise ValueError(f"Tarea duplicada: {name}")
+        tarea = GraphTask(name, func, deps, resources, priority, timeout)
+        self.tasks[name] = tarea
+        return tarea
+
+    def validate(self) -> List[str]:
+        """Verifica dependencias y ciclos; retorna un orden topológico"""
+        for tarea in self.tasks.values():
+            for dep in tarea.deps:
+                if dep not in self.tasks:
+                    raise ValueError(f"{tarea.name}: dependencia desconocida {dep}")
+        pendientes = {nombre: len(tarea.deps) for nombre, tarea in self.tasks.items()}
+        dependientes = self._dependents()
+        orden = [nombre for nombre, n in pendientes.items() if n == 0]
+        for nombre in orden:
+            for siguiente in dependientes[nombre]:
+                pendientes[siguiente] -= 1
+                if pendientes[siguiente] == 0:
+                    orden.append(siguiente)
+        if len(orden) != len(self.tasks):
+            ciclo = sorted(nombre for nombre, n in pendientes.items() if n > 0)
+            raise ValueError(f"Dependencias circulares entre: {', '.join(ciclo)}")
+        return orden
+
+    def _dependents(self) -> Dict[str, List[str]]:
+        dependientes: Dict[str, List[str]] = {nombre: [] for nombre in self.tasks}
+        for tarea in self.tasks.values():
+            for dep in tarea.deps:
+                dependientes[dep].append(tarea.name)
+        return dependientes
+
+    def _fits(self, tarea: GraphTask, en_uso: Dict[str, int]) -> bool:
+        return all(en_uso.get(recurso, 0) < self.limits[recurso]
+                   for recurso in tarea.resources if recurso in self.limits)
+
+    @staticmethod
+    def _run_task(tarea: GraphTask, origen: float) -> TaskResult:
+        inicio = time.perf_counter()
+        try:
+            retorno = tarea.func()
+            estado, error = (STATUS_FAILED, "retornó False") if retorno is False else (STATUS_OK, None)
+        except Exception as e:
+            estado, error = STATUS_FAILED, f"{type(e).__name__}: {e}"
+        return TaskResult(tarea.name, estado, error, inicio - origen, time.perf_counter() - inicio)
+
+    def run(self, on_start: Optional[Callable[[GraphTask], None]] = None,
+            on_finish: Optional[Callable[[TaskResult], None]] = None,
+            completed: Iterable[str] = ()) -> GraphReport:
+        """
+        Ejecuta el grafo completo. Las tareas cuya dependencia falló se omiten
+        (salvo con skip_on_failure=False).
+
+        Args:
+            on_start: Se llama al lanzar cada tarea
+            on_finish: Se llama al terminar (u omitir) cada tarea
+            completed: Tareas ya hechas en una ejecución anterior; no se vuelven a correr
+        """
+        self.validate()
+        informe = GraphReport()
+        origen = time.perf_counter()
+        dependientes = self._dependents()
+        faltantes = {nombre: len(tarea.deps) for nombre, tarea in self.tasks.items()}
+        listas: List[GraphTask] = []
+        en_uso: Dict[str, int] = {}
+        en_curso: Dict[str, Optional[float]] = {}
+        terminadas: "queue.SimpleQueue" = queue.SimpleQueue()
+        hechas = set(completed)
+
+        def habilitar(tarea: GraphTask) -> None:
+            if tarea.name in hechas:
+                terminar(TaskResult(tarea.name, STATUS_RESUMED))
+            else:
+                listas.append(tarea)
+
+        def terminar(resultado: TaskResult) -> None:
+            informe.results[resultado.name] = resultado
+            if on_finish:
+                on_finish(resultado)
+            for siguiente in dependientes[resultado.name]:
+                if not resultado.ok and self.skip_on_failure:
+                    if siguiente not in informe.results:
+                        terminar(TaskResult(siguiente, STATUS_SKIPPED,
+                                            f"dependencia {resultado.name}: {resultado.status}"))
+                    continue
+                faltantes[siguiente] -= 1
+                if faltantes[siguiente] == 0 and siguiente not in informe.results:
+                    habilitar(self.tasks[siguiente])
+
+        def liberar(tarea: GraphTask) -> None:
+            del en_curso[tarea.name]
+            for recurso in tarea.resources:
+                en_uso[recurso] -= 1
+
+        def ejecutar(tarea: GraphTask) -> None:
+            terminadas.put((tarea, self._run_task(tarea, origen)))
+
+        for tarea in list(self.tasks.values()):
+            if not tarea.deps:
+                habilitar(tarea)
+
+        while listas or en_curso:
+            listas.sort(key=lambda tarea: tarea.priority, reverse=True)
+            for tarea in list(listas):
+                if len(en_curso) >= self.max_workers:
+                    break
+                if tarea.name in informe.results:
+                    listas.remove(tarea)
+                    continue
+                if not self._fits(tarea, en_uso):
+                    continue
+                listas.remove(tarea)
+                for recurso in tarea.resources:
+                    en_uso[recurso] = en_uso.get(recurso, 0) + 1
+                if on_start:
+                    on_start(tarea)
+                en_curso[tarea.name] = time.perf_counter() + tarea.timeout if tarea.timeout else None
+                # Hilos daemon: una tarea vencida no impide terminar el proceso
+                threading.Thread(target=ejecutar, args=(tarea,), name=f"task-{tarea.name}", daemon=True).start()
+
+            if not en_curso:
+                break
+            limites = [limite for limite in en_curso.values() if limite is not None]
+            espera = max(0.0, min(limites) - time.perf_counter()) if limites else None
+            try:
+                tarea, resultado = terminadas.get(timeout=espera)
+            except queue.Empty:
+                ahora = time.perf_counter()
+                for nombre, limite in list(en_curso.items()):
+                    if limite is not None and limite <= ahora:
+                        tarea = self.tasks[nombre]
+                        liberar(tarea)
+                        terminar(TaskResult(nombre, STATUS_TIMEOUT, f"superó {tarea.timeout:g}s",
+                                            limite - tarea.timeout - origen, tarea.timeout))
+                continue
+            if tarea.name in en_curso:
+                # Un resultado tardío de una tarea ya vencida se descarta
+                liberar(tarea)
+                terminar(resultado)
+
+        for nombre in self.tasks:
+            if nombre not in informe.results:
+                # Solo ocurre con un recurso de límite 0
+                terminar(TaskResult(nombre, STATUS_SKIPPED, "recurso no disponible"))
+        informe.elapsed = time.perf_counter() - origen
+        return informe
+
+
+class TaskJournal:
+    """
+    Registro en disco (JSON por línea) de las tareas terminadas de una ejecución.
+    Si la ejecución se corta, la siguiente con la misma clave retoma desde ahí.
+
+    Args:
+        path: Archivo del journal
+        key: Identifica la ejecución (p. ej. el backup que se restaura); un journal
+            con otra clave se descarta
+    """
+
+    def __init__(self, path: str, key: str):
+        self.path = path
+        self.key = key
+        self._file = None
+        self._lock = threading.Lock()
+
+    def completed(self) -> Set[str]:
+        """Tareas completadas con éxito en la ejecución anterior con la misma clave"""
+        hechas: Set[str] = set()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                cabecera = json.loads(f.readline() or "{}")
+                if cabecera.get("key") != self.key:
+                    return set()
+                for linea in f:
+                    try:
+                        registro = json.loads(linea)
+                    except ValueError:
+                        break  # línea cortada por la interrupción
+                    if registro.get("status") in (STATUS_OK, STATUS_RESUMED):
+                        hechas.add(registro["task"])
+        except (OSError, ValueError):
+            return set()
+        return hechas
+
+    def open(self, resume: bool = True) -> Set[str]:
+        """Abre el journal para escribir; retorna las tareas a no repetir"""
+        hechas = self.completed() if resume else set()
+        if hechas:
+            self._file = open(self.path, "a", encoding="utf-8")
+        else:
+            self._file = open(self.path, "w", encoding="utf-8")
+            self._write({"key": self.key, "started": time.strftime("%Y-%m-%d %H:%M:%S")})
+        return hechas
+
+    def _write(self, registro: Dict[str, object]) -> None:
+        with self._lock:
+            self._file.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def record(self, result: TaskResult) -> None:
+        if self._file is not None and result.status != STATUS_RESUMED:
+            self._write({"task": result.name, **result.as_dict()})
+
+    def close(self, finished: bool) -> None:
+        """Cierra el journal; si la ejecución terminó completa, lo elimina"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if finished:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+if __name__ == "__main__":
+    grafo = TaskGraph(max_workers=4, limits={"pesado": 1})
+    for i in range(6):
+        grafo.add(f"liviana_{i}", lambda: time.sleep(0.1))
+    grafo.add("pesada_a", lambda: time.sleep(0.3), resources=["pesado"], priority=10)
+    grafo.add("pesada_b", lambda: time.sleep(0.3), resources=["pesado"], priority=10)
+    grafo.add("final", lambda: None, deps=["pesada_a", "pesada_b"])
+    resultado = grafo.run()
+    print(f"{resultado.elapsed:.2f} s en paralelo vs {resultado.busy_time:.2f} s secuencial")
+    for tarea in resultado.slowest(3):
+        print(f"  {tarea.name}: {tarea.duration:.2f} s")
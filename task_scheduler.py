@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+task_scheduler.py - Planificador cooperativo de tareas periódicas
+Ejecuta todos los monitores de un modo en un único hilo: cada tarea es una
+función que realiza una iteración y retorna cuándo quiere volver a ejecutarse.
+Incluye jitter, agrupación de despertares cercanos, estadísticas por tarea y un
+único evento de apagado que interrumpe cualquier espera de inmediato.
+"""
+
+import heapq
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+
+class StopTask(Exception):
+    """Lanzada por una tarea para no volver a ser planificada"""
+
+
+@dataclass
+class TaskStats:
+    """Estadísticas de ejecución de una tarea"""
+    runs: int = 0
+    errors: int = 0
+    total_ns: int = 0
+    max_ns: int = 0
+    last_ns: int = 0
+
+    @property
+    def avg_ms(self) -> float:
+        return (self.total_ns / self.runs / 1e6) if self.runs else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            'runs': self.runs,
+            'errors': self.errors,
+            'avg_ms': round(self.avg_ms, 3),
+            'max_ms': round(self.max_ns / 1e6, 3),
+            'last_ms': round(self.last_ns / 1e6, 3),
+        }
+
+
+@dataclass(order=True)
+class _Entry:
+    due: float
+    seq: int
+    task: "PeriodicTask" = field(compare=False)
+
+
+class PeriodicTask:
+    """
+    Tarea periódica. La función retorna None para usar el intervalo por defecto,
+    un número para indicar el próximo retardo en segundos, o lanza StopTask.
+    """
+
+    def __init__(self, name: str, func: Callable[[], Optional[float]], interval: float,
+                 jitter: float = 0.0, one_shot: bool = False):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.one_shot = one_shot
+        self.stats = TaskStats()
+
+
+class CooperativeScheduler:
+    """
+    Planificador de un solo hilo para tareas periódicas
+
+    Args:
+        coalesce_window: Tareas que vencen dentro de esta ventana se ejecutan en
+            el mismo despertar en lugar de despertar el hilo varias veces.
+    """
+
+    def __init__(self, coalesce_window: float = 0.5):
+        self.coalesce_window = coalesce_window
+        self.shutdown_event = threading.Event()
+        self._heap: List[_Entry] = []
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._tasks: Dict[str, PeriodicTask] = {}
+        self._shutdown_callbacks: List[Callable[[], None]] = []
+        self._thread: Optional[threading.Thread] = None
+        self.wakeups = 0
+
+    def add_task(self, name: str, func: Callable[[], Optional[float]], interval: float,
+                 initial_delay: float = 0.0, jitter: float = 0.0,
+                 one_shot: bool = False) -> PeriodicTask:
+        """
+        Registra una tarea
+
+        Args:
+            name: Nombre único (usado en estadísticas)
+            func: Función de una iteración
+            interval: Retardo por defecto entre ejecuciones (segundos)
+            initial_delay: Retardo antes de la primera ejecución
+            jitter: Retardo aleatorio adicional máximo, para no alinear tareas
+            one_shot: Ejecutar una sola vez
+        """
+        tarea = PeriodicTask(name, func, interval, jitter, one_shot)
+        with self._cond:
+            self._tasks[name] = tarea
+            self._push(tarea, time.monotonic() + initial_delay)
+            self._cond.notify()
+        return tarea
+
+    def on_shutdown(self, callback: Callable[[], None]) -> None:
+        """Registra una función a llamar cuando se solicita el apagado"""
+        self._shutdown_callbacks.append(callback)
+
+    def shutdown(self) -> None:
+        """Solicita el apagado: interrumpe la espera actual y avisa a los suscriptores"""
+        if self.shutdown_event.is_set():
+            return
+        self.shutdown_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        for callback in self._shutdown_callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def start(self) -> threading.Thread:
+        """Ejecuta el planificador en un hilo daemon"""
+        self._thread = threading.Thread(target=self.run, name="scheduler", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Estadísticas de tiempo por tarea"""
+        return {nombre: tarea.stats.as_dict() for nombre, tarea in self._tasks.items()}
+
+    def _push(self, tarea: PeriodicTask, due: float) -> None:
+        self._seq += 1
+        heapq.heappush(self._heap, _Entry(due, self._seq, tarea))
+
+    def run(self) -> None:
+        """Bucle principal: duerme hasta la próxima tarea o hasta el apagado"""
+        while not self.shutdown_event.is_set():
+            with self._cond:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                espera = self._heap[0].due - time.monotonic()
+                if espera > 0:
+                    self._cond.wait(espera)
+                    continue
+                # Agrupar todas las tareas que vencen dentro de la ventana
+                limite = time.monotonic() + self.coalesce_window
+                vencidas = []
+                while self._heap and self._heap[0].due <= limite:
+                    vencidas.append(heapq.heappop(self._heap).task)
+
+            self.wakeups += 1
+            for tarea in vencidas:
+                if self.shutdown_event.is_set():
+                    return
+                proximo = self._run_task(tarea)
+                if proximo is None:
+                    continue
+                with self._cond:
+                    self._push(tarea, time.monotonic() + proximo)
+
+    def _run_task(self, tarea: PeriodicTask) -> Optional[float]:
+        inicio = time.monotonic_ns()
+        retardo: Optional[float] = tarea.interval
+        try:
+            resultado = tarea.func()
+            if resultado is not None:
+                retardo = resultado
+        except StopTask:
+            retardo = None
+        except Exception as e:
+            tarea.stats.errors += 1
+            print(f"Error en tarea '{tarea.name}': {e}")
+        finally:
+            duracion = time.monotonic_ns() - inicio
+            tarea.stats.runs += 1
+            tarea.stats.total_ns += duracion
+            tarea.stats.last_ns = duracion
+            tarea.stats.max_ns = max(tarea.stats.max_ns, duracion)
+
+        if retardo is None or tarea.one_shot:
+            return None
+        if tarea.jitter:
+            retardo += random.uniform(0, tarea.jitter)
+        return retardo
+
+
+if __name__ == "__main__":
+    planificador = CooperativeScheduler(coalesce_window=0.05)
+    planificador.add_task("rapida", lambda: None, interval=0.2, jitter=0.05)
+    planificador.add_task("lenta", lambda: time.sleep(0.01), interval=0.5)
+    planificador.add_task("apagado", planificador.shutdown, interval=0, initial_delay=2, one_shot=True)
+    planificador.run()
+    print(f"Despertares: {planificador.wakeups}")
+    for nombre, datos in planificador.stats().items():
+        print(f"  {nombre}: {datos}")
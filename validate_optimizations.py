@@ -78,10 +78,12 @@ def check_optimization_implementations():
             'set_quantum_length',  # Scheduler quantum
             'optimize_gpu_memory_advanced',  # GPU memory management
             'monitor_thermals_and_adjust',  # Thermal monitoring
-            'PowerShellSession',  # NEW: PowerShell connection pooling
-            'get_ps_session',  # NEW: PowerShell session getter
+            'run_powershell',  # PowerShell pool (powershell_pool.py)
+            'get_pool().warm()',  # Sesiones calientes antes de detectar el juego
             'optimize_io_scheduler',  # NEW: I/O scheduler optimization
-            'def close(self):',  # PowerShell session cleanup
+            'close_pool()',  # PowerShell pool cleanup
+            'GameLaunchWatcher',  # Detección de juegos por eventos
+            'build_session_enforcer',  # Políticas a procesos nuevos durante la partida
         ],
         'COPIA.py': [
             'ThreadPoolExecutor',  # Batch registry operations
@@ -95,6 +97,7 @@ def check_optimization_implementations():
             'get_pystray_modules',  # Lazy imports
             '_process_cache',  # NEW: Process cache for differential updates
             'refrescar_lista_procesos',  # GUI refresh with differential updates
+            'GameLaunchWatcher',  # Detección de juegos por eventos
         ],
         'performance_analytics.py': [
             'PerformanceAnalytics',  # Performance analytics
@@ -120,6 +123,107 @@ def check_optimization_implementations():
             'optimizar_puntos_restauracion',  # Optimization 9
             'optimizar_windows_update',  # Optimization 10
         ],
+        'process_snapshot.py': [
+            'ProcessSnapshotService',  # Shared single-scan process table
+            'get_snapshot',
+        ],
+        'priority_state_cache.py': [
+            'AppliedStateCache',  # Idempotent priority/affinity applier cache
+        ],
+        'foreground_events.py': [
+            'WinEventForegroundSource',  # Event-driven foreground tracking
+            'LatencyTracker',  # Focus to priority latency
+        ],
+        'task_scheduler.py': [
+            'CooperativeScheduler',  # Planificador cooperativo
+            'PeriodicTask',  # Tarea periódica
+        ],
+        'mode_state.py': [
+            'ModeStateBus',  # Cliente del bus de estado
+            'ModeStateHub',  # Servidor local de estado
+            'CachedStateFile',  # Lectura con caché por mtime
+        ],
+        'cpu_sampler.py': [
+            'CpuSampler',  # Muestreo continuo de CPU por proceso
+        ],
+        'demand_estimator.py': [
+            'DemandEstimator',  # Estimador de demanda no bloqueante
+        ],
+        'instrumentation.py': [
+            'Instrumentation',  # Registro de tiempos
+            'instrumented',  # Decorador de medición
+            'timed',  # Context manager de medición
+        ],
+        'dir_scanner.py': [
+            'DirectoryScanner',  # Recorrido paralelo con os.scandir
+            'scan_tree',  # Medición de un árbol en una pasada
+        ],
+        'cleanup_rules.py': [
+            'RuleWalker',  # Recorrido único con todas las reglas
+            'CleanupRule',  # Regla de limpieza como predicado
+        ],
+        'cleanup_plan.py': [
+            'DeletionPlan',  # Plan de eliminación serializable
+            'PlanExecutor',  # Ejecución en lotes paralelos
+        ],
+        'scan_index.py': [
+            'ScanIndex',  # Índice persistente de carpetas (SQLite)
+        ],
+        'duplicate_finder.py': [
+            'find_duplicates',  # Búsqueda por etapas
+            'DuplicateReport',  # Informe de duplicados
+            'DuplicateGroup',  # Grupo de copias idénticas
+        ],
+        'task_graph.py': [
+            'TaskGraph',  # Grafo de tareas con límites
+            'GraphReport',  # Duraciones por tarea
+            'GraphTask',  # Tarea con dependencias y recursos
+        ],
+        'registry_access.py': [
+            'RegistryReader',  # Interfaz de lectura
+            'WinregRegistry',  # Backend winreg
+            'DictRegistry',  # Registro en memoria
+        ],
+        'program_inventory.py': [
+            'collect_installed_programs',  # Inventario nativo
+            'InstalledProgram',  # Registro de programa
+            'write_inventory',  # Exportación JSON
+        ],
+        'chunk_store.py': [
+            'ChunkStore',  # Almacén deduplicado
+            'iter_chunks',  # Fragmentación por contenido
+            'restore_generation',  # Reconstrucción de generaciones
+        ],
+        'reg_diff.py': [
+            'parse_reg_file',  # Parser de .reg en streaming
+            'diff_reg_file',  # Diferencias contra el registro actual
+            'apply_changes',  # Aplica solo los cambios
+            'restore_reg_file',  # Diff y aplicación
+        ],
+        'powershell_pool.py': [
+            'PowerShellPool',  # Pool de sesiones calientes
+            'run_batch',  # Varios scripts en una ida y vuelta
+            'submit',  # Ejecución asíncrona con Future
+            'FakePowerShell',  # Shell falso para pruebas
+            'RESPONSE_PREFIX',  # Respuesta JSON con id único
+        ],
+        'hardware_facts.py': [
+            'HardwareFacts',  # Caché persistente con TTL por clave
+            'current_boot_id',  # Invalidación por arranque
+            'is_laptop',  # Detección compartida de portátil
+        ],
+        'process_events.py': [
+            'class ProcessStartSource',  # Interfaz de fuentes de inicios
+            'class WmiProcessStartSource',  # Backend Win32_ProcessStartTrace
+            'class PollingProcessStartSource',  # Backend de sondeo de PIDs nuevos
+            'class GameLaunchWatcher',  # Detección de juegos por eventos
+            'def create_process_start_source',  # Fábrica con respaldo
+        ],
+        'session_enforcer.py': [
+            'class ProcessEnforcer',  # Enforcer incremental por tick
+            'class EnforcerMetrics',  # Métricas propias
+            'MAX_PER_TICK',  # Presupuesto por tick
+        ],
     }
     
     print("\nVerificando implementaciones de optimizaciones...")
@@ -180,6 +284,28 @@ def validate_all():
         'game_profiler.py',
         'integration_example.py',
         'optimizaciones_sistema.py',
+        'process_snapshot.py',
+        'priority_state_cache.py',
+        'foreground_events.py',
+        'task_scheduler.py',
+        'mode_state.py',
+        'cpu_sampler.py',
+        'demand_estimator.py',
+        'instrumentation.py',
+        'dir_scanner.py',
+        'cleanup_rules.py',
+        'cleanup_plan.py',
+        'scan_index.py',
+        'duplicate_finder.py',
+        'task_graph.py',
+        'registry_access.py',
+        'program_inventory.py',
+        'chunk_store.py',
+        'reg_diff.py',
+        'powershell_pool.py',
+        'hardware_facts.py',
+        'process_events.py',
+        'session_enforcer.py',
     ]
     
     syntax_ok = True